@@ -0,0 +1,410 @@
+# benchmarks/bench_crawl.py
+"""
+抓取流程基准测试：录制真实的列表页 / API 响应，再通过本地桩 HTTP 服务器回放。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_crawl record                          # 录制 sites.json 中所有栏目的所有 URL 到 benchmarks/fixtures/
+    python -m benchmarks.bench_crawl run [-n 3] [--latency 50]       # 回放，对每个栏目执行 get_latest_info
+    python -m benchmarks.bench_crawl run --parser html.parser --per-host 2 --save before.json
+    python -m benchmarks.bench_crawl run --baseline before.json      # 与保存的结果比较，标记性能回退与输出变化
+
+按抓取模式（html / api）分别报告 pages/s、items/s、解析耗时（各线程累计）与 tracemalloc 峰值内存。
+解析耗时与峰值内存只统计抓取进程本身；使用解析进程池（--parse-processes > 1）时，
+工作进程中的解析不计入这两列，以 pages/s 的变化衡量效果。
+计时取 n 次运行中最快的一次；峰值内存在额外一次开启 tracemalloc 的运行中测量，以免影响计时。
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import crawler.config as crawler_config
+from benchmarks.common import load_channel_tasks
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST_FILE = os.path.join(FIXTURES_DIR, "manifest.json")
+
+# 与 api_handler 发出的请求头保持一致
+API_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "application/json",
+}
+
+# 与上次结果相比，吞吐量下降超过该比例即标记为性能回退
+REGRESSION_TOLERANCE = 0.10
+
+
+# ====================================================================
+# 1. 录制
+# ====================================================================
+
+def _fixture_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def record_fixtures():
+    """抓取所有栏目 url_list 中的每个 URL，按原始字节保存响应体，生成 manifest.json。"""
+    from crawler.session_pool import get_session, session_get
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    manifest: Dict[str, Dict[str, Any]] = {}
+
+    for channel in load_channel_tasks():
+        headers = API_HEADERS if channel["mode"] == "api" else {}
+        ses = get_session(channel.get("use_webvpn", crawler_config.ENABLE_WEBVPN))
+
+        for url in channel.get("url_list", []):
+            if not url or url in manifest:
+                continue
+            try:
+                r = session_get(ses, url, headers=headers, timeout=crawler_config.REQUEST_TIMEOUT)
+            except Exception as e:
+                print(f"跳过 {url}: {e}")
+                continue
+
+            file_name = _fixture_key(url)
+            with open(os.path.join(FIXTURES_DIR, file_name), "wb") as f:
+                f.write(r.content)
+
+            manifest[url] = {
+                "file": file_name,
+                "status": r.status_code,
+                "content_type": r.headers.get("Content-Type", ""),
+            }
+            print(f"已录制: [{channel['site_name']}] {channel['channel_name']} {url} ({len(r.content)} bytes)")
+
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"共录制 {len(manifest)} 个响应。")
+
+
+# ====================================================================
+# 2. 本地桩服务器
+# ====================================================================
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """按路径（录制时的 fixture key）返回录制的响应。"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        entry = server.fixtures.get(self.path.lstrip("/"))
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server.hits_lock:
+            server.hits += 1
+
+        if entry is None:
+            self.send_error(404)
+            return
+
+        status, content_type, body = entry
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server(address: str, fixtures: Dict[str, Tuple[int, str, bytes]], latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((address, 0), _FixtureHandler)
+    server.daemon_threads = True
+    server.fixtures = fixtures
+    server.latency = latency
+    server.hits = 0
+    server.hits_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_stub_servers(
+    urls: List[str],
+    fixtures: Dict[str, Tuple[int, str, bytes]],
+    latency: float
+) -> Tuple[Dict[str, str], List[ThreadingHTTPServer]]:
+    """
+    为每个原始主机启动一个桩服务器，分别绑定 127.0.0.2、127.0.0.3……，
+    使单主机并发限制、限速与真实抓取时一致；不支持多个回环地址时全部回退到 127.0.0.1。
+
+    :return: (原始 URL -> 回放 URL, 服务器列表)。
+    """
+    hosts = sorted({urlparse(url).hostname or "" for url in urls})
+    servers: Dict[str, ThreadingHTTPServer] = {}
+    try:
+        for index, host in enumerate(hosts):
+            servers[host] = _start_server(f"127.0.0.{index + 2}", fixtures, latency)
+    except OSError:
+        for server in servers.values():
+            server.shutdown()
+        shared = _start_server("127.0.0.1", fixtures, latency)
+        servers = {host: shared for host in hosts}
+
+    url_map = {}
+    for url in urls:
+        address, port = servers[urlparse(url).hostname or ""].server_address[:2]
+        url_map[url] = f"http://{address}:{port}/{_fixture_key(url)}"
+    return url_map, list({id(s): s for s in servers.values()}.values())
+
+
+# ====================================================================
+# 3. 回放与计量
+# ====================================================================
+
+_PARSE_TIME: Dict[str, float] = {"html": 0.0, "api": 0.0}
+_PARSE_LOCK = threading.Lock()
+
+
+def _add_parse_time(mode: str, seconds: float):
+    with _PARSE_LOCK:
+        _PARSE_TIME[mode] += seconds
+
+
+def _timed_iterator(iterator, mode: str):
+    """逐条计时的迭代器包装（HTML 条目是惰性解析的）。"""
+    done = object()
+    while True:
+        start = time.perf_counter()
+        item = next(iterator, done)
+        _add_parse_time(mode, time.perf_counter() - start)
+        if item is done:
+            return
+        yield item
+
+
+def _install_parse_timers():
+    """包装 Handler 中的解析函数，累计各模式的解析耗时。"""
+    from crawler import api_handler, html_handler
+
+    original_html = html_handler.iter_html_items
+    original_api = api_handler.extract_api_records
+
+    def timed_html_items(*args, **kwargs):
+        start = time.perf_counter()
+        iterator = iter(original_html(*args, **kwargs))
+        _add_parse_time("html", time.perf_counter() - start)
+        return _timed_iterator(iterator, "html")
+
+    def timed_api_records(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original_api(*args, **kwargs)
+        finally:
+            _add_parse_time("api", time.perf_counter() - start)
+
+    html_handler.iter_html_items = timed_html_items
+    api_handler.extract_api_records = timed_api_records
+
+
+def _apply_overrides(args: argparse.Namespace):
+    """在导入抓取模块之前覆盖 crawler.config 中的相关配置。"""
+    # 回放时每次都要真正解析，关闭条件请求缓存；桩服务器不需要 WebVPN
+    crawler_config.ENABLE_FETCH_CACHE = False
+    crawler_config.ENABLE_WEBVPN = False
+    if args.parser:
+        crawler_config.HTML_PARSER = args.parser
+    if args.no_scoped:
+        crawler_config.HTML_SCOPED_PARSING = False
+    if args.channel_workers:
+        crawler_config.MAX_CHANNEL_WORKERS = args.channel_workers
+    if args.concurrent:
+        crawler_config.MAX_CONCURRENT_REQUESTS = args.concurrent
+    if args.per_host:
+        crawler_config.MAX_REQUESTS_PER_HOST = args.per_host
+    if args.parse_processes is not None:
+        crawler_config.PARSE_PROCESSES = args.parse_processes
+
+
+def _load_fixtures() -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Tuple[int, str, bytes]]]:
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    fixtures = {}
+    for entry in manifest.values():
+        with open(os.path.join(FIXTURES_DIR, entry["file"]), "rb") as f:
+            fixtures[entry["file"]] = (entry["status"], entry["content_type"], f.read())
+    return manifest, fixtures
+
+
+def _prepare_channels(manifest: Dict[str, Dict[str, Any]], url_map: Dict[str, str]) -> List[Dict[str, Any]]:
+    """将栏目的 url_list 改写为回放地址，没有录制的 URL 被丢弃。"""
+    channels = []
+    for channel in load_channel_tasks():
+        replay_urls = [url_map[url] for url in channel.get("url_list", []) if url in manifest]
+        if replay_urls:
+            channels.append({**channel, "url_list": replay_urls, "use_webvpn": False})
+    return channels
+
+
+def _crawl_once(channels, crawl_channels, get_latest_info, servers, verbose: bool) -> Tuple[float, int, Dict[str, List]]:
+    """并发抓取一组栏目一次，返回 (耗时, 请求页面数, {栏目: 条目})。"""
+    hits_before = sum(server.hits for server in servers)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    start = time.perf_counter()
+    with output:
+        results = {
+            f"{channel['site_name']}/{channel['channel_name']}": items
+            for channel, items in crawl_channels(channels, get_latest_info)
+        }
+    elapsed = time.perf_counter() - start
+
+    return elapsed, sum(server.hits for server in servers) - hits_before, results
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """回放录制的响应，按抓取模式分别测量吞吐量、解析耗时与峰值内存。"""
+    _apply_overrides(args)
+
+    from crawler import host_guard
+    from crawler.engine import crawl_channels
+    from crawler.fetcher import get_latest_info
+
+    _install_parse_timers()
+
+    manifest, fixtures = _load_fixtures()
+    url_map, servers = start_stub_servers(list(manifest), fixtures, args.latency / 1000)
+
+    # 桩服务器不需要礼貌限速，除非显式指定
+    rate, burst = (args.rate, max(1, int(args.rate))) if args.rate else (1e9, 10 ** 6)
+    for replay_url in url_map.values():
+        host_guard.set_rate_limit(urlparse(replay_url).hostname, rate, burst)
+
+    channels = _prepare_channels(manifest, url_map)
+    report: Dict[str, Any] = {
+        "settings": {
+            "parser": crawler_config.HTML_PARSER,
+            "scoped": crawler_config.HTML_SCOPED_PARSING,
+            "channel_workers": crawler_config.MAX_CHANNEL_WORKERS,
+            "concurrent": crawler_config.MAX_CONCURRENT_REQUESTS,
+            "per_host": crawler_config.MAX_REQUESTS_PER_HOST,
+            "parse_processes": crawler_config.PARSE_PROCESSES,
+            "latency_ms": args.latency,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    for mode in ("html", "api"):
+        group = [channel for channel in channels if channel["mode"] == mode]
+        if not group:
+            continue
+
+        # 计时：取 n 次中最快的一次
+        best = None
+        for _ in range(max(1, args.repeat)):
+            _PARSE_TIME[mode] = 0.0
+            elapsed, pages, results = _crawl_once(group, crawl_channels, get_latest_info, servers, args.verbose)
+            if best is None or elapsed < best[0]:
+                best = (elapsed, pages, results, _PARSE_TIME[mode])
+        elapsed, pages, results, parse_time = best
+
+        # 峰值内存：单独一次开启 tracemalloc 的运行
+        tracemalloc.start()
+        _crawl_once(group, crawl_channels, get_latest_info, servers, False)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        items = sum(len(v) for v in results.values())
+        digest = hashlib.sha256(
+            json.dumps(results, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:12]
+
+        report["results"][mode] = {
+            "channels": len(group),
+            "pages": pages,
+            "items": items,
+            "wall_s": round(elapsed, 4),
+            "pages_per_s": round(pages / max(elapsed, 1e-9), 2),
+            "items_per_s": round(items / max(elapsed, 1e-9), 2),
+            "parse_s": round(parse_time, 4),
+            "peak_mib": round(peak / (1024 * 1024), 2),
+            "digest": digest,
+        }
+
+    for server in servers:
+        server.shutdown()
+    return report
+
+
+# ====================================================================
+# 4. 报告
+# ====================================================================
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    settings = report["settings"]
+    print(
+        f"parser={settings['parser']} scoped={settings['scoped']} "
+        f"channel_workers={settings['channel_workers']} concurrent={settings['concurrent']} "
+        f"per_host={settings['per_host']} parse_processes={settings.get('parse_processes')} latency={settings['latency_ms']}ms repeat={settings['repeat']}"
+    )
+    print(
+        f"{'mode':<5} {'channels':>8} {'pages':>6} {'items':>6} {'wall(s)':>8} {'pages/s':>9} "
+        f"{'items/s':>9} {'parse(s)':>9} {'peak(MiB)':>10}  digest"
+    )
+
+    for mode, r in report["results"].items():
+        line = (
+            f"{mode:<5} {r['channels']:>8} {r['pages']:>6} {r['items']:>6} {r['wall_s']:>8.3f} "
+            f"{r['pages_per_s']:>9.1f} {r['items_per_s']:>9.1f} {r['parse_s']:>9.3f} {r['peak_mib']:>10.2f}  {r['digest']}"
+        )
+
+        base = (baseline or {}).get("results", {}).get(mode)
+        if base:
+            change = r["pages_per_s"] / max(base["pages_per_s"], 1e-9) - 1
+            line += f"  {change:+.1%}"
+            if change < -REGRESSION_TOLERANCE:
+                line += " ⚠ 性能回退"
+            if r["digest"] != base["digest"]:
+                line += " ⚠ 输出变化"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取流程回放基准测试")
+    parser.add_argument("action", choices=["record", "run"], help="record: 录制响应; run: 回放并测量")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="每种模式的计时运行次数（取最快）")
+    parser.add_argument("--latency", type=float, default=0, help="桩服务器为每个请求附加的延迟（毫秒），模拟网络往返")
+    parser.add_argument("--parser", choices=["lxml", "html.parser", "html5lib"], help="覆盖 HTML_PARSER")
+    parser.add_argument("--no-scoped", action="store_true", help="关闭 HTML_SCOPED_PARSING")
+    parser.add_argument("--channel-workers", type=int, help="覆盖 MAX_CHANNEL_WORKERS")
+    parser.add_argument("--concurrent", type=int, help="覆盖 MAX_CONCURRENT_REQUESTS")
+    parser.add_argument("--per-host", type=int, help="覆盖 MAX_REQUESTS_PER_HOST")
+    parser.add_argument("--parse-processes", type=int, help="覆盖 PARSE_PROCESSES（0 表示在抓取线程中解析）")
+    parser.add_argument("--rate", type=float, help="桩服务器主机的令牌桶速率（请求/秒），默认不限速")
+    parser.add_argument("--save", help="将结果保存为 JSON，供之后 --baseline 比较")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出抓取日志")
+    args = parser.parse_args()
+
+    if args.action == "record":
+        record_fixtures()
+        return
+
+    report = run_benchmark(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
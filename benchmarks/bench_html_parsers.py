@@ -0,0 +1,129 @@
+# benchmarks/bench_html_parsers.py
+"""
+HTML 解析后端基准测试。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_html_parsers save            # 为每个 HTML 栏目保存一个列表页到 benchmarks/pages/
+    python -m benchmarks.bench_html_parsers run [-n 20]     # 对已保存页面比较各解析后端及 scoped 模式
+
+以 html.parser + 完整解析（默认配置）的输出作为基准，列出每种组合下输出不一致的栏目；
+只有未被列出的栏目才可以在 html_config 中开启对应的 parser / scoped_parsing。
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from importlib.util import find_spec
+from typing import Any, Dict, List
+
+from benchmarks.common import load_channel_tasks
+from crawler.config import ENABLE_WEBVPN, REQUEST_TIMEOUT
+from crawler.html_handler import parse_html_items
+from crawler.session_pool import get_session, session_get
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+MANIFEST_FILE = os.path.join(PAGES_DIR, "manifest.json")
+
+# 解析后端及其依赖的模块
+BACKENDS = {"html.parser": None, "lxml": "lxml", "html5lib": "html5lib"}
+
+
+def save_pages():
+    """抓取每个 HTML 栏目的第一个列表页并保存，生成 manifest.json。"""
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    manifest: List[Dict[str, Any]] = []
+
+    for channel in load_channel_tasks():
+        if channel["mode"] != "html" or not channel.get("url_list"):
+            continue
+
+        url = channel["url_list"][0]
+        ses = get_session(channel.get("use_webvpn", ENABLE_WEBVPN))
+        try:
+            r = session_get(ses, url, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            print(f"跳过 {url}: {e}")
+            continue
+        r.encoding = r.apparent_encoding if r.apparent_encoding else "utf-8"
+
+        file_name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12] + ".html"
+        with open(os.path.join(PAGES_DIR, file_name), "w", encoding="utf-8") as f:
+            f.write(r.text)
+
+        manifest.append({
+            "file": file_name,
+            "url": url,
+            "site_name": channel["site_name"],
+            "channel_name": channel["channel_name"],
+            "html_config": channel.get("html_config", {}),
+            "base_link_url": channel.get("base_link_url", ""),
+            "max_count": channel.get("max_count", 5),
+        })
+        print(f"已保存: [{channel['site_name']}] {channel['channel_name']} -> {file_name}")
+
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"共保存 {len(manifest)} 个页面。")
+
+
+def run_benchmark(repeat: int):
+    """对已保存的页面逐一比较各解析后端的耗时与输出一致性。"""
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    pages = []
+    for entry in manifest:
+        with open(os.path.join(PAGES_DIR, entry["file"]), "r", encoding="utf-8") as f:
+            pages.append((entry, f.read()))
+
+    def parse_all(parser: str, scoped: bool) -> List[List[Dict[str, str]]]:
+        return [
+            parse_html_items(text, e["html_config"], e["base_link_url"], e["max_count"], parser, scoped)
+            for e, text in pages
+        ]
+
+    reference = parse_all("html.parser", False)
+
+    print(f"页面数: {len(pages)}，每种组合重复 {repeat} 次")
+    print(f"{'backend':<12} {'scoped':<7} {'total(s)':>9} {'ms/page':>9} {'pages/s':>9}  mismatches")
+
+    for backend, module in BACKENDS.items():
+        if module and find_spec(module) is None:
+            print(f"{backend:<12} 未安装，跳过")
+            continue
+
+        for scoped in (False, True):
+            if scoped and backend == "html5lib":
+                continue
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results = parse_all(backend, scoped)
+            elapsed = time.perf_counter() - start
+
+            mismatches = [
+                f"[{e['site_name']}] {e['channel_name']}" for (e, _), got, ref in zip(pages, results, reference) if got != ref
+            ]
+            page_count = max(len(pages) * repeat, 1)
+            print(
+                f"{backend:<12} {str(scoped):<7} {elapsed:>9.3f} "
+                f"{elapsed * 1000 / page_count:>9.2f} {page_count / max(elapsed, 1e-9):>9.1f}  "
+                f"{', '.join(mismatches) if mismatches else '-'}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 解析后端基准测试")
+    parser.add_argument("action", choices=["save", "run"], help="save: 保存列表页; run: 运行基准测试")
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="每种组合的重复次数")
+    args = parser.parse_args()
+
+    if args.action == "save":
+        save_pages()
+    else:
+        run_benchmark(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
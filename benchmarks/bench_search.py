@@ -0,0 +1,98 @@
+# benchmarks/bench_search.py
+"""
+全文索引分词后端基准测试：用数据库中的全部通知标题为每个后端建立索引，比较索引大小与查询延迟。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_search                          # 比较全部后端
+    python -m benchmarks.bench_search -b jieba_full -b bigram  # 只比较指定后端
+    python -m benchmarks.bench_search --queries queries.txt    # 使用自定义查询（每行一条）
+
+每个后端的索引建在内存数据库中（已 optimize），不改动 storage/notifier.db。
+查询经过与搜索命令相同的解析与规划（使用该索引自身的词元统计）；
+查询延迟取 n 次运行的中位数；命中数可用于比较各后端的召回差异。
+"""
+import argparse
+import sqlite3
+import statistics
+import time
+from typing import List
+
+from database import search_db
+from database.utils_db import get_db_connection
+
+# 默认查询：常见热词、多词、布尔查询与单字
+DEFAULT_QUERIES = [
+    "讲座", "奖学金", "研究生 招生", "学术报告", "讲座 OR 报告", "通知 NOT 讲座", "关于", "2025", "会",
+]
+
+
+def _load_titles() -> List[str]:
+    return [row["title"] for row in get_db_connection().execute("SELECT title FROM Notification ORDER BY id")]
+
+
+def _build_index(backend: search_db.FtsBackend, titles: List[str]) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    search_db.create_fts_table(cursor, "idx", backend)
+    cursor.executemany("INSERT INTO idx (rowid, title) VALUES (?, ?)", enumerate((backend.segment(t) for t in titles), 1))
+    cursor.execute("INSERT INTO idx (idx) VALUES ('optimize')")
+    conn.commit()
+    return conn
+
+
+def run_benchmark(backend_names: List[str], queries: List[str], repeat: int, limit: int):
+    titles = _load_titles()
+    print(f"通知数: {len(titles)}，查询数: {len(queries)}，每条查询重复 {repeat} 次（取中位数）")
+
+    for name in backend_names:
+        backend = search_db.get_backend(name)
+        start = time.perf_counter()
+        conn = _build_index(backend, titles)
+        build_seconds = time.perf_counter() - start
+        index_bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(block)), 0) FROM idx_data").fetchone()[0]
+        stats = search_db.VocabStats(conn, "idx")
+
+        print(f"\n[{name}] 建索引 {build_seconds:.2f}s，索引大小 {index_bytes / 1024:.0f} KiB")
+        print(f"  {'query':<16} {'ms':>8} {'hits':>7}  fts5 query")
+
+        latencies = []
+        for query in queries:
+            fts_query = search_db.parse_to_fts5_query(query, backend, stats)
+            if not fts_query:
+                print(f"  {query:<16} {'-':>8} {0:>7}  (空)")
+                continue
+
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute("SELECT rowid FROM idx WHERE idx MATCH ? ORDER BY rank LIMIT ?", (fts_query, limit)).fetchall()
+                samples.append(time.perf_counter() - start)
+            hits = conn.execute("SELECT COUNT(*) FROM idx WHERE idx MATCH ?", (fts_query,)).fetchone()[0]
+
+            latency = statistics.median(samples) * 1000
+            latencies.append(latency)
+            print(f"  {query:<16} {latency:>8.3f} {hits:>7}  {fts_query}")
+
+        if latencies:
+            print(f"  平均 {statistics.mean(latencies):.3f} ms，最慢 {max(latencies):.3f} ms")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文索引分词后端基准测试")
+    parser.add_argument("-b", "--backend", action="append", choices=list(search_db.FTS_BACKENDS), help="要比较的后端（可重复，默认全部）")
+    parser.add_argument("--queries", help="查询文件，每行一条（默认使用内置查询）")
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="每条查询的重复次数")
+    parser.add_argument("--limit", type=int, default=10, help="每次查询返回的结果数（与搜索命令一致）")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    run_benchmark(args.backend or list(search_db.FTS_BACKENDS), queries, args.repeat, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# benchmarks/common.py
+import json
+from typing import Any, Dict, List
+
+from crawler.config import SITES_FILE
+from database.database import _generate_task_list, _prepare_channel_data
+
+
+def load_channel_tasks(sites_file: str = SITES_FILE) -> List[Dict[str, Any]]:
+    """
+    直接从 sites.json 生成与 get_all_channels() 结构一致的栏目任务列表，
+    不读写数据库，便于在基准测试中离线使用。
+    """
+    with open(sites_file, "r", encoding="utf-8") as f:
+        sites_config = json.load(f)
+
+    channels = []
+    for index, task in enumerate(_generate_task_list(sites_config), 1):
+        site_name, channel_name, main_url, base_link_url, final_mode, config_json = _prepare_channel_data(task)
+        channels.append({
+            'channel_id': index,
+            'site_name': site_name,
+            'channel_name': channel_name,
+            'url': main_url,
+            'base_link_url': base_link_url,
+            'mode': final_mode,
+            **json.loads(config_json)
+        })
+    return channels
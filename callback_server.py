@@ -5,6 +5,8 @@ from dingtalk.stream_handler import start_dingtalk_client
 from dingtalk.message_handler import handle_user_command
 
 from config.secret_config import CLIENT_ID, CLIENT_SECRET
+from crawler import metrics
+from crawler.config import CALLBACK_METRICS_PORT
 
 
 def setup_logger():
@@ -32,6 +34,10 @@ def start_callback_server():
     logger = setup_logger()
     logger.info("--- 正在启动 Hazeron DingTalk Stream 客户端 ---")
 
+    # 搜索缓存命中率等指标
+    if CALLBACK_METRICS_PORT:
+        metrics.serve(CALLBACK_METRICS_PORT)
+
     try:
         # 调用封装好的函数：将 ID、Logger 和处理逻辑注入到客户端
         start_dingtalk_client(
@@ -1,27 +1,209 @@
 # crawler/api_handler.py
 
+import hashlib
 import requests
-import re
 import json
-from typing import Dict, Any, List
-from ZJUWebVPN import ZJUWebVPNSession
-from crawler.config import ENABLE_WEBVPN
-from config.secret_config import WEBVPN_NAME, WEBVPN_SECRET
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from crawler.config import ENABLE_WEBVPN, API_STREAM_CHUNK_SIZE
+from crawler import fetch_cache, metrics, page_archive
+from crawler.engine import iter_fetch, page_window, request_slot, request_timeout
+from crawler.extraction_plan import ApiPlan, get_api_plan, normalize_api_date
+from crawler.session_pool import get_session, session_get
 
+# 流式 JSON 解析为可选依赖：未安装 ijson 时，配置了 stream 的栏目回退到一次性解析
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
-def get_info_from_api(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
+_STREAM_FALLBACK_WARNED = False
+
+
+def _fetch_json(ses: requests.Session, api_url: str, headers: Dict[str, str], config_hash: str, timeout: Tuple[float, float]) -> Optional[Any]:
+    """请求单个 API 接口并解析 JSON，失败或响应未变化时返回 None。"""
+    print(f"  -> 正在处理 API 接口: {api_url}")
+
+    request_headers = {**headers, **fetch_cache.get_conditional_headers(api_url, config_hash)}
+    try:
+        with request_slot(api_url):
+            r = session_get(ses, api_url, headers=request_headers, timeout=timeout)
+        r.raise_for_status() 
+        if fetch_cache.is_unchanged(api_url, r, config_hash):
+            print(f"  -> 接口响应未变化，跳过解析: {api_url}")
+            return None
+        api_data = r.json()
+        page_archive.store(api_url, r.content, r.headers.get("Content-Type", ""))
+        return api_data
+    except requests.exceptions.RequestException as e:
+        print(f"API 请求 {api_url} 失败: {e}")
+        return None
+    except json.JSONDecodeError:
+        print(f"API 响应不是有效的 JSON: {api_url}")
+        return None
+
+
+def _resolve_data_list(api_data: Any, data_path) -> List[Any]:
+    """根据 data_path (例如: ["data", "records"]) 逐级向下查找实际的列表数据。"""
+    data_list = api_data
+    try:
+        for key in data_path:
+            if isinstance(data_list, dict):
+                data_list = data_list.get(key)
+            elif isinstance(data_list, list) and isinstance(key, int):
+                data_list = data_list[key]
+            else:
+                raise KeyError(f"无法从当前级别 {type(data_list)} 中找到键/索引: {key}")
+        
+        if not isinstance(data_list, list):
+            print(f"API 路径 {list(data_path)} 未指向一个有效的列表。")
+            data_list = []
+    except Exception as e:
+        print(f"解析 API 响应结构失败 (data_path: {list(data_path)}, 错误: {e})")
+        data_list = []
+
+    return data_list
+
+
+def _build_records(item_iter: Iterable[Any], plan: ApiPlan, base_link_url: str, max_count: int) -> List[Dict[str, str]]:
+    """从记录对象的迭代器中提取最多 max_count 条 {title, link, date}，达到数量后不再继续迭代。"""
+    items: List[Dict[str, str]] = []
+
+    for item_data in item_iter:
+        if not isinstance(item_data, dict):
+            continue
+
+        # 1. 提取数据（字段键名已在抽取计划中解析好）
+        title = str(item_data.get(plan.title_key, "N/A"))
+        date = normalize_api_date(item_data.get(plan.date_key, "N/A"))
+        link_value = item_data.get(plan.link_key, None)
+
+        # 2. 构造链接 (使用 link_key 提取的值和 base_link_url)
+        link = "N/A"
+
+        # --- 场景 1: base 和 value 都存在，进行拼接 (最常见情况) ---
+        if base_link_url and link_value is not None:
+            link = f"{base_link_url}{link_value}"
+
+        # --- 场景 3: 只有 value 存在 (API 返回完整链接或路径) ---
+        elif link_value is not None and not base_link_url:
+            link = str(link_value)
+
+        # --- 场景 2: 只有 base 存在 (没有详情页，链接就是列表/入口页) ---
+        elif link_value is None and base_link_url:
+            link = base_link_url
+            if title == "N/A":
+                continue
+
+        items.append({"title": title, "link": link, "date": date})
+
+        if len(items) >= max_count:
+            break
+
+    return items
+
+
+def extract_api_records(api_data: Any, plan: ApiPlan, base_link_url: str, max_count: int) -> List[Dict[str, str]]:
     """
-    根据 API 配置从 JSON 接口提取信息。
+    使用预编译的抽取计划从单个 API 响应中提取最多 max_count 条 {title, link, date}。
+    """
+    return _build_records(_resolve_data_list(api_data, plan.data_path), plan, base_link_url, max_count)
+
+
+# ====================================================================
+# 流式解析：按块读取响应体，沿 data_path 增量解析，取够 max_count 条即停止
+# ====================================================================
+
+
+class _HashingReader:
+    """供 ijson 读取的类文件对象：按块读取（已解压的）响应体，同时计算已读取部分的摘要。"""
+
+    def __init__(self, r: requests.Response):
+        self._chunks = r.iter_content(API_STREAM_CHUNK_SIZE)
+        self._digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        # ijson 会先调用 read(0) 判断返回 bytes 还是 str，此时不能消耗数据块
+        if size == 0:
+            return b""
+        chunk = next(self._chunks, b"")
+        self._digest.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def _stream_records(
+    ses: requests.Session,
+    api_url: str,
+    headers: Dict[str, str],
+    config_hash: str,
+    timeout: Tuple[float, float],
+    plan: ApiPlan,
+    base_link_url: str,
+    max_count: int,
+    labels: Dict[str, str]
+) -> Optional[List[Dict[str, str]]]:
+    """
+    流式请求单个 API 接口，只读取到第 max_count 条记录所在的数据块为止。
+    抓取缓存使用已读取部分的摘要：前 max_count 条记录不变时，该部分的字节也不变。
+    响应体没有被完整读取，因此不写入页面归档。
+    解析与读取响应体交替进行，两者一起计入解析耗时。
+
+    :return: 条目列表；失败或响应未变化时返回 None。
+    """
+    print(f"  -> 正在流式处理 API 接口: {api_url}")
+
+    request_headers = {**headers, **fetch_cache.get_conditional_headers(api_url, config_hash)}
+    try:
+        # 响应体在占用并发名额期间读取，名额仍然对应实际占用的连接
+        with request_slot(api_url):
+            with session_get(ses, api_url, headers=request_headers, timeout=timeout, stream=True) as r:
+                r.raise_for_status()
+                if r.status_code == 304:
+                    print(f"  -> 接口响应未变化，跳过解析: {api_url}")
+                    return None
+
+                reader = _HashingReader(r)
+                with metrics.timer("crawler_parse_seconds", labels):
+                    records = _build_records(ijson.items(reader, plan.stream_prefix, use_float=True), plan, base_link_url, max_count)
+
+        if fetch_cache.is_unchanged(api_url, r, config_hash, body_hash=reader.hexdigest()):
+            print(f"  -> 接口响应未变化，跳过解析: {api_url}")
+            return None
+        return records
+    except requests.exceptions.RequestException as e:
+        print(f"API 请求 {api_url} 失败: {e}")
+        return None
+    except ijson.JSONError:
+        print(f"API 响应不是有效的 JSON: {api_url}")
+        return None
+
+
+def _use_streaming(plan: ApiPlan) -> bool:
+    """判断是否对该抽取计划使用流式解析；配置了 stream 但未安装 ijson 时打印一次提示。"""
+    global _STREAM_FALLBACK_WARNED
+
+    if plan.stream_prefix is None:
+        return False
+    if ijson is None:
+        if not _STREAM_FALLBACK_WARNED:
+            _STREAM_FALLBACK_WARNED = True
+            print("[API] 未安装 ijson，stream 模式回退到一次性解析（pip install ijson）")
+        return False
+    return True
+
+
+def iter_api_pages(channel_task: Dict[str, Any]) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    根据 API 配置从 JSON 接口提取信息，逐个接口产出 (url, 条目迭代器)。
 
     :param channel_task: 包含完整配置的单个栏目任务字典（来自数据库）。
-    :return: 包含字典（title, link, date）的列表。
+    :return: (url, 包含字典（title, link, date）的迭代器) 的迭代器。
     """
     # 根据全局配置和每个 channel 的可选覆盖决定使用哪种会话
     use_webvpn = channel_task.get("use_webvpn", ENABLE_WEBVPN)
-    if use_webvpn:
-        ses = ZJUWebVPNSession(WEBVPN_NAME, WEBVPN_SECRET)
-    else:
-        ses = requests.Session()
+    ses = get_session(use_webvpn)
     api_config = channel_task.get("api_config", {})
     max_count = channel_task.get("max_count", 5) 
     base_link_url = channel_task.get("base_link_url", "") # 【修正】从顶层获取
@@ -29,115 +211,82 @@ def get_info_from_api(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
 
     site_name = channel_task.get("site_name", "Unknown")
     channel_name = channel_task.get("channel_name", "Unknown")
-    fields_map = api_config.get("fields_map", {})
-    data_path = api_config.get("data_path", []) 
     
     # 2. 基础配置验证
     if not url_list or not isinstance(url_list, list):
         print(f"错误: 栏目 [{site_name}] {channel_name} 的 url_list 配置无效。")
-        return []
+        return
+
+    if not base_link_url:
+        print(f"API 配置不完整（base_link_url 缺失），跳过栏目: {channel_name}")
+        return
 
-    if not fields_map or not base_link_url:
-        print(f"API 配置不完整（base_link_url 或 fields_map 缺失），跳过栏目: {channel_name}")
-        return []
+    try:
+        plan = get_api_plan(api_config)
+    except ValueError as e:
+        print(f"API 配置无效（{e}），跳过栏目: {channel_name}")
+        return
 
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
         "Accept": "application/json",
     }
 
-    items: List[Dict[str, str]] = []
+    # 3. 按窗口并发请求 API URL (支持多 URL 爬取)，结果按 url_list 顺序返回
+    config_hash = fetch_cache.config_fingerprint(channel_task)
+    timeout = request_timeout(channel_task)
+    streaming = _use_streaming(plan)
+    labels = metrics.channel_labels(channel_task)
 
-    # 3. 循环处理每一个 API URL (支持多 URL 爬取)
-    for api_url in url_list:
-        current_item_count = 0
-        if not api_url: continue
-        
-        print(f"  -> 正在处理 API 接口: {api_url}")
-        
-        # 请求 API
-        try:
-            r = ses.get(api_url, headers=headers, timeout=10)
-            r.raise_for_status() 
-            api_data = r.json()
-        except requests.exceptions.RequestException as e:
-            print(f"API 请求 {api_url} 失败: {e}")
-            continue
-        except json.JSONDecodeError:
-            print(f"API 响应不是有效的 JSON: {api_url}")
+    def fetch_records(api_url: str) -> Optional[List[Dict[str, str]]]:
+        if streaming:
+            return _stream_records(ses, api_url, headers, config_hash, timeout, plan, base_link_url, max_count, labels)
+
+        api_data = _fetch_json(ses, api_url, headers, config_hash, timeout)
+        if api_data is None:
+            return None
+        with metrics.timer("crawler_parse_seconds", labels):
+            return extract_api_records(api_data, plan, base_link_url, max_count)
+
+    responses = iter_fetch(url_list, fetch_records, page_window(channel_task))
+
+    for api_url, records in responses:
+        if records is None:
             continue
 
-        # --- 遍历数据路径 ---
-        data_list = api_data
-        try:
-            # 根据 data_path (例如: ["data", "records"]) 逐级向下查找实际的列表数据
-            for key in data_path:
-                if isinstance(data_list, dict):
-                    data_list = data_list.get(key)
-                elif isinstance(data_list, list) and isinstance(key, int):
-                    data_list = data_list[key]
-                else:
-                    raise KeyError(f"无法从当前级别 {type(data_list)} 中找到键/索引: {key}")
-            
-            if not isinstance(data_list, list):
-                print(f"API 路径 {data_path} 未指向一个有效的列表。")
-                data_list = []
-        except Exception as e:
-            print(f"解析 API 响应结构失败 (data_path: {data_path}, 错误: {e})")
-            data_list = []
+        yield api_url, iter(records)
 
-        # --- 提取字段并构造链接 ---
+        # 单个接口达到 max_count 时停止
+        if len(records) >= max_count:
+            return
 
-        for item_data in data_list:
-            if not isinstance(item_data, dict):
-                continue
 
-            # 提取字段的 API 键名
-            title_api_key = fields_map.get("title", "title")
-            date_api_key = fields_map.get("date", "publishTime")
-            link_api_key = fields_map.get("link_key", "newsId") 
-            
-            # 1. 提取数据
-            title = str(item_data.get(title_api_key, "N/A"))
-            raw_date = item_data.get(date_api_key, "N/A")
-            link_value = item_data.get(link_api_key, None)
-            
-            # 2. 清理日期格式
-            date = "N/A"
-            date_str = str(raw_date).strip()
-            
-            if date_str != "N/A":
-                if 'T' in date_str:
-                    extracted_date_part = date_str.split('T')[0]
-                elif ' ' in date_str:
-                    extracted_date_part = date_str.split(' ')[0]
-                else:
-                    extracted_date_part = date_str
-                
-                if re.match(r'^\d{4}[-/]\d{2}[-/]\d{2}$', extracted_date_part):
-                    date = extracted_date_part
-            
-            # 3. 构造链接 (使用 link_key 提取的值和 base_link_url)
-            link = "N/A"
-
-            # --- 场景 1: base 和 value 都存在，进行拼接 (最常见情况) ---
-            if base_link_url and link_value is not None:
-                link = f"{base_link_url}{link_value}"
-
-            # --- 场景 3: 只有 value 存在 (API 返回完整链接或路径) ---
-            elif link_value is not None and not base_link_url:
-                link = str(link_value)
-
-            # --- 场景 2: 只有 base 存在 (没有详情页，链接就是列表/入口页) ---
-            elif link_value is None and base_link_url:
-                link = base_link_url
-                if title == "N/A":
-                    continue
-
-            items.append({"title": title, "link": link, "date": date})
-            current_item_count += 1
-
-            if current_item_count >= max_count:
-                return items
-    
-    return items
+def get_info_from_api(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    根据 API 配置从 JSON 接口提取信息。
+
+    :param channel_task: 包含完整配置的单个栏目任务字典（来自数据库）。
+    :return: 包含字典（title, link, date）的列表。
+    """
+    return [item for _, records in iter_api_pages(channel_task) for item in records]
+
+
+def iter_archived_api_pages(channel_task: Dict[str, Any], all_versions: bool = False) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    从页面归档中读取 url_list 的 API 响应，用当前的抽取计划重新解析，不发起任何网络请求。
+
+    :param all_versions: 是否解析每个 URL 的全部历史版本（否则只解析最新版本）。
+    :return: (url, 条目迭代器) 的迭代器。
+    """
+    plan = get_api_plan(channel_task.get("api_config", {}))
+    base_link_url = channel_task.get("base_link_url", "")
+    max_count = channel_task.get("max_count", 5)
+
+    for url in channel_task.get("url_list", []):
+        for page in page_archive.load(url, all_versions):
+            try:
+                api_data = json.loads(page.body)
+            except ValueError:
+                print(f"归档的 API 响应不是有效的 JSON: {url} ({page.last_seen})")
+                continue
+            yield url, iter(extract_api_records(api_data, plan, base_link_url, max_count))
\ No newline at end of file
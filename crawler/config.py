@@ -1,3 +1,112 @@
 SITES_FILE = "config/sites.json"
 
-ENABLE_WEBVPN = True
\ No newline at end of file
+ENABLE_WEBVPN = True
+
+# WebVPN 会话持久化：保存登录后的 Cookie，下次运行时优先复用，失效后自动重新登录
+PERSIST_WEBVPN_SESSION = True
+WEBVPN_SESSION_FILE = "storage/webvpn_session.json"
+
+# --------------------------------------------------
+# 并发抓取配置
+# --------------------------------------------------
+MAX_CHANNEL_WORKERS = 16        # 同时处理的栏目（Channel）数量
+MAX_CONCURRENT_REQUESTS = 16    # 全局同时进行的 HTTP 请求上限
+MAX_REQUESTS_PER_HOST = 4       # 单个主机同时进行的 HTTP 请求上限
+REQUEST_TIMEOUT = 10            # 单次请求的读取超时时间（秒），可在栏目配置 timeout 中覆盖
+CONNECT_TIMEOUT = 5             # 建立连接的超时时间（秒），可在栏目配置 timeout 中覆盖
+HTTP_POOL_HOSTS = 32            # 共享会话中保留 keep-alive 连接池的主机数
+
+# 流式去重：某页连续遇到 N 条最近的已入库通知即停止解析该页（0 表示关闭），可在栏目配置 stop_after_known 中覆盖
+# 只有发布日期不早于栏目第 N 新通知的条目才计数，置顶的旧通知与没有日期的条目不会触发停止
+STOP_AFTER_KNOWN = 5
+# 流式去重时每批查询数据库的条目数
+DEDUPE_BATCH_SIZE = 10
+
+# HTML 解析后端："html.parser" / "lxml"（C 实现，更快）/ "html5lib"，可在 html_config.parser 中按栏目覆盖
+# 不同后端对不规范页面抽取出的标题、链接可能不同，而二者决定通知指纹；切换后已推送的通知会被当作新通知再次推送。
+# 因此默认保持 html.parser，只对经 benchmarks/bench_html_parsers 验证输出一致的栏目单独开启 lxml
+HTML_PARSER = "html.parser"
+# 仅解析 list_selector 所在子树（SoupStrainer），可在 html_config.scoped_parsing 中按栏目开启（同样需先验证输出一致）
+HTML_SCOPED_PARSING = False
+
+# 条件请求缓存：页面未变化 (304 / 响应体摘要相同) 时跳过解析与去重
+ENABLE_FETCH_CACHE = True
+
+# --------------------------------------------------
+# 主机限速与熔断
+# --------------------------------------------------
+HOST_RATE_PER_SEC = 2.0         # 单个主机的令牌桶速率（请求/秒）
+HOST_BURST = 4                  # 单个主机允许的突发请求数（令牌桶容量）
+WEBVPN_RATE_PER_SEC = 8.0       # 经 WebVPN 转发的全部请求的总速率，避免被 WebVPN 限流
+WEBVPN_BURST = 16
+
+BACKOFF_BASE = 1.0              # 请求失败后，下次请求该主机前的等待时间基数（秒），按连续失败次数指数增长
+BACKOFF_MAX = 30.0              # 单次退避等待的上限（秒）
+
+CIRCUIT_ERROR_RATE = 0.6        # 主机错误率（指数滑动平均，慢请求也计为错误）达到该值时熔断
+CIRCUIT_SLOW_SECONDS = 5.0      # 耗时超过该值的请求视为慢请求
+CIRCUIT_COOLDOWN_BASE = 300     # 首次熔断的冷却时间（秒），连续熔断时指数增长
+CIRCUIT_COOLDOWN_MAX = 6 * 3600 # 冷却时间上限（秒）
+CIRCUIT_PROBE_TIMEOUT = CONNECT_TIMEOUT + REQUEST_TIMEOUT  # 探测请求超过该时间（秒）仍未记录结果时视为丢失，允许新的探测请求
+HOST_STATE_FILE = "storage/host_state.json"  # 主机健康状态持久化文件，跨运行保留熔断信息
+
+# --------------------------------------------------
+# daemon 模式：按栏目更新频率自适应调度
+# --------------------------------------------------
+DAEMON_HISTORY_DAYS = 60            # 估计栏目更新频率时参考的推送历史天数
+DAEMON_POLLS_PER_UPDATE = 4         # 平均每两次更新之间轮询的次数
+DAEMON_MIN_INTERVAL = 10 * 60       # 单个栏目的最短轮询间隔（秒）
+DAEMON_MAX_INTERVAL = 12 * 3600     # 单个栏目的最长轮询间隔（秒）
+DAEMON_JITTER = 0.2                 # 轮询间隔的随机抖动比例（±20%），避免所有栏目同时到期
+DAEMON_IDLE_CHECK = 60              # 空闲时最长睡眠时间（秒），期间会检查 sites.json 是否变化
+DAEMON_HEARTBEAT_INTERVAL = 24 * 3600  # 持续无新通知时，发送“无通知”心跳消息的间隔（秒）
+
+# 原始页面归档：按内容寻址压缩保存所有抓取到的列表页 / API 响应，供 reextract 离线重新抽取
+ENABLE_PAGE_ARCHIVE = True
+PAGE_ARCHIVE_DIR = "storage/archive"
+PAGE_ARCHIVE_LEVEL = 9          # 压缩级别（zstd 1-22；回退到 zlib 时最高为 9）
+PAGE_ARCHIVE_KEEP_VERSIONS = 20 # 每个 URL 最多保留的版本数（0 表示不限）；最新版本总是保留
+PAGE_ARCHIVE_MAX_DAYS = 180     # 超过该天数未再出现的版本被删除（0 表示不限）
+
+# API 流式解析（api_config.stream 为 true 且安装了 ijson 时）每次读取的响应体块大小（字节）
+API_STREAM_CHUNK_SIZE = 64 * 1024
+
+# 订阅源（feed 模式）声明的 ttl 期间不再请求；ttl 超过该值（秒）时按该值计算
+FEED_MAX_TTL = 24 * 3600
+
+# 抓取指标：每轮运行的耗时与计数写入 CrawlMetrics 表，累计值以 Prometheus 文本格式写入 METRICS_FILE
+ENABLE_METRICS = True
+METRICS_FILE = "storage/metrics.prom"
+METRICS_RETENTION_DAYS = 30     # CrawlMetrics 表保留的天数
+METRICS_PORT = None             # daemon 模式下在 127.0.0.1 的该端口提供 /metrics，None 表示不启动
+CALLBACK_METRICS_PORT = None    # callback 模式下在 127.0.0.1 的该端口提供 /metrics（搜索缓存命中率等），None 表示不启动
+
+# 搜索分词：jieba 前缀词典预构建为可内存映射的缓存文件（首次使用时自动生成）；
+# 用户词典每行 "词语 [词频] [词性]"，用于补充校园专有名词，修改后运行 reindex 使已入库的通知生效
+JIEBA_CACHE_FILE = "storage/jieba_prefix.bin"
+JIEBA_USER_DICT = "config/user_dict.txt"
+# 全文索引的分词后端："jieba_full"（全模式）/ "jieba_precise"（精确模式）/ "bigram"（二字词）/ "trigram"（FTS5 内置）
+# 新建数据库时使用；已有索引沿用建立时的后端，修改后运行 reindex 才会切换
+FTS_TOKENIZER = "jieba_full"
+# 搜索查询缓存（LRU）的容量：规范化关键词 -> FTS5 查询，以及纯文本搜索词 -> 分词后的子句
+SEARCH_QUERY_CACHE_SIZE = 1024
+SEARCH_TERM_CACHE_SIZE = 4096
+# 搜索结果缓存（LRU）的容量：(数据版本, 关键词, 条数) -> 结果；新通知入库时数据版本递增，缓存随之失效
+SEARCH_RESULT_CACHE_SIZE = 256
+# 查询规划：短于前缀索引的前缀（如 jieba 后端的单字 "会"*）匹配的词元超过 PLANNER_PREFIX_MAX_TERMS 个时，
+# 改为其中文档数最多的 PLANNER_PREFIX_EXPANSION 个词元，避免合并大量倒排列表
+PLANNER_PREFIX_MAX_TERMS = 200
+PLANNER_PREFIX_EXPANSION = 32
+
+# HTML 解析进程数：None 表示使用全部 CPU 核心，0 或 1 表示不使用进程池（在抓取线程中流式解析）
+# 单次运行（process / reextract）只解析少量小页面，进程池的启动开销（forkserver + 每个进程重新导入 bs4 等）得不偿失，默认不使用
+PARSE_PROCESSES = 0
+# daemon / backfill 模式的解析进程数：进程池只在启动时创建一次，且页面数量多，可摊薄启动开销
+LONG_RUN_PARSE_PROCESSES = None
+
+# --------------------------------------------------
+# backfill 模式：按 pagination 配置回填栏目的历史通知
+# --------------------------------------------------
+BACKFILL_MAX_PAGES = 200        # 每个栏目最多回填的页数（可用 --max-pages 覆盖）
+BACKFILL_WINDOW = 4             # 每个栏目同时在途的分页请求数
+BACKFILL_PAGE_ITEMS = 1000      # 回填时单页最多抽取的条目数（取代 max_count）
\ No newline at end of file
@@ -0,0 +1,180 @@
+# crawler/engine.py
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterator, List, Tuple, Union
+from urllib.parse import urlparse
+
+from crawler import host_guard, metrics
+from crawler.config import MAX_CHANNEL_WORKERS, MAX_CONCURRENT_REQUESTS, MAX_REQUESTS_PER_HOST, CONNECT_TIMEOUT, REQUEST_TIMEOUT
+
+# ====================================================================
+# 1. 并发限制：全局请求上限 + 单主机请求上限
+# ====================================================================
+
+_GLOBAL_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+_HOST_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+
+def _get_host_slots(host: str) -> threading.BoundedSemaphore:
+    """获取（必要时创建）某个主机对应的信号量。"""
+    with _HOST_SLOTS_LOCK:
+        slots = _HOST_SLOTS.get(host)
+        if slots is None:
+            slots = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+            _HOST_SLOTS[host] = slots
+        return slots
+
+
+@contextmanager
+def request_slot(url: str):
+    """
+    在发起 HTTP 请求前占用一个并发名额。
+    先获取主机名额再获取全局名额，避免排队等待某个慢主机时占用全局名额；
+    主机的限速等待同样发生在获取全局名额之前。
+
+    :raises host_guard.HostUnavailableError: 主机处于熔断冷却期。
+    """
+    host = (urlparse(url).hostname or "").lower()
+    with _get_host_slots(host):
+        try:
+            host_guard.acquire(host)
+        except host_guard.HostUnavailableError:
+            metrics.inc("crawler_request_errors_total", {"host": host, "type": "circuit_open"})
+            raise
+        with _GLOBAL_SLOTS:
+            yield
+
+
+def request_timeout(channel_task: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    计算栏目请求的 (连接超时, 读取超时)，直接传给 requests 的 timeout 参数。
+
+    栏目配置 timeout 可以是数字（读取超时）或 {"connect": 秒, "read": 秒}，未设置的部分使用全局默认值。
+
+    :raises ValueError: timeout 配置无效。
+    """
+    timeout: Union[None, int, float, Dict[str, Any]] = channel_task.get("timeout")
+    if timeout is None:
+        return float(CONNECT_TIMEOUT), float(REQUEST_TIMEOUT)
+
+    if isinstance(timeout, dict):
+        connect, read = timeout.get("connect", CONNECT_TIMEOUT), timeout.get("read", REQUEST_TIMEOUT)
+    else:
+        connect, read = CONNECT_TIMEOUT, timeout
+
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0 for value in (connect, read)):
+        raise ValueError(f"timeout 必须是正数或 {{\"connect\": 秒, \"read\": 秒}}: {timeout!r}")
+    return float(connect), float(read)
+
+
+# ====================================================================
+# 2. 长期复用的线程池
+#
+# 工作线程在多次运行之间保持存活（daemon 模式），线程内的数据库连接
+# 因此无需反复创建。栏目任务与页面请求使用不同的线程池：栏目任务会等待
+# 页面请求的结果，若共用同一个有界线程池可能相互等待而死锁。
+# ====================================================================
+
+_POOLS: Dict[str, ThreadPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_pool(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """获取（必要时创建）指定名称的共享线程池。"""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"crawler-{name}")
+            _POOLS[name] = pool
+        return pool
+
+
+def _cancel_and_wait(futures: List[Future]):
+    """取消尚未开始的任务，并等待已经开始的任务结束。"""
+    running = [future for future in futures if not future.cancel()]
+    if running:
+        wait(running)
+
+
+# ====================================================================
+# 3. 栏目内并发：按需、按顺序抓取 url_list 中的多个页面
+# ====================================================================
+
+def page_window(channel_task: Dict[str, Any]) -> int:
+    """
+    计算栏目内同时在途的页面请求数。
+
+    url_list 为同一列表的连续分页（paginated）时只预取下一页，
+    以便遇到已知通知提前停止时不浪费请求；否则各 URL 互相独立，按单主机上限并发。
+    任务中的 page_window 键（backfill 使用）优先于上述规则。
+    """
+    if channel_task.get("page_window"):
+        return channel_task["page_window"]
+    return 2 if channel_task.get("paginated", False) else MAX_REQUESTS_PER_HOST
+
+
+def iter_fetch(url_list: List[str], fetch_func: Callable[[str], Any], window: int) -> Iterator[Tuple[str, Any]]:
+    """
+    以滑动窗口并发执行 fetch_func，按 url_list 原顺序逐个产出结果。
+
+    调用方停止迭代（或关闭生成器）后不再提交新的请求，尚未开始的请求会被取消，
+    正在进行的请求会等待其结束后再返回。
+
+    :param url_list: 栏目配置中的 URL 列表（空值会被跳过）。
+    :param fetch_func: 接收单个 URL 并返回抓取结果的函数。
+    :param window: 同时在途的最大请求数。
+    :return: (url, 结果) 的迭代器。
+    """
+    urls = iter([url for url in url_list if url])
+    pool = _get_pool("page", MAX_CONCURRENT_REQUESTS)
+    pending: Deque[Tuple[str, Future]] = deque()
+
+    try:
+        for url in islice(urls, max(1, window)):
+            pending.append((url, pool.submit(fetch_func, url)))
+
+        while pending:
+            url, future = pending.popleft()
+            result = future.result()
+
+            next_url = next(urls, None)
+            if next_url is not None:
+                pending.append((next_url, pool.submit(fetch_func, next_url)))
+
+            yield url, result
+    finally:
+        _cancel_and_wait([future for _, future in pending])
+
+
+# ====================================================================
+# 4. 栏目间并发：按原顺序产出每个栏目的抓取结果
+# ====================================================================
+
+def crawl_channels(
+    channels: List[Dict[str, Any]],
+    crawl_func: Callable[[Dict[str, Any]], Any]
+) -> Iterator[Tuple[Dict[str, Any], Any]]:
+    """
+    使用线程池并发抓取所有栏目。
+
+    结果严格按照 channels 的顺序产出，因此后续的去重和推送顺序与串行执行时一致；
+    总耗时约等于最慢的若干站点，而不是所有站点耗时之和。
+
+    :param channels: get_all_channels() 返回的栏目任务列表。
+    :param crawl_func: 处理单个栏目的函数（通常为 fetcher.get_latest_info）。
+    :return: (channel, 抓取结果) 的迭代器。
+    """
+    if not channels:
+        return
+
+    pool = _get_pool("channel", MAX_CHANNEL_WORKERS)
+    futures = [pool.submit(crawl_func, channel) for channel in channels]
+    try:
+        for channel, future in zip(channels, futures):
+            yield channel, future.result()
+    finally:
+        _cancel_and_wait(futures)
@@ -0,0 +1,280 @@
+# crawler/extraction_plan.py
+import json
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import soupsieve
+from bs4 import SoupStrainer
+from crawler.config import HTML_PARSER, HTML_SCOPED_PARSING
+from crawler.pagination import validate_pagination
+from crawler.engine import request_timeout
+
+# ====================================================================
+# 1. 抽取计划：栏目配置编译后的不可变结果
+#
+# 选择器、正则和字段映射只在首次使用时编译一次，并按配置内容缓存，
+# 同一配置的所有 URL（以及同一进程内的后续运行）直接复用。
+# ====================================================================
+
+
+@dataclass(frozen=True)
+class HtmlPlan:
+    """HTML 模式的抽取计划。"""
+    list_selector: str
+    list_matcher: soupsieve.SoupSieve
+    title_matcher: Optional[soupsieve.SoupSieve]
+    date_matcher: Optional[soupsieve.SoupSieve]
+    date_pattern: Optional[re.Pattern]
+    date_format: str
+    parser: str
+    strainer: Optional[SoupStrainer]
+
+
+@dataclass(frozen=True)
+class ApiPlan:
+    """API 模式的抽取计划。"""
+    data_path: Tuple[Union[str, int], ...]
+    title_key: str
+    date_key: str
+    link_key: str
+    # 流式解析时 ijson 使用的前缀（如 "data.records.item"），未启用流式解析时为 None
+    stream_prefix: Optional[str] = None
+
+
+ExtractionPlan = Union[HtmlPlan, ApiPlan]
+
+# 所有列表项中兜底查找链接时使用的选择器
+ANCHOR_MATCHER = soupsieve.compile("a")
+
+_PLAN_CACHE: Dict[str, ExtractionPlan] = {}
+_PLAN_CACHE_LOCK = threading.Lock()
+
+
+# ====================================================================
+# 2. 日期规范化（固定正则预编译）
+# ====================================================================
+
+_DATE_YMD_RE = re.compile(r"(\d{4})[^\d](\d{1,2})[^\d](\d{1,2})[^\d]*")
+_DATE_YM_RE = re.compile(r"(\d{4})[^\d](\d{1,2})")
+_API_DATE_RE = re.compile(r'^\d{4}[-/]\d{2}[-/]\d{2}$')
+
+
+def normalize_html_date(date: str) -> str:
+    """将 HTML 中提取到的日期文本规范化为 YYYY-MM-DD（仅有年月时日为 00）。"""
+    if date == "N/A":
+        return date
+
+    # 匹配 YYYY-MM-DD 格式
+    date_match = _DATE_YMD_RE.search(date)
+    if date_match:
+        year = date_match.group(1)
+        month = date_match.group(2).zfill(2)
+        day = date_match.group(3).zfill(2)
+        return f"{year}-{month}-{day}"
+
+    # 尝试匹配 YYYY-MM 格式
+    date_match_month = _DATE_YM_RE.search(date)
+    if date_match_month:
+        year = date_match_month.group(1)
+        month = date_match_month.group(2).zfill(2)
+        return f"{year}-{month}-00"
+
+    return "N/A"
+
+
+def normalize_api_date(raw_date: Any) -> str:
+    """将 API 返回的日期（可能带时间部分）规范化为 YYYY-MM-DD，无法识别时返回 N/A。"""
+    date_str = str(raw_date).strip()
+    if date_str == "N/A":
+        return "N/A"
+
+    if 'T' in date_str:
+        extracted_date_part = date_str.split('T')[0]
+    elif ' ' in date_str:
+        extracted_date_part = date_str.split(' ')[0]
+    else:
+        extracted_date_part = date_str
+
+    return extracted_date_part if _API_DATE_RE.match(extracted_date_part) else "N/A"
+
+
+# ====================================================================
+# 3. 编译
+# ====================================================================
+
+# 匹配选择器的第一个复合选择器，例如 "ul.news_list.list2"、"div#wp_news_w6"、"ul[class*='x']"
+_FIRST_COMPOUND_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)((?:\[[^\]]*\])*)$")
+
+
+def _build_list_strainer(list_selector: str) -> Optional[SoupStrainer]:
+    """
+    根据 list_selector 的第一个复合选择器构造 SoupStrainer，使解析器只构建相关子树。
+    无法安全推导时（分组选择器、伪类、与兄弟位置相关的选择器等）返回 None，回退到完整解析。
+    """
+    # 分组选择器与兄弟组合器（+ / ~）依赖子树之外的元素，无法安全裁剪
+    if any(ch in list_selector for ch in ",+~"):
+        return None
+
+    first_compound = list_selector.split()[0]
+    match = _FIRST_COMPOUND_RE.match(first_compound)
+    if not match:
+        return None
+
+    tag_name, simple_part, _attr_part = match.groups()
+    attrs: Dict[str, str] = {}
+    for token in re.findall(r"[.#][\w-]+", simple_part):
+        if token[0] == "#":
+            attrs["id"] = token[1:]
+        elif "class" not in attrs:
+            # SoupStrainer 仅按单个 class 过滤，其余 class 由后续的完整选择器精确匹配
+            attrs["class"] = token[1:]
+
+    if not tag_name and not attrs:
+        return None
+    return SoupStrainer(tag_name, attrs=attrs)
+
+
+def _compile_selector(selector: Optional[str], field: str) -> Optional[soupsieve.SoupSieve]:
+    """编译 CSS 选择器，语法错误时抛出带字段名的 ValueError。"""
+    if not selector:
+        return None
+    try:
+        return soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"{field} 不是有效的 CSS 选择器: {selector!r} ({e})")
+
+
+def _compile_html_plan(html_config: Dict[str, Any]) -> HtmlPlan:
+    """将 html_config 编译为 HtmlPlan。"""
+    selectors = html_config.get("selectors") or {}
+
+    list_selector = selectors.get("list_selector")
+    if not list_selector:
+        raise ValueError("缺少 list_selector")
+
+    date_pattern = None
+    date_format = "$1"
+    date_regex_config = selectors.get("date_regex") or {}
+    if date_regex_config.get("pattern"):
+        try:
+            date_pattern = re.compile(date_regex_config["pattern"], re.IGNORECASE | re.DOTALL)
+        except re.error as e:
+            raise ValueError(f"date_regex.pattern 不是有效的正则表达式: {e}")
+        date_format = date_regex_config.get("format") or "$1"
+
+    parser = html_config.get("parser", HTML_PARSER)
+    if parser not in ("lxml", "html.parser", "html5lib"):
+        raise ValueError(f"未知的 HTML 解析后端: {parser}")
+
+    # html5lib 不支持 parse_only，因此不使用 scoped 模式
+    scoped = html_config.get("scoped_parsing", HTML_SCOPED_PARSING) and parser != "html5lib"
+
+    return HtmlPlan(
+        list_selector=list_selector,
+        list_matcher=_compile_selector(list_selector, "list_selector"),
+        title_matcher=_compile_selector(selectors.get("title_selector"), "title_selector"),
+        date_matcher=_compile_selector(selectors.get("date_selector"), "date_selector"),
+        date_pattern=date_pattern,
+        date_format=date_format,
+        parser=parser,
+        strainer=_build_list_strainer(list_selector) if scoped else None,
+    )
+
+
+def _compile_api_plan(api_config: Dict[str, Any]) -> ApiPlan:
+    """将 api_config 编译为 ApiPlan。"""
+    fields_map = api_config.get("fields_map") or {}
+    if not fields_map:
+        raise ValueError("缺少 fields_map")
+
+    data_path = api_config.get("data_path") or []
+    if not isinstance(data_path, list) or not all(isinstance(k, (str, int)) for k in data_path):
+        raise ValueError(f"data_path 必须是由字符串或整数组成的列表: {data_path!r}")
+
+    # 流式解析按前缀定位列表：ijson 的前缀无法表达数组下标，也无法区分键名中的 "."
+    stream_prefix = None
+    if api_config.get("stream", False):
+        if not all(isinstance(k, str) and k and "." not in k for k in data_path):
+            raise ValueError(f"stream 模式的 data_path 只能包含不含 '.' 的字符串键: {data_path!r}")
+        stream_prefix = ".".join(list(data_path) + ["item"])
+
+    return ApiPlan(
+        data_path=tuple(data_path),
+        title_key=fields_map.get("title", "title"),
+        date_key=fields_map.get("date", "publishTime"),
+        link_key=fields_map.get("link_key", "newsId"),
+        stream_prefix=stream_prefix,
+    )
+
+
+def _get_cached(mode: str, config: Dict[str, Any]) -> ExtractionPlan:
+    """按 (模式, 配置内容) 缓存编译结果。"""
+    key = mode + ":" + json.dumps(config, sort_keys=True, ensure_ascii=False)
+
+    plan = _PLAN_CACHE.get(key)
+    if plan is None:
+        plan = _compile_html_plan(config) if mode == "html" else _compile_api_plan(config)
+        with _PLAN_CACHE_LOCK:
+            _PLAN_CACHE[key] = plan
+    return plan
+
+
+def get_html_plan(html_config: Dict[str, Any]) -> HtmlPlan:
+    """获取 html_config 对应的（缓存的）抽取计划。"""
+    return _get_cached("html", html_config)
+
+
+def get_api_plan(api_config: Dict[str, Any]) -> ApiPlan:
+    """获取 api_config 对应的（缓存的）抽取计划。"""
+    return _get_cached("api", api_config)
+
+
+# ====================================================================
+# 4. 加载期校验：在任何网络请求之前发现错误配置
+# ====================================================================
+
+def compile_channel_plan(channel_task: Dict[str, Any]) -> Optional[ExtractionPlan]:
+    """
+    编译并校验单个栏目的抽取计划（feed 模式的字段映射是固定的，没有抽取计划，返回 None）。
+
+    :raises ValueError: 配置无效时抛出，消息说明具体原因。
+    """
+    mode = channel_task.get("mode", "html").lower()
+
+    url_list = channel_task.get("url_list", [])
+    if not url_list or not isinstance(url_list, list):
+        raise ValueError("url_list 配置无效")
+
+    if channel_task.get("pagination") is not None:
+        validate_pagination(channel_task["pagination"])
+    request_timeout(channel_task)
+
+    if mode == "html":
+        return get_html_plan(channel_task.get("html_config", {}))
+    if mode == "api":
+        if not channel_task.get("base_link_url"):
+            raise ValueError("缺少 base_link_url")
+        return get_api_plan(channel_task.get("api_config", {}))
+    if mode == "feed":
+        return None
+
+    raise ValueError(f"未知的抓取模式: {mode}")
+
+
+def validate_channels(channels: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    为所有栏目预编译抽取计划，打印并剔除配置无效的栏目。
+
+    :return: 配置有效的栏目列表（保持原顺序）。
+    """
+    valid_channels = []
+    for channel in channels:
+        try:
+            compile_channel_plan(channel)
+        except ValueError as e:
+            print(f"错误: 栏目 [{channel.get('site_name')}] {channel.get('channel_name')} 配置无效，已跳过: {e}")
+            continue
+        valid_channels.append(channel)
+    return valid_channels
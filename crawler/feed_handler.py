@@ -0,0 +1,240 @@
+# crawler/feed_handler.py
+
+import hashlib
+import requests
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from crawler.config import ENABLE_WEBVPN, FEED_MAX_TTL
+from crawler import fetch_cache, metrics, page_archive
+from crawler.engine import iter_fetch, page_window, request_slot, request_timeout
+from crawler.extraction_plan import normalize_api_date
+from crawler.session_pool import get_session, session_get
+
+# ====================================================================
+# RSS / Atom 订阅源：使用增量 XML 解析器逐条产出 {title, link, date}
+#
+# 支持 RSS 2.0（channel/item）、RSS 1.0（rdf:RDF/item）和 Atom（feed/entry），
+# 标签按去掉命名空间后的本地名匹配。取够 max_count 条即停止解析。
+# 订阅源声明的 ttl 与 lastBuildDate（Atom 为 feed 级 updated）作为缓存提示。
+# ====================================================================
+
+_FEED_CHUNK_SIZE = 16 * 1024
+
+_ENTRY_TAGS = {"item", "entry"}
+
+
+def _local_name(tag: str) -> str:
+    """去掉 ElementTree 标签中的命名空间部分，例如 {http://www.w3.org/2005/Atom}entry -> entry。"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _normalize_feed_date(raw_date: Optional[str]) -> str:
+    """将 RFC 822（RSS pubDate）或 ISO 8601（Atom / dc:date）日期规范化为 YYYY-MM-DD。"""
+    if not raw_date:
+        return "N/A"
+    try:
+        return parsedate_to_datetime(raw_date.strip()).strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return normalize_api_date(raw_date)
+
+
+def _entry_link(entry: ET.Element) -> Optional[str]:
+    """取出条目的链接：RSS 的 <link> 文本，Atom 的 rel="alternate"（或未指定 rel）的 href，最后回退到永久链接形式的 guid。"""
+    guid = None
+    for child in entry:
+        name = _local_name(child.tag)
+        if name == "link":
+            href = child.get("href")
+            if href is None and child.text and child.text.strip():
+                return child.text.strip()
+            if href and child.get("rel", "alternate") == "alternate":
+                return href
+        elif name == "guid" and child.text and child.get("isPermaLink", "true") != "false":
+            guid = child.text.strip()
+    return guid
+
+
+def _entry_fields(entry: ET.Element, base_link_url: str) -> Dict[str, str]:
+    """把一个 item / entry 元素映射为 {title, link, date}。"""
+    title = "N/A"
+    raw_date = None
+    for child in entry:
+        name = _local_name(child.tag)
+        if name == "title":
+            text = "".join(child.itertext()).strip()
+            if text:
+                title = text
+        # 发布时间优先，其次是更新时间
+        elif name in ("pubDate", "published", "date", "issued"):
+            raw_date = child.text
+        elif name in ("updated", "modified") and raw_date is None:
+            raw_date = child.text
+
+    link = _entry_link(entry)
+    link = urljoin(base_link_url, link) if link else (base_link_url or "N/A")
+    return {"title": title, "link": link, "date": _normalize_feed_date(raw_date)}
+
+
+def parse_feed(body: bytes, base_link_url: str, max_count: int) -> Tuple[List[Dict[str, str]], Dict[str, str]]:
+    """
+    增量解析订阅源，取够 max_count 条即停止。
+
+    :param body: 订阅源的原始字节（编码由 XML 声明决定）。
+    :param base_link_url: 用于补全相对链接。
+    :return: (条目列表, 缓存提示)；缓存提示可能包含 ttl 与 last_build（在第一批条目之前出现时）。
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    items: List[Dict[str, str]] = []
+    hints: Dict[str, str] = {}
+    depth_in_entry = 0
+
+    try:
+        for start in range(0, len(body), _FEED_CHUNK_SIZE):
+            parser.feed(body[start:start + _FEED_CHUNK_SIZE])
+            for event, elem in parser.read_events():
+                name = _local_name(elem.tag)
+                if event == "start":
+                    if name in _ENTRY_TAGS:
+                        depth_in_entry += 1
+                    continue
+
+                if name in _ENTRY_TAGS:
+                    depth_in_entry -= 1
+                    info = _entry_fields(elem, base_link_url)
+                    elem.clear()
+                    if info["title"] != "N/A":
+                        items.append(info)
+                    if len(items) >= max_count:
+                        return items, hints
+                elif depth_in_entry == 0:
+                    # 订阅源级别的缓存提示（RSS 的 ttl / lastBuildDate，Atom 的 updated）
+                    if name == "ttl" and elem.text:
+                        hints["ttl"] = elem.text.strip()
+                    elif name in ("lastBuildDate", "updated") and elem.text and "last_build" not in hints:
+                        hints["last_build"] = elem.text.strip()
+        parser.close()
+    except ET.ParseError as e:
+        # 已解析出的条目仍然有效
+        print(f"订阅源解析失败（已取得 {len(items)} 条）: {e}")
+
+    return items, hints
+
+
+def _ttl_seconds(hints: Dict[str, str]) -> Optional[float]:
+    """把 ttl（分钟）换算为秒，并限制在 FEED_MAX_TTL 以内；无效时返回 None。"""
+    try:
+        minutes = float(hints["ttl"])
+    except (KeyError, ValueError):
+        return None
+    return min(minutes * 60, FEED_MAX_TTL) if minutes > 0 else None
+
+
+def _fetch_feed(
+    ses: requests.Session,
+    url: str,
+    config_hash: str,
+    timeout: Tuple[float, float],
+    base_link_url: str,
+    max_count: int,
+    labels: Dict[str, str]
+) -> Optional[List[Dict[str, str]]]:
+    """请求并解析单个订阅源，失败、仍在 ttl 有效期内或内容未变化时返回 None。"""
+    if fetch_cache.is_fresh(url, config_hash):
+        print(f"  -> 订阅源仍在 ttl 有效期内，跳过请求: {url}")
+        return None
+
+    print(f"  -> 正在处理订阅源: {url}")
+
+    headers = fetch_cache.get_conditional_headers(url, config_hash)
+    try:
+        with request_slot(url):
+            r = session_get(ses, url, headers=headers, timeout=timeout)
+        r.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"请求订阅源 {url} 失败: {e}")
+        return None
+
+    if r.status_code == 304:
+        # 304 没有响应体，有效期沿用上次记录的 ttl
+        fetch_cache.extend_fresh(url, config_hash)
+        print(f"  -> 订阅源未变化，跳过解析: {url}")
+        return None
+
+    with metrics.timer("crawler_parse_seconds", labels):
+        items, hints = parse_feed(r.content, base_link_url, max_count)
+    page_archive.store(url, r.content, r.headers.get("Content-Type", ""))
+    ttl = _ttl_seconds(hints)
+
+    # lastBuildDate 表示订阅源内容最后一次变化的时间，存在时以它代替响应体摘要判断是否变化
+    validator = None
+    if "last_build" in hints:
+        validator = hashlib.sha256(f"last_build:{hints['last_build']}".encode("utf-8")).hexdigest()
+    if fetch_cache.is_unchanged(url, r, config_hash, body_hash=validator):
+        # 没有新条目需要入库，有效期立即写入
+        fetch_cache.extend_fresh(url, config_hash, ttl)
+        print(f"  -> 订阅源未变化，跳过解析: {url}")
+        return None
+
+    # 内容变化时，有效期与缓存记录一起在条目入库后提交
+    if ttl:
+        fetch_cache.set_fresh_for(url, ttl)
+    return items
+
+
+# ====================================================================
+# 主处理器: feed 模式入口
+# ====================================================================
+
+
+def iter_feed_pages(channel_task: Dict[str, Any]) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    根据配置按 url_list 顺序获取订阅源，逐个产出 (url, 条目迭代器)。
+
+    :param channel_task: 包含完整配置的单个栏目任务字典（来自数据库）。
+    """
+    use_webvpn = channel_task.get("use_webvpn", ENABLE_WEBVPN)
+    ses = get_session(use_webvpn)
+    max_count = channel_task.get("max_count", 5)
+    base_link_url = channel_task.get("base_link_url", "")
+    url_list = channel_task.get("url_list", [])
+
+    if not url_list or not isinstance(url_list, list):
+        print(f"错误: 栏目 [{channel_task.get('site_name')}] {channel_task.get('channel_name')} 的 url_list 配置无效。")
+        return
+
+    config_hash = fetch_cache.config_fingerprint(channel_task)
+    timeout = request_timeout(channel_task)
+    labels = metrics.channel_labels(channel_task)
+    # 未配置 base_link_url 时，相对链接按订阅源自身的地址补全
+    feeds = iter_fetch(
+        url_list,
+        lambda url: _fetch_feed(ses, url, config_hash, timeout, base_link_url or url, max_count, labels),
+        page_window(channel_task)
+    )
+
+    for url, items in feeds:
+        if items is None:
+            continue
+        yield url, iter(items)
+
+
+def get_info_from_feed(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
+    """根据配置获取并解析订阅源，支持多 URL 爬取。"""
+    return [item for _, items in iter_feed_pages(channel_task) for item in items]
+
+
+def iter_archived_feed_pages(channel_task: Dict[str, Any], all_versions: bool = False) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    从页面归档中读取 url_list 的订阅源并重新解析，不发起任何网络请求。
+
+    :param all_versions: 是否解析每个 URL 的全部历史版本（否则只解析最新版本）。
+    """
+    base_link_url = channel_task.get("base_link_url", "")
+    max_count = channel_task.get("max_count", 5)
+
+    for url in channel_task.get("url_list", []):
+        for page in page_archive.load(url, all_versions):
+            items, _ = parse_feed(page.body, base_link_url or url, max_count)
+            yield url, iter(items)
@@ -0,0 +1,187 @@
+# crawler/fetch_cache.py
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from crawler.config import ENABLE_FETCH_CACHE
+from database.utils_db import get_db_connection
+
+# ====================================================================
+# 条件请求缓存：记录每个 URL 的 ETag / Last-Modified / 响应体摘要
+#
+# 页面未变化（304 或摘要相同）时，Handler 直接跳过解析与去重。
+# 新的缓存记录先暂存在内存中，待栏目去重入库完成后由 commit() 写入数据库，
+# 以免中途失败时把尚未入库的页面误标记为“已处理”。
+# ====================================================================
+
+# 待提交的缓存记录: url -> (etag, last_modified, body_hash, config_hash)
+_PENDING: Dict[str, Tuple[Optional[str], Optional[str], str, str]] = {}
+# 待提交的有效期: url -> (fresh_until, ttl 秒数)
+_PENDING_FRESH: Dict[str, Tuple[str, float]] = {}
+_PENDING_LOCK = threading.Lock()
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def config_fingerprint(channel_task: Dict[str, Any]) -> str:
+    """
+    计算影响抽取结果的栏目配置摘要。
+    配置（选择器、max_count 等）变化后，即使页面未变化也需要重新解析。
+    """
+    mode = channel_task.get("mode", "html").lower()
+    relevant = {
+        "mode": mode,
+        "config": channel_task.get(f"{mode}_config", {}),
+        "max_count": channel_task.get("max_count", 5),
+        "base_link_url": channel_task.get("base_link_url", ""),
+    }
+    data = json.dumps(relevant, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _load_entry(url: str) -> Optional[Dict[str, Any]]:
+    """读取某个 URL 已提交的缓存记录。"""
+    row = get_db_connection().execute(
+        "SELECT etag, last_modified, body_hash, config_hash, fresh_until FROM FetchCache WHERE url = ?",
+        (url,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def is_fresh(url: str, config_hash: str) -> bool:
+    """
+    判断 URL 是否仍在上次声明的缓存有效期（订阅源的 ttl）内，此时无需发起请求。
+    """
+    if not ENABLE_FETCH_CACHE:
+        return False
+
+    entry = _load_entry(url)
+    if not entry or entry["config_hash"] != config_hash or not entry["fresh_until"]:
+        return False
+    return entry["fresh_until"] > datetime.now().strftime(_TIME_FORMAT)
+
+
+def _fresh_until(seconds: float) -> str:
+    return (datetime.now() + timedelta(seconds=seconds)).strftime(_TIME_FORMAT)
+
+
+def set_fresh_for(url: str, seconds: float):
+    """
+    暂存内容已变化的 URL 的缓存有效期（从现在起 seconds 秒），与其他缓存记录一起在 commit() 时写入。
+    内容未变化时应调用 extend_fresh()。
+    """
+    if not ENABLE_FETCH_CACHE:
+        return
+
+    with _PENDING_LOCK:
+        _PENDING_FRESH[url] = (_fresh_until(seconds), seconds)
+
+
+def extend_fresh(url: str, config_hash: str, seconds: Optional[float] = None):
+    """
+    响应未变化（304 或摘要相同）时立即延长 URL 的缓存有效期。
+    此时没有待入库的条目，无需等待 commit()，也不会被 discard() 丢弃。
+
+    :param seconds: 本次响应声明的有效期；为 None 时（如 304 没有响应体）沿用上次记录的 ttl。
+    """
+    if not ENABLE_FETCH_CACHE:
+        return
+
+    conn = get_db_connection()
+    with conn:
+        if seconds is None:
+            row = conn.execute(
+                "SELECT ttl FROM FetchCache WHERE url = ? AND config_hash = ?", (url, config_hash)
+            ).fetchone()
+            if not row or not row["ttl"]:
+                return
+            seconds = row["ttl"]
+        conn.execute(
+            "UPDATE FetchCache SET fresh_until = ?, ttl = ? WHERE url = ? AND config_hash = ?",
+            (_fresh_until(seconds), seconds, url, config_hash)
+        )
+
+
+def get_conditional_headers(url: str, config_hash: str) -> Dict[str, str]:
+    """
+    构造条件请求头 (If-None-Match / If-Modified-Since)。
+    仅当缓存记录对应的配置与当前配置一致时才发送。
+    """
+    if not ENABLE_FETCH_CACHE:
+        return {}
+
+    entry = _load_entry(url)
+    if not entry or entry["config_hash"] != config_hash:
+        return {}
+
+    headers = {}
+    if entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def is_unchanged(url: str, r: requests.Response, config_hash: str, body_hash: Optional[str] = None) -> bool:
+    """
+    判断响应相对上次成功处理时是否未发生变化。
+    若发生变化，则把新的缓存记录暂存，等待 commit()。
+
+    :param body_hash: 调用方已计算好的响应体摘要（流式读取时为已读取部分的摘要），默认按 r.content 计算。
+    :return: True 表示可以跳过解析和去重。
+    """
+    if not ENABLE_FETCH_CACHE:
+        return False
+
+    if r.status_code == 304:
+        return True
+
+    if body_hash is None:
+        body_hash = hashlib.sha256(r.content).hexdigest()
+    entry = _load_entry(url)
+    if entry and entry["config_hash"] == config_hash and entry["body_hash"] == body_hash:
+        return True
+
+    with _PENDING_LOCK:
+        _PENDING[url] = (
+            r.headers.get("ETag"),
+            r.headers.get("Last-Modified"),
+            body_hash,
+            config_hash,
+        )
+    return False
+
+
+def commit(urls: List[str]):
+    """在栏目的新通知全部入库后，写入这些 URL 暂存的缓存记录。"""
+    with _PENDING_LOCK:
+        entries = [(url, _PENDING.pop(url)) for url in urls if url in _PENDING]
+        fresh = [(*_PENDING_FRESH.pop(url), url) for url in urls if url in _PENDING_FRESH]
+
+    if not entries and not fresh:
+        return
+
+    updated_at = datetime.now().strftime(_TIME_FORMAT)
+    conn = get_db_connection()
+    with conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO FetchCache
+            (url, etag, last_modified, body_hash, config_hash, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(url, *entry, updated_at) for url, entry in entries])
+        # INSERT OR REPLACE 会清空旧的有效期，因此在写入新记录之后再设置
+        conn.executemany("UPDATE FetchCache SET fresh_until = ?, ttl = ? WHERE url = ?", fresh)
+
+
+def discard(urls: List[str]):
+    """
+    丢弃这些 URL 暂存的缓存记录（栏目处理失败时调用，保证下次重新解析）。
+    未变化响应的有效期已由 extend_fresh() 写入，不受影响。
+    """
+    with _PENDING_LOCK:
+        for url in urls:
+            _PENDING.pop(url, None)
+            _PENDING_FRESH.pop(url, None)
@@ -1,14 +1,17 @@
 # crawler/fetcher.py
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Tuple
 from . import html_handler
 from . import api_handler
+from . import feed_handler
+from . import fetch_cache
 
-def get_latest_info(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
+def iter_channel_pages(channel_task: Dict[str, Any]) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
     """
-    根据栏目（Channel）的配置，调用相应的处理器（Handler）来抓取数据。
+    根据栏目（Channel）的配置，调用相应的处理器（Handler）流式抓取数据。
+    页面按 url_list 顺序逐页产出，调用方停止迭代后不再抓取后续页面。
     
     :param channel_task: 包含完整配置的单个栏目任务字典（来自数据库）。
-    :return: 包含字典（title, link, date）的列表。
+    :return: (url, 包含字典（title, link, date）的迭代器) 的迭代器。
     """
     
     # 获取必要的元数据
@@ -22,23 +25,51 @@ def get_latest_info(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
 
     if mode == "html":
         # HTML 模式: 调用 HTML 解析处理器
-        try:
-            # 将完整的任务字典传递给 Handler
-            return html_handler.get_info_from_html(channel_task)
-        except Exception as e:
-            print(f"处理 [{site_name}] {channel_name} (HTML模式) 时发生错误: {e}")
-            return []
+        yield from html_handler.iter_html_pages(channel_task)
             
     elif mode == "api":
         # API 模式: 调用 JSON API 处理器
-        try:
-            # 将完整的任务字典传递给 Handler
-            return api_handler.get_info_from_api(channel_task)
-        except Exception as e:
-            print(f"处理 [{site_name}] {channel_name} (API模式) 时发生错误: {e}")
-            return []
+        yield from api_handler.iter_api_pages(channel_task)
+
+    elif mode == "feed":
+        # feed 模式: 调用 RSS / Atom 订阅源处理器
+        yield from feed_handler.iter_feed_pages(channel_task)
             
     else:
         # 未知模式处理
         print(f"错误: 栏目 [{site_name}] {channel_name} 配置了未知的抓取模式: {mode}")
-        return []
\ No newline at end of file
+
+
+def iter_archived_channel_pages(channel_task: Dict[str, Any], all_versions: bool = False) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    与 iter_channel_pages 相同，但页面来自原始页面归档而非网络（用于 reextract）。
+
+    :param all_versions: 是否解析每个 URL 的全部历史版本（否则只解析最新版本）。
+    """
+    mode = channel_task.get("mode", "html").lower()
+
+    if mode == "html":
+        yield from html_handler.iter_archived_html_pages(channel_task, all_versions)
+    elif mode == "api":
+        yield from api_handler.iter_archived_api_pages(channel_task, all_versions)
+    elif mode == "feed":
+        yield from feed_handler.iter_archived_feed_pages(channel_task, all_versions)
+    else:
+        print(f"错误: 栏目 [{channel_task.get('site_name')}] {channel_task.get('channel_name')} 配置了未知的抓取模式: {mode}")
+
+
+def get_latest_info(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    根据栏目（Channel）的配置，调用相应的处理器（Handler）来抓取数据。
+    
+    :param channel_task: 包含完整配置的单个栏目任务字典（来自数据库）。
+    :return: 包含字典（title, link, date）的列表。
+    """
+    try:
+        return [item for _, page_items in iter_channel_pages(channel_task) for item in page_items]
+    except Exception as e:
+        site_name = channel_task.get("site_name", "Unknown Site")
+        channel_name = channel_task.get("channel_name", "Unknown Channel")
+        print(f"处理 [{site_name}] {channel_name} 时发生错误: {e}")
+        fetch_cache.discard(channel_task.get("url_list", []))
+        return []
@@ -0,0 +1,214 @@
+# crawler/host_guard.py
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from crawler.config import (
+    HOST_RATE_PER_SEC, HOST_BURST,
+    BACKOFF_BASE, BACKOFF_MAX,
+    CIRCUIT_ERROR_RATE, CIRCUIT_SLOW_SECONDS,
+    CIRCUIT_COOLDOWN_BASE, CIRCUIT_COOLDOWN_MAX, CIRCUIT_PROBE_TIMEOUT,
+    HOST_STATE_FILE,
+)
+
+# ====================================================================
+# 主机级限速与熔断
+#
+# 每个主机一个令牌桶，控制请求速率；同时按指数滑动平均记录错误率与延迟。
+# 错误率过高时熔断该主机：冷却期内的请求直接失败，不再白白等待超时；
+# 冷却期结束后放行一个探测请求，成功则恢复，失败则以加倍的冷却时间再次熔断。
+# 熔断状态持久化到磁盘，因此对定时运行的爬虫跨运行生效。
+# ====================================================================
+
+# 错误率 / 延迟的指数滑动平均系数
+_EWMA_ALPHA = 0.3
+
+
+class HostUnavailableError(requests.exceptions.RequestException):
+    """目标主机处于熔断冷却期，请求被直接跳过。"""
+
+
+class _HostState:
+    """单个主机的令牌桶与熔断状态（所有字段由 _LOCK 保护）。"""
+
+    def __init__(self, rate: float, burst: int):
+        # 令牌桶
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+        # 健康统计
+        self.error_rate = 0.0
+        self.latency = 0.0
+        self.consecutive_failures = 0
+        self.retry_at = 0.0            # 失败退避：在此之前不再发起请求（monotonic）
+
+        # 熔断
+        self.open = False
+        self.open_until = 0.0          # 冷却结束时间（wall clock，便于持久化）
+        self.trips = 0                 # 连续熔断次数，决定冷却时间
+        self.probing = False           # 冷却结束后是否已有探测请求在途
+        self.probe_started = 0.0       # 探测请求的放行时间（monotonic），用于识别未记录结果的探测
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "error_rate": round(self.error_rate, 4),
+            "latency": round(self.latency, 3),
+            "open": self.open,
+            "open_until": self.open_until,
+            "trips": self.trips,
+        }
+
+    def load_json(self, data: Dict[str, Any]):
+        self.error_rate = float(data.get("error_rate", 0.0))
+        self.latency = float(data.get("latency", 0.0))
+        self.open = bool(data.get("open", False))
+        self.open_until = float(data.get("open_until", 0.0))
+        self.trips = int(data.get("trips", 0))
+
+
+_HOSTS: Dict[str, _HostState] = {}
+_LOCK = threading.Lock()
+_SAVED_STATE: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+def _load_saved_state() -> Dict[str, Dict[str, Any]]:
+    """读取上次运行保存的主机状态（调用方需持有 _LOCK）。"""
+    global _SAVED_STATE
+
+    if _SAVED_STATE is None:
+        _SAVED_STATE = {}
+        if os.path.exists(HOST_STATE_FILE):
+            try:
+                with open(HOST_STATE_FILE, "r", encoding="utf-8") as f:
+                    _SAVED_STATE = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[HostGuard] 读取主机状态失败，忽略: {e}")
+    return _SAVED_STATE
+
+
+def _get_state(host: str, rate: float = HOST_RATE_PER_SEC, burst: int = HOST_BURST) -> _HostState:
+    """获取（必要时创建）主机状态（调用方需持有 _LOCK）。"""
+    state = _HOSTS.get(host)
+    if state is None:
+        state = _HostState(rate, burst)
+        saved = _load_saved_state().get(host)
+        if saved:
+            state.load_json(saved)
+        _HOSTS[host] = state
+    return state
+
+
+def _reserve_token(state: _HostState, now: float) -> float:
+    """从令牌桶中预留一个令牌，返回需要等待的秒数（调用方需持有 _LOCK）。"""
+    state.tokens = min(state.burst, state.tokens + (now - state.updated) * state.rate)
+    state.updated = now
+    state.tokens -= 1
+    wait = -state.tokens / state.rate if state.tokens < 0 else 0.0
+    return max(wait, state.retry_at - now)
+
+
+def _trip(host: str, state: _HostState):
+    """熔断主机，冷却时间随连续熔断次数指数增长（调用方需持有 _LOCK）。"""
+    state.trips += 1
+    cooldown = min(CIRCUIT_COOLDOWN_BASE * 2 ** (state.trips - 1), CIRCUIT_COOLDOWN_MAX)
+    state.open = True
+    state.open_until = time.time() + cooldown
+    state.probing = False
+    print(f"[HostGuard] 主机 {host} 错误率 {state.error_rate:.0%}，熔断 {cooldown:.0f} 秒。")
+
+
+# ====================================================================
+# 对外接口
+# ====================================================================
+
+def set_rate_limit(host: str, rate: float, burst: int):
+    """覆盖某个主机的令牌桶参数（例如基准测试中对本地桩服务器取消限速）。"""
+    with _LOCK:
+        state = _get_state(host, rate, burst)
+        state.rate = rate
+        state.burst = burst
+        state.tokens = float(burst)
+
+
+def throttle(host: str, rate: float = HOST_RATE_PER_SEC, burst: int = HOST_BURST):
+    """仅做令牌桶限速：必要时阻塞等待，直到允许向该主机发起请求。"""
+    with _LOCK:
+        wait = _reserve_token(_get_state(host, rate, burst), time.monotonic())
+    if wait > 0:
+        time.sleep(wait)
+
+
+def acquire(host: str):
+    """
+    在向 host 发起请求前调用：检查熔断状态并按令牌桶限速。
+
+    :raises HostUnavailableError: 主机处于熔断冷却期（或冷却结束后的探测请求尚未返回）。
+    """
+    with _LOCK:
+        state = _get_state(host)
+        if state.open:
+            remaining = state.open_until - time.time()
+            if remaining > 0:
+                raise HostUnavailableError(f"主机 {host} 熔断中，{remaining:.0f} 秒后重试")
+            now = time.monotonic()
+            # 探测请求可能在 record() 之前异常退出，超时未返回结果时放行新的探测，避免主机被永久屏蔽
+            if state.probing and now - state.probe_started < CIRCUIT_PROBE_TIMEOUT:
+                raise HostUnavailableError(f"主机 {host} 正在探测恢复情况")
+            # 冷却结束：放行一个探测请求（半开状态）
+            state.probing = True
+            state.probe_started = now
+        wait = _reserve_token(state, time.monotonic())
+
+    if wait > 0:
+        time.sleep(wait)
+
+
+def record(host: str, ok: bool, latency: float):
+    """
+    记录一次请求的结果，更新错误率、延迟、退避与熔断状态。
+
+    :param host: 请求的目标主机。
+    :param ok: 请求是否成功（网络错误、5xx、429 视为失败）。
+    :param latency: 请求耗时（秒）。
+    """
+    with _LOCK:
+        state = _get_state(host)
+        bad = not ok or latency >= CIRCUIT_SLOW_SECONDS
+        state.latency += _EWMA_ALPHA * (latency - state.latency)
+        state.error_rate += _EWMA_ALPHA * ((1.0 if bad else 0.0) - state.error_rate)
+
+        if ok:
+            state.consecutive_failures = 0
+            state.retry_at = 0.0
+            if state.open:
+                print(f"[HostGuard] 主机 {host} 已恢复。")
+            state.open = False
+            state.probing = False
+            state.trips = 0
+        else:
+            state.consecutive_failures += 1
+            backoff = min(BACKOFF_BASE * 2 ** (state.consecutive_failures - 1), BACKOFF_MAX)
+            state.retry_at = time.monotonic() + backoff
+
+        # 探测请求失败时立即重新熔断；否则按错误率判断
+        if (state.open and state.probing and not ok) or (not state.open and state.error_rate >= CIRCUIT_ERROR_RATE):
+            _trip(host, state)
+
+
+def save_state():
+    """将所有主机的健康状态写入磁盘，供下次运行使用。"""
+    with _LOCK:
+        data = dict(_load_saved_state())
+        data.update({host: state.to_json() for host, state in _HOSTS.items()})
+
+    try:
+        os.makedirs(os.path.dirname(HOST_STATE_FILE) or ".", exist_ok=True)
+        with open(HOST_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"[HostGuard] 保存主机状态失败: {e}")
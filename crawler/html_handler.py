@@ -1,22 +1,23 @@
 # crawler/html_handler.py
 
 import requests
-import re
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup, Tag
-from typing import Dict, Any, List
-from ZJUWebVPN import ZJUWebVPNSession
+from concurrent.futures import Future
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from crawler.config import ENABLE_WEBVPN
-from config.secret_config import WEBVPN_NAME, WEBVPN_SECRET
+from crawler import fetch_cache, metrics, page_archive, parse_pool
+from crawler.engine import iter_fetch, page_window, request_slot, request_timeout
+from crawler.extraction_plan import HtmlPlan, ANCHOR_MATCHER, get_html_plan, normalize_html_date
+from crawler.session_pool import get_session, session_get
 # ====================================================================
-# 辅助函数: 提取数据子模块 (保持不变)
+# 辅助函数: 提取数据子模块 (基于预编译的抽取计划)
 # ====================================================================
 
 
-def _extract_title(li: Tag, title_selector: str) -> str:
-    """从列表项中提取标题。"""
+def _extract_title(content_element: Optional[Tag]) -> str:
+    """从标题元素中提取标题。"""
     title = "N/A"
-    content_element = li.select_one(title_selector) if title_selector else None
 
     if content_element:
         title_raw = content_element.text.strip()
@@ -25,13 +26,12 @@ def _extract_title(li: Tag, title_selector: str) -> str:
     return title
 
 
-def _extract_link(li: Tag, base_url: str, title_selector: str) -> str:
+def _extract_link(li: Tag, content_element: Optional[Tag], base_url: str) -> str:
     """从列表项中提取并构造完整链接。"""
     link = "N/A"
     link_anchor = None
-    
-    content_element = li.select_one(title_selector) if title_selector else None
 
+    # 1. 标题元素所在的 <a> 标签
     if content_element:
         link_anchor = content_element.find_parent("a")
 
@@ -41,7 +41,7 @@ def _extract_link(li: Tag, base_url: str, title_selector: str) -> str:
 
     # 3. 兜底查找：在 li 内部直接找 <a> 标签
     if not link_anchor:
-        link_anchor = li.select_one("a")
+        link_anchor = ANCHOR_MATCHER.select_one(li)
 
     # 4. 构造完整链接
     if link_anchor and link_anchor.get("href"):
@@ -56,22 +56,19 @@ def _extract_link(li: Tag, base_url: str, title_selector: str) -> str:
     return link
 
 
-def _extract_date(li: Tag, selectors: Dict[str, Any]) -> str:
+def _extract_date(li: Tag, plan: HtmlPlan) -> str:
     """从列表项中提取日期并进行格式化验证。"""
     date = "N/A"
-    date_selector = selectors.get("date_selector")
-    date_regex_config = selectors.get("date_regex", {})
+    source_element = plan.date_matcher.select_one(li) if plan.date_matcher else li
 
-    source_element = li.select_one(date_selector) if date_selector else li
-    pattern = date_regex_config.get("pattern") if date_regex_config else None
+    if source_element is None:
+        return date
 
-    if pattern:
-        format_str = date_regex_config.get("format") or "$1"
-        source_html = str(source_element)
-        match = re.search(pattern, source_html, re.IGNORECASE | re.DOTALL)
+    if plan.date_pattern:
+        match = plan.date_pattern.search(str(source_element))
 
         if match:
-            date_temp = format_str
+            date_temp = plan.date_format
             for i in range(1, len(match.groups()) + 1):
                 date_temp = date_temp.replace(f"${i}", match.group(i))
             if date_temp.strip():
@@ -82,26 +79,7 @@ def _extract_date(li: Tag, selectors: Dict[str, Any]) -> str:
         if date_text:
             date = date_text
 
-    if date != "N/A":
-        # 匹配 YYYY-MM-DD 格式
-        date_match = re.search(r"(\d{4})[^\d](\d{1,2})[^\d](\d{1,2})[^\d]*", date)
-
-        if date_match:
-            year = date_match.group(1)
-            month = date_match.group(2).zfill(2)
-            day = date_match.group(3).zfill(2)
-            date = f"{year}-{month}-{day}"
-        else:
-            # 尝试匹配 YYYY-MM 格式
-            date_match_month = re.search(r"(\d{4})[^\d](\d{1,2})", date)
-            if date_match_month:
-                year = date_match_month.group(1)
-                month = date_match_month.group(2).zfill(2)
-                date = f"{year}-{month}-00"
-            else:
-                date = "N/A"
-
-    return date
+    return normalize_html_date(date)
 
 
 # ====================================================================
@@ -109,20 +87,116 @@ def _extract_date(li: Tag, selectors: Dict[str, Any]) -> str:
 # ====================================================================
 
 
+def extract_with_plan(li: Tag, plan: HtmlPlan, base_link_url: str) -> Dict[str, str]:
+    """使用预编译的抽取计划从单个列表项（li）中提取核心数据。"""
+    # 标题元素只查找一次，同时用于提取标题和链接
+    content_element = plan.title_matcher.select_one(li) if plan.title_matcher else None
+
+    title = _extract_title(content_element)
+    link = _extract_link(li, content_element, base_link_url)
+    date = _extract_date(li, plan)
+
+    return {"title": title, "link": link, "date": date}
+
 
 def extract_data_from_li(li: Tag, html_config: Dict[str, Any], base_link_url: str) -> Dict[str, str]:
     """从单个列表项（li）中提取核心数据，组合调用三个辅助函数。"""
+    return extract_with_plan(li, get_html_plan(html_config), base_link_url)
 
-    selectors = html_config.get("selectors", {})
-    # 使用从顶层任务字典中传入的 base_link_url
-    title_selector = selectors.get("title_selector")
 
-    title = _extract_title(li, title_selector)
-    # 使用正确的 base_link_url 变量名
-    link = _extract_link(li, base_link_url, title_selector)
-    date = _extract_date(li, selectors)
+# ====================================================================
+# 页面解析: 可选解析后端 + 仅解析 list_selector 所在子树
+# ====================================================================
 
-    return {"title": title, "link": link, "date": date}
+
+def iter_html_items(html_text: str, plan: HtmlPlan, base_link_url: str, max_count: int) -> Iterator[Dict[str, str]]:
+    """
+    逐条解析单个列表页，产出最多 max_count 条 {title, link, date}。
+    调用方提前停止迭代时，剩余列表项不会再被提取。
+    """
+    soup = BeautifulSoup(html_text, plan.parser, parse_only=plan.strainer)
+
+    count = 0
+    for li in plan.list_matcher.iselect(soup):
+        info = extract_with_plan(li, plan, base_link_url)
+
+        if info["title"] != "N/A":
+            yield info
+            count += 1
+
+        # 达到 max_count 时停止
+        if count >= max_count:
+            return
+
+
+def _page_items(
+    html_text: str,
+    future: Optional[Future],
+    plan: HtmlPlan,
+    base_link_url: str,
+    max_count: int,
+    labels: Dict[str, str]
+) -> Iterator[Dict[str, str]]:
+    """取回解析阶段的结果；进程池不可用时在当前线程中惰性解析。解析耗时按 labels 记录。"""
+    if future is not None:
+        result = parse_pool.get_result(future)
+        if result is not None:
+            items, parse_seconds = result
+            metrics.observe("crawler_parse_seconds", labels, parse_seconds)
+            return iter(items)
+    return metrics.timed_iter(iter_html_items(html_text, plan, base_link_url, max_count), "crawler_parse_seconds", labels)
+
+
+def parse_html_items(
+    html_text: str,
+    html_config: Dict[str, Any],
+    base_link_url: str,
+    max_count: int,
+    parser: Optional[str] = None,
+    scoped: Optional[bool] = None
+) -> List[Dict[str, str]]:
+    """
+    解析单个列表页，返回最多 max_count 条 {title, link, date}。
+
+    :param parser: 覆盖解析后端（"lxml" / "html.parser" / "html5lib"），默认取 html_config.parser 或全局配置。
+    :param scoped: 覆盖是否只解析 list_selector 所在子树，默认取 html_config.scoped_parsing 或全局配置。
+    """
+    if parser is not None or scoped is not None:
+        html_config = dict(html_config)
+        if parser is not None:
+            html_config["parser"] = parser
+        if scoped is not None:
+            html_config["scoped_parsing"] = scoped
+
+    return list(iter_html_items(html_text, get_html_plan(html_config), base_link_url, max_count))
+
+
+# ====================================================================
+# 网络请求: 抓取单个 HTML 页面
+# ====================================================================
+
+
+def _fetch_html(ses: requests.Session, url: str, config_hash: str, timeout: Tuple[float, float]) -> Optional[str]:
+    """请求单个列表页并返回解码后的 HTML 文本，失败或页面未变化时返回 None。"""
+    print(f"  -> 正在处理 HTML 页面: {url}")
+
+    headers = fetch_cache.get_conditional_headers(url, config_hash)
+    try:
+        with request_slot(url):
+            r = session_get(ses, url, headers=headers, timeout=timeout)
+        # 错误页面不解析，也不写入抓取缓存，否则之后相同的错误页面会被当作“未变化”而跳过
+        r.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"请求 {url} 失败: {e}")
+        return None
+
+    if fetch_cache.is_unchanged(url, r, config_hash):
+        print(f"  -> 页面未变化，跳过解析: {url}")
+        return None
+
+    r.encoding = r.apparent_encoding if r.apparent_encoding else "utf-8"
+    page_archive.store(url, r.content, r.headers.get("Content-Type", ""), r.encoding)
+    return r.text
 
 
 # ====================================================================
@@ -130,15 +204,15 @@ def extract_data_from_li(li: Tag, html_config: Dict[str, Any], base_link_url: st
 # ====================================================================
 
 
-def get_info_from_html(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
-    """根据配置获取并解析 HTML 页面，支持多 URL 爬取。"""
+def iter_html_pages(channel_task: Dict[str, Any]) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    根据配置按 url_list 顺序获取 HTML 页面，逐页产出 (url, 条目迭代器)。
+    页面按需抓取：调用方停止迭代后，后续页面不再请求。
+    """
     
     # 根据全局配置和每个 channel 的可选覆盖决定使用哪种会话
     use_webvpn = channel_task.get("use_webvpn", ENABLE_WEBVPN)
-    if use_webvpn:
-        ses = ZJUWebVPNSession(WEBVPN_NAME, WEBVPN_SECRET)
-    else:
-        ses = requests.Session()
+    ses = get_session(use_webvpn)
     # 1. 从扁平化任务字典中获取所需配置
     html_config = channel_task.get("html_config", {})
     
@@ -155,42 +229,62 @@ def get_info_from_html(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
     # 2. URL 配置验证
     if not url_list or not isinstance(url_list, list):
         print(f"错误: 栏目 [{site_name}] {channel_name} 的 url_list 配置无效。")
-        return []
+        return
 
-    list_selector = html_config.get("selectors", {}).get("list_selector")
-    if not list_selector:
-        print(f"错误: 栏目 [{site_name}] {channel_name} 缺少 list_selector。")
-        return []
+    # 编译（或从缓存获取）抽取计划，配置无效时不发起任何请求
+    try:
+        plan = get_html_plan(html_config)
+    except ValueError as e:
+        print(f"错误: 栏目 [{site_name}] {channel_name} 的 html_config 无效: {e}")
+        return
 
-    items: List[Dict[str, str]] = []
-    
-    # 3. 循环处理每一个 URL (支持多 URL 爬取)
-    for current_url in url_list:
-        if not current_url: continue
-        
-        print(f"  -> 正在处理 HTML 页面: {current_url}")
-
-        # 请求和解析 HTML
-        # try:
-        r = ses.get(current_url, timeout=10)
-        r.encoding = r.apparent_encoding if r.apparent_encoding else "utf-8"
-        soup = BeautifulSoup(r.text, "html.parser")
-        # except ses.exceptions.RequestException as e:
-        #     print(f"请求 {current_url} 失败: {e}")
-        #     continue
-
-        # 3. 提取数据
-        current_item_count = 0
-        for li in soup.select(list_selector):
-            # 传递 html_config 和 base_link_url 给提取函数
-            info = extract_data_from_li(li, html_config, base_link_url)
-            
-            if info["title"] != "N/A":
-                items.append(info)
-                current_item_count += 1
-
-            # 在处理完一个 URL 后，或达到 max_count 时停止
-            if current_item_count >= max_count:
-                break
-                
-    return items
+    # 3. I/O 阶段：按窗口并发抓取 URL，页面一到达即提交到解析进程池，结果按 url_list 顺序返回
+    config_hash = fetch_cache.config_fingerprint(channel_task)
+    timeout = request_timeout(channel_task)
+
+    def fetch_and_submit(url: str) -> Optional[Tuple[str, Optional[Future]]]:
+        html_text = _fetch_html(ses, url, config_hash, timeout)
+        if html_text is None:
+            return None
+        return html_text, parse_pool.submit_html_parse(html_text, html_config, base_link_url, max_count)
+
+    pages = iter_fetch(url_list, fetch_and_submit, page_window(channel_task))
+    labels = metrics.channel_labels(channel_task)
+
+    # 4. 解析阶段：按原顺序逐页取回解析结果
+    for current_url, fetched in pages:
+        if fetched is None:
+            continue
+
+        html_text, future = fetched
+        yield current_url, _page_items(html_text, future, plan, base_link_url, max_count, labels)
+
+
+def get_info_from_html(channel_task: Dict[str, Any]) -> List[Dict[str, str]]:
+    """根据配置获取并解析 HTML 页面，支持多 URL 爬取。"""
+    return [item for _, page_items in iter_html_pages(channel_task) for item in page_items]
+
+
+def iter_archived_html_pages(channel_task: Dict[str, Any], all_versions: bool = False) -> Iterator[Tuple[str, Iterator[Dict[str, str]]]]:
+    """
+    从页面归档中读取 url_list 的页面，用当前的抽取计划重新解析，不发起任何网络请求。
+
+    :param all_versions: 是否解析每个 URL 的全部历史版本（否则只解析最新版本）。
+    :return: (url, 条目迭代器) 的迭代器。
+    """
+    plan = get_html_plan(channel_task.get("html_config", {}))
+    base_link_url = channel_task.get("base_link_url", "")
+    max_count = channel_task.get("max_count", 5)
+
+    html_config = channel_task.get("html_config", {})
+
+    # 先把所有归档页面提交到解析进程池，再按顺序取回结果
+    submitted = []
+    for url in channel_task.get("url_list", []):
+        for page in page_archive.load(url, all_versions):
+            html_text = page.body.decode(page.encoding or "utf-8", errors="replace")
+            submitted.append((url, html_text, parse_pool.submit_html_parse(html_text, html_config, base_link_url, max_count)))
+
+    labels = metrics.channel_labels(channel_task)
+    for url, html_text, future in submitted:
+        yield url, _page_items(html_text, future, plan, base_link_url, max_count, labels)
\ No newline at end of file
@@ -0,0 +1,211 @@
+# crawler/metrics.py
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from crawler.config import ENABLE_METRICS, METRICS_FILE, METRICS_RETENTION_DAYS
+from database.utils_db import get_db_connection
+
+# ====================================================================
+# 抓取阶段指标：按主机 / 栏目记录耗时与计数
+#
+# 计数器（counter）只累加数值；耗时（summary）同时累加总和与次数，平均值 = sum / count。
+# 每轮运行结束时 flush_run() 把本轮的指标写入 CrawlMetrics 表（用于对比历史、发现退化），
+# 并把进程启动以来的累计值以 Prometheus 文本格式写入 METRICS_FILE；
+# daemon 模式还可通过 serve() 在本地端口提供 /metrics。
+# ====================================================================
+
+# 指标名 -> (类型, 说明)
+_METRICS: Dict[str, Tuple[str, str]] = {
+    "crawler_request_ttfb_seconds": ("summary", "从发出请求到收到响应头的耗时（含连接建立）"),
+    "crawler_request_download_seconds": ("summary", "收到响应头之后读取响应体的耗时"),
+    "crawler_request_errors_total": ("counter", "请求失败次数，按错误类型区分"),
+    "crawler_parse_seconds": ("summary", "页面解析与条目抽取耗时"),
+    "crawler_channel_seconds": ("summary", "单个栏目抓取与去重检查的总耗时"),
+    "crawler_items_extracted_total": ("counter", "抽取到的条目数"),
+    "crawler_dedupe_hits_total": ("counter", "去重检查中已入库的条目数"),
+    "crawler_items_new_total": ("counter", "新入库的通知数"),
+    "crawler_db_write_seconds": ("summary", "新通知写入数据库的耗时"),
+    "crawler_push_seconds": ("summary", "推送消息的耗时"),
+    "crawler_errors_total": ("counter", "栏目处理失败次数，按错误类型区分"),
+    # 搜索（callback 进程）
+    "search_cache_hits_total": ("counter", "搜索查询缓存命中次数，按缓存区分（query / term）"),
+    "search_cache_misses_total": ("counter", "搜索查询缓存未命中次数，按缓存区分（query / term）"),
+}
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+# (指标名, 标签) -> [sum, count]
+_RUN: Dict[Tuple[str, _LabelKey], List[float]] = {}
+_TOTAL: Dict[Tuple[str, _LabelKey], List[float]] = {}
+_LOCK = threading.Lock()
+
+
+def _record(name: str, labels: Dict[str, str], value: float):
+    if not ENABLE_METRICS:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _LOCK:
+        for values in (_RUN, _TOTAL):
+            entry = values.setdefault(key, [0.0, 0])
+            entry[0] += value
+            entry[1] += 1
+
+
+def inc(name: str, labels: Dict[str, str], value: float = 1):
+    """计数器加 value。"""
+    _record(name, labels, value)
+
+
+def observe(name: str, labels: Dict[str, str], seconds: float):
+    """记录一次耗时。"""
+    _record(name, labels, seconds)
+
+
+@contextmanager
+def timer(name: str, labels: Dict[str, str]):
+    """记录 with 语句块的耗时（块内抛出异常时同样记录）。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, labels, time.perf_counter() - start)
+
+
+def timed_iter(iterator: Iterator[Any], name: str, labels: Dict[str, str]) -> Iterator[Any]:
+    """包装惰性迭代器，只累计迭代器自身产出元素的耗时（不含调用方处理元素的时间）。"""
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        observe(name, labels, elapsed)
+
+
+def channel_labels(channel_task: Dict[str, Any]) -> Dict[str, str]:
+    """栏目级指标的标签。"""
+    return {"site": channel_task.get("site_name", "Unknown"), "channel": channel_task.get("channel_name", "Unknown")}
+
+
+# ====================================================================
+# 导出：Prometheus 文本格式 / 指标表
+# ====================================================================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """以 Prometheus 文本格式输出进程启动以来的累计指标。"""
+    with _LOCK:
+        snapshot = {key: list(entry) for key, entry in _TOTAL.items()}
+
+    lines = []
+    for name, (kind, help_text) in _METRICS.items():
+        series = sorted((labels, entry) for (metric, labels), entry in snapshot.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, (total, count) in series:
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            if kind == "summary":
+                lines.append(f"{name}_sum{{{label_text}}} {total:.6f}")
+                lines.append(f"{name}_count{{{label_text}}} {count}")
+            else:
+                lines.append(f"{name}{{{label_text}}} {total:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path: str = METRICS_FILE):
+    """把累计指标写入文本文件（可供 node_exporter 的 textfile collector 读取），先写临时文件再原子替换。"""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[Metrics] 写入指标文件失败: {e}")
+
+
+def flush_run() -> Optional[str]:
+    """
+    结束一轮运行：把本轮指标写入 CrawlMetrics 表并清空，同时更新 Prometheus 指标文件。
+    超过 METRICS_RETENTION_DAYS 的历史记录会被删除。
+
+    :return: 本轮的 run_id；未启用指标或本轮没有任何指标时返回 None。
+    """
+    if not ENABLE_METRICS:
+        return None
+
+    with _LOCK:
+        run_values = dict(_RUN)
+        _RUN.clear()
+
+    if not run_values:
+        return None
+
+    run_id = uuid.uuid4().hex
+    now = datetime.now()
+    recorded_at = now.strftime('%Y-%m-%d %H:%M:%S')
+    expire_before = (now - timedelta(days=METRICS_RETENTION_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        conn = get_db_connection()
+        with conn:
+            conn.executemany("""
+                INSERT INTO CrawlMetrics (run_id, recorded_at, name, labels, value, count)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (run_id, recorded_at, name, json.dumps(dict(labels), ensure_ascii=False), total, count)
+                for (name, labels), (total, count) in run_values.items()
+            ])
+            conn.execute("DELETE FROM CrawlMetrics WHERE recorded_at < ?", (expire_before,))
+    except Exception as e:
+        print(f"[Metrics] 保存本轮指标失败: {e}")
+
+    write_prometheus_file()
+    return run_id
+
+
+# ====================================================================
+# 本地 HTTP 端点（daemon 模式）
+# ====================================================================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取日志中不输出每次拉取指标的访问记录
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """在后台线程中启动 /metrics 端点，默认只监听本机。"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[Metrics] 指标端点已启动: http://{host}:{port}/metrics")
+    return server
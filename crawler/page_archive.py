@@ -0,0 +1,193 @@
+# crawler/page_archive.py
+import hashlib
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+from crawler.config import (
+    ENABLE_PAGE_ARCHIVE, PAGE_ARCHIVE_DIR, PAGE_ARCHIVE_LEVEL,
+    PAGE_ARCHIVE_KEEP_VERSIONS, PAGE_ARCHIVE_MAX_DAYS,
+)
+from database.utils_db import get_db_connection
+
+# ====================================================================
+# 原始页面归档：按内容寻址的压缩存储 + 按 URL 的索引
+#
+# 每个抓取到的列表页 / API 响应按原始字节的 SHA-256 存为一个压缩文件
+# （内容相同的响应只存一份），PageArchive 表记录每个 URL 出现过的版本。
+# 修改选择器后可用 reextract 命令离线重新抽取，无需任何网络请求。
+# 每个 URL 只保留最近的若干个版本（及保留期限内的版本），不再被引用的压缩文件随之删除。
+# ====================================================================
+
+# 压缩后端：优先 zstd（Python 3.14 标准库 compression.zstd 或第三方 zstandard），否则回退到 zlib
+try:
+    from compression import zstd as _zstd_stdlib
+except ImportError:
+    _zstd_stdlib = None
+
+try:
+    import zstandard as _zstandard
+except ImportError:
+    _zstandard = None
+
+_CODEC = ".zst" if (_zstd_stdlib or _zstandard) else ".zlib"
+
+
+def _compress(data: bytes) -> bytes:
+    if _zstd_stdlib:
+        return _zstd_stdlib.compress(data, level=PAGE_ARCHIVE_LEVEL)
+    if _zstandard:
+        return _zstandard.ZstdCompressor(level=PAGE_ARCHIVE_LEVEL).compress(data)
+    return zlib.compress(data, min(PAGE_ARCHIVE_LEVEL, 9))
+
+
+def _decompress(data: bytes, codec: str) -> Optional[bytes]:
+    if codec == ".zlib":
+        return zlib.decompress(data)
+    if _zstd_stdlib:
+        return _zstd_stdlib.decompress(data)
+    if _zstandard:
+        return _zstandard.ZstdDecompressor().decompress(data)
+    print("[Archive] 需要 zstd 支持才能读取 .zst 归档（pip install zstandard）")
+    return None
+
+
+class ArchivedPage(NamedTuple):
+    """一个已归档的页面版本。"""
+    url: str
+    body: bytes
+    content_type: str
+    encoding: Optional[str]
+    last_seen: str
+
+
+def _blob_path(body_hash: str, codec: str) -> str:
+    return os.path.join(PAGE_ARCHIVE_DIR, body_hash[:2], body_hash + codec)
+
+
+def _write_blob(body_hash: str, body: bytes):
+    """写入压缩后的响应体；相同内容已存在（任一压缩格式）时跳过。"""
+    if any(os.path.exists(_blob_path(body_hash, codec)) for codec in (".zst", ".zlib")):
+        return
+
+    path = _blob_path(body_hash, _CODEC)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 先写临时文件再原子替换，避免并发写入或中途退出留下不完整的文件
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_compress(body))
+    os.replace(tmp_path, path)
+
+
+def _read_blob(body_hash: str) -> Optional[bytes]:
+    """读取并解压响应体，文件缺失或无法解压时返回 None。"""
+    for codec in (".zst", ".zlib"):
+        path = _blob_path(body_hash, codec)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return _decompress(f.read(), codec)
+    return None
+
+
+def _prune(conn, url: Optional[str] = None) -> List[str]:
+    """
+    删除超出 PAGE_ARCHIVE_KEEP_VERSIONS 或早于 PAGE_ARCHIVE_MAX_DAYS 的归档记录，每个 URL 的最新版本总是保留。
+
+    :param url: 只清理该 URL 的记录，为 None 时清理全部 URL。
+    :return: 被删除记录的响应体摘要。
+    """
+    cutoff = ""
+    if PAGE_ARCHIVE_MAX_DAYS:
+        cutoff = (datetime.now() - timedelta(days=PAGE_ARCHIVE_MAX_DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+
+    rows = conn.execute("""
+        SELECT url, body_hash FROM (
+            SELECT url, body_hash, last_seen,
+                   ROW_NUMBER() OVER (PARTITION BY url ORDER BY last_seen DESC, rowid DESC) AS version
+            FROM PageArchive WHERE ? IS NULL OR url = ?
+        )
+        WHERE version > 1 AND ((? > 0 AND version > ?) OR last_seen < ?)
+    """, (url, url, PAGE_ARCHIVE_KEEP_VERSIONS, PAGE_ARCHIVE_KEEP_VERSIONS, cutoff)).fetchall()
+    conn.executemany("DELETE FROM PageArchive WHERE url = ? AND body_hash = ?", [tuple(row) for row in rows])
+    return [row["body_hash"] for row in rows]
+
+
+def _remove_unreferenced_blobs(conn, body_hashes: List[str]):
+    """删除已没有任何归档记录引用的压缩文件（同一内容可能被多个 URL 共享）。"""
+    for body_hash in set(body_hashes):
+        if conn.execute("SELECT 1 FROM PageArchive WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone():
+            continue
+        for codec in (".zst", ".zlib"):
+            try:
+                os.remove(_blob_path(body_hash, codec))
+            except FileNotFoundError:
+                pass
+
+
+def prune():
+    """按保留策略清理全部 URL 的归档（包括已不再抓取的 URL），每轮抓取结束时调用。"""
+    if not ENABLE_PAGE_ARCHIVE:
+        return
+
+    try:
+        conn = get_db_connection()
+        with conn:
+            removed = _prune(conn)
+        _remove_unreferenced_blobs(conn, removed)
+        if removed:
+            print(f"[Archive] 清理 {len(removed)} 个过期的归档版本。")
+    except Exception as e:
+        print(f"[Archive] 清理归档失败: {e}")
+
+
+def store(url: str, body: bytes, content_type: str = "", encoding: Optional[str] = None):
+    """
+    归档一次抓取到的响应。
+
+    :param url: 请求的 URL（url_list 中的原始地址）。
+    :param body: 响应的原始字节。
+    :param content_type: 响应的 Content-Type。
+    :param encoding: HTML 页面解码时使用的编码（API 响应为 None，由 JSON 解析自动识别）。
+    """
+    if not ENABLE_PAGE_ARCHIVE:
+        return
+
+    body_hash = hashlib.sha256(body).hexdigest()
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        _write_blob(body_hash, body)
+        conn = get_db_connection()
+        with conn:
+            conn.execute("""
+                INSERT INTO PageArchive (url, body_hash, content_type, encoding, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url, body_hash) DO UPDATE SET last_seen = excluded.last_seen
+            """, (url, body_hash, content_type, encoding, now, now))
+            removed = _prune(conn, url)
+        _remove_unreferenced_blobs(conn, removed)
+    except Exception as e:
+        # 归档失败不影响正常抓取
+        print(f"[Archive] 归档 {url} 失败: {e}")
+
+
+def load(url: str, all_versions: bool = False) -> List[ArchivedPage]:
+    """
+    读取某个 URL 的归档版本（按最后出现时间从新到旧）。
+
+    :param all_versions: False 时只返回最新版本；True 时返回全部历史版本（用于回填）。
+    """
+    sql = """
+        SELECT body_hash, content_type, encoding, last_seen FROM PageArchive
+        WHERE url = ? ORDER BY last_seen DESC, rowid DESC
+    """
+    if not all_versions:
+        sql += " LIMIT 1"
+
+    pages = []
+    for row in get_db_connection().execute(sql, (url,)).fetchall():
+        body = _read_blob(row["body_hash"])
+        if body is not None:
+            pages.append(ArchivedPage(url, body, row["content_type"] or "", row["encoding"], row["last_seen"]))
+    return pages
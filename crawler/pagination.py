@@ -0,0 +1,70 @@
+# crawler/pagination.py
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# ====================================================================
+# 分页规则：为 backfill（历史回填）生成列表的后续页面地址
+#
+# 栏目配置中的 pagination 描述列表如何翻页，两种写法任选其一：
+#   - HTML 列表页：{"url_template": "https://.../list{page}.htm", "start": 2}
+#     第 1 页为 url_list 的第一个地址，之后的页码代入模板。
+#   - API 接口：{"page_param": "pageNum", "start": 1}
+#     在 url_list 第一个地址的查询参数中替换（或追加）页码参数。
+# ====================================================================
+
+
+def validate_pagination(pagination: Any):
+    """
+    校验栏目的 pagination 配置。
+
+    :raises ValueError: 配置无效时抛出，消息说明具体原因。
+    """
+    if not isinstance(pagination, dict):
+        raise ValueError("pagination 必须是对象")
+
+    template = pagination.get("url_template")
+    page_param = pagination.get("page_param")
+    if bool(template) == bool(page_param):
+        raise ValueError("pagination 需要且只能配置 url_template 或 page_param 之一")
+    if template and "{page}" not in template:
+        raise ValueError("pagination.url_template 中缺少 {page} 占位符")
+
+    start = pagination.get("start", 2 if template else 1)
+    if not isinstance(start, int) or start < 0:
+        raise ValueError("pagination.start 必须是非负整数")
+
+
+def _with_query_param(url: str, name: str, value: int) -> str:
+    """替换（不存在时追加）URL 中的某个查询参数，其余参数保持原顺序。"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if any(key == name for key, _ in query):
+        query = [(key, str(value) if key == name else val) for key, val in query]
+    else:
+        query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def page_urls(channel_task: Dict[str, Any], max_pages: int) -> List[str]:
+    """
+    按栏目的 pagination 配置生成前 max_pages 页的地址（第 1 页在前）。
+
+    :param channel_task: 包含 pagination 配置的栏目任务。
+    :param max_pages: 最多生成的页数。
+    :return: 页面地址列表。
+    """
+    url_list = channel_task.get("url_list", [])
+    if not url_list or max_pages <= 0:
+        return []
+
+    first_url = url_list[0]
+    pagination = channel_task["pagination"]
+
+    template = pagination.get("url_template")
+    if template:
+        start = pagination.get("start", 2)
+        return [first_url] + [template.format(page=page) for page in range(start, start + max_pages - 1)]
+
+    page_param = pagination["page_param"]
+    start = pagination.get("start", 1)
+    return [_with_query_param(first_url, page_param, page) for page in range(start, start + max_pages)]
@@ -0,0 +1,109 @@
+# crawler/parse_pool.py
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler.config import PARSE_PROCESSES, LONG_RUN_PARSE_PROCESSES
+
+# ====================================================================
+# 解析阶段：HTML 解析在独立的进程池中执行
+#
+# 抓取线程拿到页面后立即把原始文本提交到进程池，解析与后续页面的网络 I/O 重叠进行，
+# 且多个页面的解析可以利用多个 CPU 核心，不再受 GIL 限制。
+# 进程池不可用（禁用、单核或工作进程崩溃）时，调用方回退到在当前线程中解析。
+# 进程池的启动开销较大，默认只在 daemon / backfill 等长时间运行的模式中通过 enable_for_long_run() 启用。
+# ====================================================================
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_POOL_DISABLED = False
+_WORKERS: Optional[int] = PARSE_PROCESSES
+
+
+def enable_for_long_run():
+    """daemon / backfill 启动时调用：改用 LONG_RUN_PARSE_PROCESSES 个解析进程，须在第一次提交解析前调用。"""
+    global _WORKERS
+    _WORKERS = LONG_RUN_PARSE_PROCESSES
+
+
+def _worker_count() -> int:
+    if _WORKERS is None:
+        return os.cpu_count() or 1
+    return _WORKERS
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """获取（必要时创建）共享的解析进程池，不可用时返回 None。"""
+    global _POOL
+
+    if _POOL_DISABLED:
+        return None
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers = _worker_count()
+            if workers <= 1:
+                return None
+            # 抓取进程中有大量线程，fork 可能复制持有中的锁，因此优先使用 forkserver
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _POOL
+
+
+def _disable(reason: Exception):
+    """进程池出现故障后停用，后续页面在调用方线程中解析。"""
+    global _POOL_DISABLED
+    if not _POOL_DISABLED:
+        _POOL_DISABLED = True
+        print(f"[ParsePool] 解析进程池不可用，回退到线程内解析: {reason!r}")
+
+
+def parse_html_page(html_text: str, html_config: Dict[str, Any], base_link_url: str, max_count: int) -> Tuple[List[Dict[str, str]], float]:
+    """
+    在工作进程中解析单个列表页。
+    抽取计划按配置在每个工作进程内编译并缓存，因此只需传递可序列化的配置。
+
+    :return: (条目列表, 解析耗时秒数)，耗时由主进程记录到指标中。
+    """
+    # html_handler 依赖本模块，在函数内导入以避免循环导入
+    from crawler.extraction_plan import get_html_plan
+    from crawler.html_handler import iter_html_items
+
+    start = time.perf_counter()
+    items = list(iter_html_items(html_text, get_html_plan(html_config), base_link_url, max_count))
+    return items, time.perf_counter() - start
+
+
+def submit_html_parse(html_text: str, html_config: Dict[str, Any], base_link_url: str, max_count: int) -> Optional[Future]:
+    """
+    把页面提交到解析进程池。
+
+    :return: 解析结果的 Future；进程池不可用时返回 None（由调用方自行解析）。
+    """
+    pool = _get_pool()
+    if pool is None:
+        return None
+
+    try:
+        return pool.submit(parse_html_page, html_text, html_config, base_link_url, max_count)
+    except (BrokenProcessPool, RuntimeError) as e:
+        _disable(e)
+        return None
+
+
+def get_result(future: Future) -> Optional[Tuple[List[Dict[str, str]], float]]:
+    """
+    等待解析结果。
+
+    :return: (条目列表, 解析耗时)；工作进程崩溃时返回 None（由调用方自行解析）。
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        _disable(e)
+        return None
@@ -0,0 +1,69 @@
+# crawler/scheduler.py
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from crawler.config import (
+    DAEMON_HISTORY_DAYS, DAEMON_POLLS_PER_UPDATE,
+    DAEMON_MIN_INTERVAL, DAEMON_MAX_INTERVAL, DAEMON_JITTER,
+)
+from database.database import get_channel_push_history
+
+# ====================================================================
+# 自适应轮询调度：根据 Notification.push_time 历史估计每个栏目的更新频率
+#
+# 更新频繁的栏目轮询间隔短，长期不更新的栏目轮询间隔长；
+# 间隔附加随机抖动，避免所有栏目在同一时刻集中请求。
+# ====================================================================
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def estimate_poll_interval(push_times: List[str], now: datetime) -> float:
+    """
+    根据栏目的推送历史估计轮询间隔（秒，未加抖动）。
+
+    平均更新间隔 = 观察时长 / 更新次数，其中观察时长从历史窗口起点
+    （或栏目第一次推送时间，取较晚者）算起；轮询间隔为平均更新间隔的 1/DAEMON_POLLS_PER_UPDATE。
+
+    :param push_times: 窗口内去重、升序的推送时间列表。
+    :param now: 当前时间。
+    :return: 限制在 [DAEMON_MIN_INTERVAL, DAEMON_MAX_INTERVAL] 内的轮询间隔。
+    """
+    if not push_times:
+        return DAEMON_MAX_INTERVAL
+
+    window_start = now - timedelta(days=DAEMON_HISTORY_DAYS)
+    first_push = datetime.strptime(push_times[0], _TIME_FORMAT)
+    observed_seconds = (now - max(window_start, first_push)).total_seconds()
+
+    # 至少按一天计算，避免刚入库的栏目被判断为“极其活跃”
+    mean_gap = max(observed_seconds, 86400) / len(push_times)
+    interval = mean_gap / DAEMON_POLLS_PER_UPDATE
+    return min(max(interval, DAEMON_MIN_INTERVAL), DAEMON_MAX_INTERVAL)
+
+
+def compute_poll_intervals(channels: List[Dict[str, Any]]) -> Dict[int, float]:
+    """
+    计算一组栏目的轮询间隔（秒，未加抖动）。
+    栏目配置中的 poll_interval（秒）优先于自动估计。
+
+    :return: {channel_id: 轮询间隔}。
+    """
+    now = datetime.now()
+    since = (now - timedelta(days=DAEMON_HISTORY_DAYS)).strftime(_TIME_FORMAT)
+    history = get_channel_push_history(since)
+
+    intervals: Dict[int, float] = {}
+    for channel in channels:
+        channel_id = channel['channel_id']
+        if channel.get('poll_interval'):
+            intervals[channel_id] = float(channel['poll_interval'])
+        else:
+            intervals[channel_id] = estimate_poll_interval(history.get(channel_id, []), now)
+    return intervals
+
+
+def with_jitter(interval: float) -> float:
+    """为轮询间隔加上 ±DAEMON_JITTER 的随机抖动。"""
+    return interval * random.uniform(1 - DAEMON_JITTER, 1 + DAEMON_JITTER)
@@ -0,0 +1,206 @@
+# crawler/session_pool.py
+import json
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from ZJUWebVPN import ZJUWebVPNSession
+from crawler import host_guard, metrics
+from crawler.config import PERSIST_WEBVPN_SESSION, WEBVPN_SESSION_FILE, WEBVPN_RATE_PER_SEC, WEBVPN_BURST
+from crawler.config import MAX_CONCURRENT_REQUESTS, HTTP_POOL_HOSTS
+from config.secret_config import WEBVPN_NAME, WEBVPN_SECRET
+
+# ====================================================================
+# 0. 连接池与压缩：所有会话按主机复用 keep-alive 连接
+# ====================================================================
+
+def _configure_session(ses: requests.Session) -> requests.Session:
+    """
+    为会话挂载按主机复用的连接池，并声明支持的压缩格式。
+    ACCEPT_ENCODING 由 urllib3 按已安装的解码库生成（gzip/deflate，安装 brotli / zstandard 后包含 br / zstd）。
+    """
+    # 每个主机的连接数上限取全局并发上限：经 WebVPN 的请求全部指向同一个主机
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+    ses.mount("http://", adapter)
+    ses.mount("https://", adapter)
+    ses.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return ses
+
+
+# 不经 WebVPN 的栏目共享同一个普通会话，同一主机上的多个栏目复用已建立的 TLS 连接
+_HTTP_SESSION: Optional[requests.Session] = None
+_HTTP_LOCK = threading.Lock()
+
+
+def _get_http_session() -> requests.Session:
+    """获取（必要时创建）进程内共享的普通会话。"""
+    global _HTTP_SESSION
+
+    with _HTTP_LOCK:
+        if _HTTP_SESSION is None:
+            _HTTP_SESSION = _configure_session(requests.Session())
+        return _HTTP_SESSION
+
+
+# ====================================================================
+# 1. 全局共享的 WebVPN 会话
+# ====================================================================
+
+# 所有 use_webvpn 的栏目共享同一个已登录会话（及其 keep-alive 连接池）
+_WEBVPN_SESSION: Optional[ZJUWebVPNSession] = None
+_WEBVPN_LOCK = threading.Lock()
+
+_WEBVPN_HOST = urlparse(ZJUWebVPNSession.ZJU_WEBVPN_BASEURL).hostname
+
+
+def _login_webvpn() -> ZJUWebVPNSession:
+    """执行一次完整的 WebVPN 登录握手。"""
+    print("[WebVPN] 正在登录 WebVPN...")
+    ses = ZJUWebVPNSession(WEBVPN_NAME, WEBVPN_SECRET)
+    print("[WebVPN] 登录成功。")
+    return _configure_session(ses)
+
+
+def _restore_webvpn() -> Optional[ZJUWebVPNSession]:
+    """
+    从磁盘恢复上次保存的 Cookie，并通过 /user/info 校验其是否仍然有效。
+    校验成功时同时取回 URL 加密所需的 key/iv，无需重新登录。
+    """
+    if not PERSIST_WEBVPN_SESSION or not os.path.exists(WEBVPN_SESSION_FILE):
+        return None
+
+    try:
+        with open(WEBVPN_SESSION_FILE, "r", encoding="utf-8") as f:
+            cookies = json.load(f)
+
+        ses = ZJUWebVPNSession()
+        ses.cookies.update(cookies)
+        r = ses.get(ses.baseURL + ses.INFO_URL, webvpn=False, timeout=10)
+        info = r.json()
+
+        ses.URL_encrypt_iv = info["wrdvpnIV"]
+        ses.URL_encrypt_key = info["wrdvpnKey"]
+        ses.canVisitProtocol = info["canVisitProtocol"]
+        ses.logined = True
+    except Exception as e:
+        print(f"[WebVPN] 已保存的会话不可用，将重新登录: {e}")
+        return None
+
+    print("[WebVPN] 已复用上次保存的会话。")
+    return _configure_session(ses)
+
+
+def _save_webvpn(ses: ZJUWebVPNSession):
+    """将当前会话的 Cookie 保存到磁盘，供下次运行复用。"""
+    if not PERSIST_WEBVPN_SESSION:
+        return
+
+    try:
+        os.makedirs(os.path.dirname(WEBVPN_SESSION_FILE) or ".", exist_ok=True)
+        with open(WEBVPN_SESSION_FILE, "w", encoding="utf-8") as f:
+            json.dump(requests.utils.dict_from_cookiejar(ses.cookies), f)
+    except OSError as e:
+        print(f"[WebVPN] 保存会话失败: {e}")
+
+
+def _get_webvpn_session() -> ZJUWebVPNSession:
+    """获取共享的 WebVPN 会话，首次调用时恢复或登录。"""
+    global _WEBVPN_SESSION
+
+    with _WEBVPN_LOCK:
+        if _WEBVPN_SESSION is None:
+            ses = _restore_webvpn()
+            if ses is None:
+                ses = _login_webvpn()
+                _save_webvpn(ses)
+            _WEBVPN_SESSION = ses
+        return _WEBVPN_SESSION
+
+
+def _renew_webvpn_session(stale: ZJUWebVPNSession) -> ZJUWebVPNSession:
+    """
+    在检测到会话过期后重新登录。
+    若其他线程已经完成了重新登录（当前会话不再是 stale），则直接复用新会话。
+    """
+    global _WEBVPN_SESSION
+
+    with _WEBVPN_LOCK:
+        if _WEBVPN_SESSION is stale or _WEBVPN_SESSION is None:
+            print("[WebVPN] 会话已过期，正在重新认证...")
+            _WEBVPN_SESSION = _login_webvpn()
+            _save_webvpn(_WEBVPN_SESSION)
+        return _WEBVPN_SESSION
+
+
+def _is_webvpn_login_page(r: requests.Response) -> bool:
+    """判断响应是否被 WebVPN 重定向到了登录页（即 Cookie 已失效）。"""
+    parsed = urlparse(r.url)
+    return parsed.hostname == _WEBVPN_HOST and parsed.path.startswith(ZJUWebVPNSession.LOGIN_URL)
+
+
+# ====================================================================
+# 2. 对外接口
+# ====================================================================
+
+def get_session(use_webvpn: bool) -> requests.Session:
+    """
+    根据栏目配置返回可用的会话。
+
+    :param use_webvpn: 是否通过 WebVPN 访问。
+    :return: use_webvpn 时返回全局共享的已登录会话，否则返回全局共享的普通会话。
+    """
+    if use_webvpn:
+        return _get_webvpn_session()
+    return _get_http_session()
+
+
+def _get_with_relogin(ses: requests.Session, url: str, **kwargs) -> requests.Response:
+    """发起 GET 请求；若 WebVPN 会话已过期，则透明地重新认证并重试一次。"""
+    if not isinstance(ses, ZJUWebVPNSession):
+        return ses.get(url, **kwargs)
+
+    # 所有经 WebVPN 转发的请求共用一个令牌桶，避免触发 WebVPN 的限流
+    host_guard.throttle(_WEBVPN_HOST, WEBVPN_RATE_PER_SEC, WEBVPN_BURST)
+    r = ses.get(url, **kwargs)
+
+    if _is_webvpn_login_page(r):
+        ses = _renew_webvpn_session(ses)
+        host_guard.throttle(_WEBVPN_HOST, WEBVPN_RATE_PER_SEC, WEBVPN_BURST)
+        r = ses.get(url, **kwargs)
+
+    return r
+
+
+def session_get(ses: requests.Session, url: str, **kwargs) -> requests.Response:
+    """
+    使用给定会话发起 GET 请求。
+    若 WebVPN 会话已过期，则透明地重新认证并重试一次。
+    请求结果（成功与否、耗时）会记录到目标主机的健康统计中，用于退避与熔断。
+    """
+    host = (urlparse(url).hostname or "").lower()
+    start = time.monotonic()
+    try:
+        r = _get_with_relogin(ses, url, **kwargs)
+    except Exception as e:
+        host_guard.record(host, False, time.monotonic() - start)
+        metrics.inc("crawler_request_errors_total", {"host": host, "type": type(e).__name__})
+        raise
+
+    # 5xx 与 429 说明服务端异常或正在限流，计为失败；4xx 通常是配置问题，不影响主机健康
+    ok = r.status_code < 500 and r.status_code != 429
+    elapsed = time.monotonic() - start
+    host_guard.record(host, ok, elapsed)
+
+    # r.elapsed 为收到响应头的耗时（requests 不单独暴露 DNS / 建立连接的耗时）；流式请求的响应体由调用方读取
+    ttfb = r.elapsed.total_seconds()
+    metrics.observe("crawler_request_ttfb_seconds", {"host": host}, ttfb)
+    if not kwargs.get("stream"):
+        metrics.observe("crawler_request_download_seconds", {"host": host}, max(elapsed - ttfb, 0.0))
+    if r.status_code >= 400:
+        metrics.inc("crawler_request_errors_total", {"host": host, "type": f"http_{r.status_code}"})
+    return r
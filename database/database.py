@@ -4,8 +4,13 @@ import json
 import os
 import hashlib
 import copy
-from typing import List, Dict, Any, Tuple
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
+from crawler.config import FTS_TOKENIZER
 from database import search_db
 from database.utils_db import get_db_connection
 
@@ -120,34 +125,20 @@ def _prepare_channel_data(task: Dict[str, Any]) -> Tuple[str, str, str, str, str
     return site_name, channel_name, main_url, base_link_url, final_mode, config_json
 
 # ==========================================================
-# 主函数 1: 初始化数据库
+# 辅助函数 3: Notification 表与 FTS5 索引结构 (含旧库迁移)
 # ==========================================================
 
-def initialize_db(sites_config: List[Dict[str, Any]]):
+def _create_notification_tables(cursor: sqlite3.Cursor, fts_tokenizer: str = FTS_TOKENIZER):
     """
-    主配置函数：初始化数据库结构，并执行非破坏性配置更新。
-    🚨 新增 FTS5 虚拟表的创建。
+    创建 Notification 主表及其 FTS5 索引。
+    指纹以 32 字节 BLOB 存储；FTS5 为 contentless 表，rowid 即 Notification.id。
+
+    :param fts_tokenizer: 新建 FTS5 索引时使用的分词后端（索引已存在时忽略）。
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # --- A. 创建表结构 ---
-    # Channel 表 (保持不变)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Channel (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            site_name TEXT NOT NULL,
-            channel_name TEXT NOT NULL,
-            url TEXT NOT NULL UNIQUE, 
-            base_link_url TEXT, 
-            mode TEXT NOT NULL,
-            config_json TEXT NOT NULL
-        )
-    """)
-    # Notification 表 (保持不变)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS Notification (
-            fingerprint TEXT PRIMARY KEY,
+            id INTEGER PRIMARY KEY,
+            fingerprint BLOB NOT NULL UNIQUE,
             channel_id INTEGER NOT NULL,
             title TEXT NOT NULL,
             link TEXT NOT NULL,
@@ -159,45 +150,258 @@ def initialize_db(sites_config: List[Dict[str, Any]]):
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_notification_channel ON Notification (channel_id)")
 
     # 🚨 FTS5 虚拟表创建：用于全文搜索
-    # 我们使用 rowid=fingerprint 作为主键，并指定 prefix='2' 优化前缀搜索
-    cursor.execute("""
-    CREATE VIRTUAL TABLE IF NOT EXISTS Notification_fts USING fts5(
-        title, 
-        fingerprint UNINDEXED,
-        prefix='2'             
-    );
-    """)
+    # 分词后端在建表时确定并记录在 Meta 表中，之后的索引写入与搜索都使用该后端，切换后端需运行 reindex
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'Notification_fts'").fetchone():
+        backend = search_db.get_backend(fts_tokenizer)
+        search_db.create_fts_table(cursor, "Notification_fts", backend)
+        _set_meta(cursor, "fts_tokenizer", backend.name)
     # 🚨 注意：不再创建 FTS5 触发器，因为索引同步现在由 Python (search_db) 处理。
-    
-    # --- B. 生成任务列表 ---
-    tasks_to_process = _generate_task_list(sites_config)
-    
-    # --- C. 遍历任务并写入数据库 (非破坏性更新) ---
-    for task in tasks_to_process:
-        # 使用辅助函数进行数据清洗和准备
+
+
+def _migrate_notification_storage(conn: sqlite3.Connection) -> bool:
+    """
+    将旧版结构（TEXT 十六进制指纹主键 + FTS5 中冗余保存指纹）迁移为新结构。
+    已分词的标题直接从旧 FTS5 表复制，保证迁移前后搜索结果一致。
+
+    :return: 是否执行了迁移。
+    """
+    columns = {row["name"]: row["type"] for row in conn.execute("PRAGMA table_info(Notification)")}
+    if columns.get("fingerprint", "").upper() != "TEXT":
+        return False
+
+    print("检测到旧版 Notification 表结构，开始迁移...")
+    cursor = conn.cursor()
+    try:
+        # DDL 不会隐式开启事务，显式 BEGIN 保证整个迁移是原子的
+        cursor.execute("BEGIN")
+
+        segmented_titles = dict(cursor.execute("SELECT fingerprint, title FROM Notification_fts").fetchall())
+        cursor.execute("DROP TABLE Notification_fts")
+        cursor.execute("DROP INDEX IF EXISTS idx_notification_channel")
+        cursor.execute("ALTER TABLE Notification RENAME TO Notification_legacy")
+
+        # 旧 FTS5 表中是 jieba 全模式的分词结果，新索引沿用该后端
+        _create_notification_tables(cursor, "jieba_full")
+
+        # 按原插入顺序复制，使新的 id 与推送先后一致
+        cursor.execute("""
+            SELECT fingerprint, channel_id, title, link, published_date, push_time
+            FROM Notification_legacy ORDER BY rowid
+        """)
+        cursor.executemany("""
+            INSERT INTO Notification 
+            (fingerprint, channel_id, title, link, published_date, push_time)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(bytes.fromhex(row[0]), *row[1:]) for row in cursor.fetchall()])
+
+        cursor.execute("SELECT id, fingerprint, title FROM Notification")
+        cursor.executemany(
+            "INSERT INTO Notification_fts (rowid, title) VALUES (?, ?)",
+            [
+                (row_id, segmented_titles.get(fingerprint.hex()) or search_db.segment_text(title))
+                for row_id, fingerprint, title in cursor.fetchall()
+            ]
+        )
+
+        cursor.execute("DROP TABLE Notification_legacy")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    print("Notification 表迁移完成。")
+    return True
+
+
+# ==========================================================
+# 辅助函数 4: 增量配置导入 (配置摘要 + 差异写入)
+# ==========================================================
+
+# 配置导入逻辑（_generate_task_list / _prepare_channel_data）变化时递增，使已保存的配置摘要失效
+_CONFIG_IMPORT_VERSION = 1
+
+_CHANNEL_FIELDS = ("site_name", "channel_name", "base_link_url", "mode", "config_json")
+
+def _config_digest(sites_config: List[Dict[str, Any]]) -> str:
+    """计算站点配置的摘要（与 JSON 中键的顺序、空白无关）。"""
+    data = json.dumps(sites_config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{_CONFIG_IMPORT_VERSION}:{data}".encode('utf-8')).hexdigest()
+
+def _get_meta(cursor: sqlite3.Cursor, key: str) -> Optional[str]:
+    row = cursor.execute("SELECT value FROM Meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _set_meta(cursor: sqlite3.Cursor, key: str, value: str):
+    cursor.execute("INSERT OR REPLACE INTO Meta (key, value) VALUES (?, ?)", (key, value))
+
+def _sync_channels(cursor: sqlite3.Cursor, sites_config: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+    """
+    将配置生成的栏目与 Channel 表对比（以主 URL 为键），只写入差异：
+    新增的栏目 INSERT，内容变化或重新出现的栏目 UPDATE，已从配置中删除的栏目标记为停用。
+    栏目记录不会被删除，已推送通知的 channel_id 始终有效。
+
+    :return: (新增数, 更新数, 停用数)。
+    """
+    # 1. 配置中的栏目（主 URL 重复时后者覆盖前者，与逐条 UPDATE 的结果一致）
+    desired: Dict[str, Tuple[str, ...]] = {}
+    for task in _generate_task_list(sites_config):
         site_name, channel_name, main_url, base_link_url, final_mode, config_json = _prepare_channel_data(task)
+        desired[main_url] = (site_name, channel_name, base_link_url, final_mode, config_json)
+
+    # 2. 数据库中的栏目
+    existing = {
+        row["url"]: row
+        for row in cursor.execute(f"SELECT url, active, {', '.join(_CHANNEL_FIELDS)} FROM Channel").fetchall()
+    }
 
-        # 1. 尝试 UPDATE 已存在的记录 (基于 url 唯一键)
+    inserts = [(url, *values) for url, values in desired.items() if url not in existing]
+    updates = [
+        (*values, url) for url, values in desired.items()
+        if url in existing and (not existing[url]["active"] or tuple(existing[url][f] for f in _CHANNEL_FIELDS) != values)
+    ]
+    deactivations = [(url,) for url, row in existing.items() if row["active"] and url not in desired]
+
+    # 3. 只写入差异
+    cursor.executemany("""
+        INSERT INTO Channel (url, site_name, channel_name, base_link_url, mode, config_json)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, inserts)
+    cursor.executemany("""
+        UPDATE Channel SET
+            site_name = ?,
+            channel_name = ?,
+            base_link_url = ?,
+            mode = ?,
+            config_json = ?,
+            active = 1
+        WHERE url = ?
+    """, updates)
+    cursor.executemany("UPDATE Channel SET active = 0 WHERE url = ?", deactivations)
+
+    return len(inserts), len(updates), len(deactivations)
+
+
+# ==========================================================
+# 主函数 1: 初始化数据库
+# ==========================================================
+
+def initialize_db(sites_config: List[Dict[str, Any]]):
+    """
+    主配置函数：初始化数据库结构，并执行非破坏性配置更新。
+    🚨 新增 FTS5 虚拟表的创建。
+    配置摘要与上次导入相同时直接跳过；否则只写入新增、变化和删除的栏目，全部在一个事务中完成。
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Meta 表：键值对形式的内部状态（已导入配置的摘要、全文索引的分词后端等），迁移时也会用到
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+    # 旧库迁移后执行 VACUUM 回收空间（VACUUM 不能在事务中执行），
+    # WAL 模式下需再做一次 checkpoint，数据库文件才会真正缩小
+    if _migrate_notification_storage(conn):
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    try:
+        # --- A. 创建表结构 ---
+        # Channel 表 (保持不变)
         cursor.execute("""
-            UPDATE Channel SET
-                site_name = ?,
-                channel_name = ?,
-                base_link_url = ?,
-                mode = ?,
-                config_json = ?
-            WHERE url = ?
-        """, (site_name, channel_name, base_link_url, final_mode, config_json, main_url))
-        
-        # 2. 如果 UPDATE 失败 (即新配置)，则执行 INSERT
-        if cursor.rowcount == 0:
-            cursor.execute("""
-                INSERT OR IGNORE INTO Channel 
-                (site_name, channel_name, url, base_link_url, mode, config_json)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (site_name, channel_name, main_url, base_link_url, final_mode, config_json))
+            CREATE TABLE IF NOT EXISTS Channel (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                site_name TEXT NOT NULL,
+                channel_name TEXT NOT NULL,
+                url TEXT NOT NULL UNIQUE, 
+                base_link_url TEXT, 
+                mode TEXT NOT NULL,
+                config_json TEXT NOT NULL,
+                active INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        # 旧库的 Channel 表没有 active 列（从 sites.json 删除的栏目标记为 0，其历史通知仍可检索）
+        channel_columns = {row["name"] for row in cursor.execute("PRAGMA table_info(Channel)")}
+        if "active" not in channel_columns:
+            cursor.execute("ALTER TABLE Channel ADD COLUMN active INTEGER NOT NULL DEFAULT 1")
+
+        # Notification 表与 FTS5 索引
+        _create_notification_tables(cursor)
+        indexed_tokenizer = search_db.index_backend(cursor).name
+        if indexed_tokenizer != FTS_TOKENIZER:
+            print(f"提示: 全文索引使用 {indexed_tokenizer} 分词，与配置的 {FTS_TOKENIZER} 不同，运行 python main.py reindex 后生效。")
+
+        # FetchCache 表：记录列表页的 ETag / Last-Modified / 响应体摘要，用于条件请求
+        # fresh_until 为订阅源声明的缓存有效期（ttl），在此之前不再请求；ttl 记录声明的秒数，304 响应没有响应体时沿用
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS FetchCache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                updated_at TEXT,
+                fresh_until TEXT,
+                ttl REAL
+            )
+        """)
+        fetch_cache_columns = {row["name"] for row in cursor.execute("PRAGMA table_info(FetchCache)")}
+        if "fresh_until" not in fetch_cache_columns:
+            cursor.execute("ALTER TABLE FetchCache ADD COLUMN fresh_until TEXT")
+        if "ttl" not in fetch_cache_columns:
+            cursor.execute("ALTER TABLE FetchCache ADD COLUMN ttl REAL")
+
+        # PageArchive 表：原始页面归档的索引，记录每个 URL 出现过的响应版本（内容存于 storage/archive）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS PageArchive (
+                url TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                content_type TEXT,
+                encoding TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                PRIMARY KEY (url, body_hash)
+            )
+        """)
+
+        # CrawlMetrics 表：每轮运行的抓取指标（耗时总和 / 次数、计数），labels 为 JSON 对象
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS CrawlMetrics (
+                run_id TEXT NOT NULL,
+                recorded_at TEXT NOT NULL,
+                name TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                value REAL NOT NULL,
+                count INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_metrics_time ON CrawlMetrics (recorded_at)")
+    
+        # --- B. 配置未变化时跳过导入 ---
+        # 编译后的任务列表即 Channel 表本身，配置摘要相同则无需重新生成和写入
+        digest = _config_digest(sites_config)
+        if not sites_config:
+            # sites.json 缺失或无法解析时保留现有栏目，避免误停用全部栏目
+            print("警告: 未加载到任何站点配置，保留数据库中现有的栏目。")
+        elif _get_meta(cursor, "sites_config_hash") == digest:
+            print("配置未变化，跳过导入。")
+        else:
+            # --- C. 对比差异，只写入新增、变化和删除的栏目 ---
+            added, updated, deactivated = _sync_channels(cursor, sites_config)
+            _set_meta(cursor, "sites_config_hash", digest)
+            # 搜索结果中包含站点与栏目名称
+            search_db.bump_data_version(cursor)
+            print(f"配置已导入：新增 {added} 个、更新 {updated} 个、停用 {deactivated} 个栏目。")
+
+        conn.commit()
+    except Exception:
+        # 连接在线程内复用，出错时必须回滚，避免残留未提交的事务
+        conn.rollback()
+        raise
 
-    conn.commit()
-    conn.close()
     print("数据库初始化和配置导入完成。")
 
 
@@ -205,13 +409,13 @@ def initialize_db(sites_config: List[Dict[str, Any]]):
 # 2. 核心去重和存储函数 (Fingerprint Logic)
 # ==========================================================
 
-def generate_fingerprint(title: str, link: str) -> str:
-    """根据通知的标题和链接生成唯一的 SHA-256 指纹。"""
+def generate_fingerprint(title: str, link: str) -> bytes:
+    """根据通知的标题和链接生成唯一的 SHA-256 指纹（32 字节摘要，直接作为 BLOB 存储）。"""
     # 【已修正】使用正确的 sha256 算法
     data = f"{title.strip().lower()}:{link.strip()}"
-    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+    return hashlib.sha256(data.encode('utf-8')).digest()
 
-def is_notification_new(fingerprint: str) -> bool:
+def is_notification_new(fingerprint: bytes) -> bool:
     """检查通知是否已存在于 Notification 表中。"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -222,7 +426,6 @@ def is_notification_new(fingerprint: str) -> bool:
     )
     
     is_new = cursor.fetchone() is None
-    conn.close()
     return is_new
 
 def add_new_notification(channel_id: int, notification_data: Dict[str, str]) -> bool:
@@ -258,8 +461,9 @@ def add_new_notification(channel_id: int, notification_data: Dict[str, str]) ->
         
         # 2. 如果主表插入成功，则更新 FTS5 索引
         if inserted:
-            # 只传递 cursor 对象
-            search_db.update_fts5_index_sync(cursor, fingerprint, title)
+            # 只传递 cursor 对象，新行的 id 即 FTS5 索引的 rowid
+            search_db.update_fts5_index_sync(cursor, cursor.lastrowid, title)
+            search_db.bump_data_version(cursor)
             
         # 3. 提交事务
         conn.commit()
@@ -269,12 +473,184 @@ def add_new_notification(channel_id: int, notification_data: Dict[str, str]) ->
     except Exception as e:
         # 4. 出现任何错误时回滚
         conn.rollback()
-        print(f"[ERROR] Transaction failed for notification {fingerprint}. Rolling back. Error: {e}")
+        print(f"[ERROR] Transaction failed for notification {fingerprint.hex()}. Rolling back. Error: {e}")
         return False
-        
-    finally:
-        # 5. 关闭连接
-        conn.close()
+
+
+# ==========================================================
+# 2.1 批量去重和存储函数 (单栏目单事务)
+# ==========================================================
+
+# SQLite 单条语句的参数数量有上限，IN (...) 查询按批拆分
+_IN_QUERY_BATCH = 500
+
+def _find_existing_fingerprints(cursor: sqlite3.Cursor, fingerprints: List[bytes]) -> Set[bytes]:
+    """使用 IN (...) 查询找出已存在于 Notification 表中的指纹。"""
+    existing: Set[bytes] = set()
+    for start in range(0, len(fingerprints), _IN_QUERY_BATCH):
+        batch = fingerprints[start:start + _IN_QUERY_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        cursor.execute(
+            f"SELECT fingerprint FROM Notification WHERE fingerprint IN ({placeholders})",
+            batch
+        )
+        existing.update(row[0] for row in cursor.fetchall())
+    return existing
+
+def filter_new_fingerprints(fingerprints: List[bytes]) -> Set[bytes]:
+    """
+    批量去重检查：一次查询返回其中尚未入库的指纹集合。
+    """
+    if not fingerprints:
+        return set()
+
+    conn = get_db_connection()
+    existing = _find_existing_fingerprints(conn.cursor(), list(fingerprints))
+    return set(fingerprints) - existing
+
+def get_channel_recent_date(channel_id: int, n: int) -> Optional[str]:
+    """
+    获取栏目已入库通知中第 n 新的发布日期（忽略没有日期的通知），用于判断页面条目是否属于最近的通知。
+
+    :return: YYYY-MM-DD 格式的日期；栏目中带日期的通知不足 n 条时返回 None。
+    """
+    row = get_db_connection().execute("""
+        SELECT published_date FROM Notification
+        WHERE channel_id = ? AND published_date != 'N/A'
+        ORDER BY published_date DESC LIMIT 1 OFFSET ?
+    """, (channel_id, max(n, 1) - 1)).fetchone()
+    return row[0] if row else None
+
+def add_new_notifications(channel_id: int, notifications: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    批量存储一个栏目的通知：一次 IN 查询去重，executemany 写入主表和 FTS5 索引，只提交一次。
+
+    :param channel_id: 通知所属栏目 ID。
+    :param notifications: 待写入的通知列表（title, link, date）。
+    :return: 实际新写入的通知列表（保持原顺序，已存在或重复的条目被过滤）。
+    写入失败时事务回滚并重新抛出异常，调用方据此区分“写入失败”与“没有新通知”。
+    """
+    if not notifications:
+        return []
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    push_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    # 1. 计算指纹并去除批次内部的重复条目
+    batch: Dict[bytes, Dict[str, str]] = {}
+    for item in notifications:
+        fingerprint = generate_fingerprint(item['title'], item['link'])
+        batch.setdefault(fingerprint, item)
+
+    try:
+        # 2. 一次查询过滤已存在的通知
+        existing = _find_existing_fingerprints(cursor, list(batch))
+        new_rows = [(fp, item) for fp, item in batch.items() if fp not in existing]
+
+        if new_rows:
+            # 3. 批量插入 Notification 主表
+            cursor.executemany("""
+                INSERT OR IGNORE INTO Notification 
+                (fingerprint, channel_id, title, link, published_date, push_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (fp, channel_id, item['title'], item['link'], item.get('date', 'N/A'), push_time)
+                for fp, item in new_rows
+            ])
+
+            # 4. 批量更新 FTS5 索引
+            search_db.update_fts5_index_batch_sync(cursor, [(fp, item['title']) for fp, item in new_rows])
+            search_db.bump_data_version(cursor)
+
+        # 5. 整个栏目只提交一次
+        conn.commit()
+        return [item for _, item in new_rows]
+
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] Batch transaction failed for channel {channel_id}. Rolling back. Error: {e}")
+        raise
+
+
+# ==========================================================
+# 2.1 全文索引重建 (reindex)
+# ==========================================================
+
+_REINDEX_BATCH_SIZE = 2000   # 每个分词任务包含的标题数
+
+def _fts_index_bytes(cursor: sqlite3.Cursor, table: str) -> int:
+    """FTS5 索引数据（倒排表）占用的字节数。"""
+    return cursor.execute(f"SELECT COALESCE(SUM(LENGTH(block)), 0) FROM {table}_data").fetchone()[0]
+
+def _segment_titles(backend: search_db.FtsBackend, titles: List[str], processes: int) -> List[str]:
+    """按批在进程池中并行分词，结果与 titles 顺序一致；进程数为 1 或标题较少时直接在当前进程中分词。"""
+    batches = [titles[i:i + _REINDEX_BATCH_SIZE] for i in range(0, len(titles), _REINDEX_BATCH_SIZE)]
+    if processes <= 1 or len(batches) <= 1:
+        return [backend.segment(title) for title in titles]
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=min(processes, len(batches)), mp_context=context) as pool:
+        return [text for batch in pool.map(search_db.segment_batch, repeat(backend.name), batches) for text in batch]
+
+def rebuild_fts_index(tokenizer_name: str = FTS_TOKENIZER, processes: Optional[int] = None) -> bool:
+    """
+    使用指定的分词后端重建 Notification_fts。
+    先在新表中建立完整索引（分词在进程池中并行），再在一个写事务中补齐重建期间新增的通知、
+    替换旧索引并记录后端，重建过程中搜索与入库照常进行。
+
+    :param tokenizer_name: 分词后端名称（见 search_db.FTS_BACKENDS）。
+    :param processes: 分词进程数，默认使用全部 CPU 核心。
+    :return: 是否重建成功。
+    """
+    backend = search_db.get_backend(tokenizer_name)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    start = time.perf_counter()
+
+    try:
+        old_tokenizer = search_db.index_backend(cursor).name
+        old_bytes = _fts_index_bytes(cursor, "Notification_fts")
+
+        # 1. 为当前全部通知建立新索引（新表对搜索不可见）
+        rows = cursor.execute("SELECT id, title FROM Notification ORDER BY id").fetchall()
+        last_id = rows[-1]["id"] if rows else 0
+        segmented = _segment_titles(backend, [row["title"] for row in rows], processes or os.cpu_count() or 1)
+
+        cursor.execute("DROP TABLE IF EXISTS Notification_fts_new")   # 上次中断遗留的临时表
+        search_db.create_fts_table(cursor, "Notification_fts_new", backend)
+        cursor.executemany(
+            "INSERT INTO Notification_fts_new (rowid, title) VALUES (?, ?)",
+            zip((row["id"] for row in rows), segmented)
+        )
+        # 合并所有 b-tree 段，得到最紧凑的索引
+        cursor.execute("INSERT INTO Notification_fts_new (Notification_fts_new) VALUES ('optimize')")
+        conn.commit()
+
+        # 2. 持有写锁，补齐重建期间写入的通知后原子替换
+        cursor.execute("BEGIN IMMEDIATE")
+        late_rows = cursor.execute("SELECT id, title FROM Notification WHERE id > ?", (last_id,)).fetchall()
+        cursor.executemany(
+            "INSERT INTO Notification_fts_new (rowid, title) VALUES (?, ?)",
+            [(row["id"], backend.segment(row["title"])) for row in late_rows]
+        )
+        cursor.execute("DROP TABLE Notification_fts")
+        cursor.execute("ALTER TABLE Notification_fts_new RENAME TO Notification_fts")
+        _set_meta(cursor, "fts_tokenizer", backend.name)
+        search_db.bump_data_version(cursor)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] 重建全文索引失败，保留原索引: {e}")
+        return False
+
+    new_bytes = _fts_index_bytes(cursor, "Notification_fts")
+    print(
+        f"全文索引重建完成: {old_tokenizer} -> {backend.name}，{len(rows) + len(late_rows)} 条通知，"
+        f"索引 {old_bytes / 1024:.0f} KiB -> {new_bytes / 1024:.0f} KiB，耗时 {time.perf_counter() - start:.1f}s"
+    )
+    return True
 
 
 # ==========================================================
@@ -282,11 +658,11 @@ def add_new_notification(channel_id: int, notification_data: Dict[str, str]) ->
 # ==========================================================
 
 def get_all_channels() -> List[Dict[str, Any]]:
-    """从数据库获取所有栏目的完整配置，并将其扁平化。"""
+    """从数据库获取所有启用栏目的完整配置，并将其扁平化。"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id, site_name, channel_name, url, base_link_url, mode, config_json FROM Channel")
+    cursor.execute("SELECT id, site_name, channel_name, url, base_link_url, mode, config_json FROM Channel WHERE active = 1")
     
     channels = []
     for row in cursor.fetchall():
@@ -303,5 +679,25 @@ def get_all_channels() -> List[Dict[str, Any]]:
             **config                          # 展开 JSON 中的内容 (包含 url_list, max_count, html_config/api_config 等)
         })
         
-    conn.close()
-    return channels
\ No newline at end of file
+    return channels
+
+
+def get_channel_push_history(since: str) -> Dict[int, List[str]]:
+    """
+    获取每个栏目自 since 以来的推送时间（去重、升序），用于估计栏目的更新频率。
+    同一次运行写入的多条通知共用一个 push_time，因此每个时间点代表一次“更新”。
+
+    :param since: 起始时间，格式为 '%Y-%m-%d %H:%M:%S'。
+    :return: {channel_id: [push_time, ...]}，没有推送记录的栏目不出现在结果中。
+    """
+    conn = get_db_connection()
+    cursor = conn.execute("""
+        SELECT DISTINCT channel_id, push_time FROM Notification
+        WHERE push_time >= ?
+        ORDER BY channel_id, push_time
+    """, (since,))
+
+    history: Dict[int, List[str]] = {}
+    for row in cursor.fetchall():
+        history.setdefault(row['channel_id'], []).append(row['push_time'])
+    return history
\ No newline at end of file
@@ -1,9 +1,16 @@
 # database/search_db.py
-from typing import List, Dict, Any
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, List, Dict, Any, Optional, Tuple
 from database.utils_db import get_db_connection
+from crawler import metrics
+from crawler.config import SEARCH_QUERY_CACHE_SIZE, SEARCH_TERM_CACHE_SIZE, SEARCH_RESULT_CACHE_SIZE
+from crawler.config import PLANNER_PREFIX_MAX_TERMS, PLANNER_PREFIX_EXPANSION
 import sqlite3
-import jieba
+import threading
 import re
+from database import tokenizer
+from database.search_query import Clause, Phrase, QueryNode, QuerySyntaxError, Term, parse_query
 
 # ----------------------------------------------------------------------
 # 1. 核心工具函数：中文分词与 FTS5 查询构建
@@ -11,84 +18,448 @@ import re
 
 def segment_text(text: str) -> str:
     """使用 Jieba 对文本进行分词，并用空格连接，以便 FTS5 索引。"""
-    # 使用全模式（cut_all=True）来提高分词的召回率。
-    return " ".join(jieba.cut(text.strip(), cut_all=True))
+    # 使用全模式（cut_all=True）来提高分词的召回率。分词器在首次调用时才初始化。
+    return " ".join(tokenizer.cut(text.strip(), cut_all=True))
 
-def _process_term(term: str) -> str:
-    """对纯文本进行分词、模糊化，并用 AND 连接后，用括号包裹。"""
-    term = term.strip()
-    if not term:
-        return ""
-    
-    # 1. 分词
-    segmented_terms = segment_text(term)
-    
-    # 2. 模糊化 (加 *)
-    fts_terms = [f'{t}*' for t in segmented_terms.split() if t and len(t.strip()) > 0]
-    
-    if not fts_terms:
-        return ""
-        
-    # 3. 结果: (词1* AND 词2*)
-    return f"({' AND '.join(fts_terms)})"
+# ----------------------------------------------------------------------
+# 1.1 分词后端：决定写入索引的词元，以及搜索词如何转换为 FTS5 子句
+# ----------------------------------------------------------------------
+
+# 含有文字或数字的词元才作为检索词，标点、空白等分词结果被丢弃
+_WORD_TOKEN = re.compile(r'\w')
+# 连续的中文字符（split 时作为捕获组保留，位于结果的奇数下标）
+_CJK_RUN = re.compile(r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)')
+
+@dataclass(frozen=True)
+class FtsBackend:
+    """全文索引的分词后端。索引与搜索必须使用同一个后端。"""
+    name: str
+    table_options: str                              # 创建 FTS5 表时的附加参数（分词器、前缀索引）
+    segment: Callable[[str], str]                   # 标题 -> 写入索引的文本
+    query_clauses: Callable[[str], List[Clause]]    # 纯文本搜索词 -> 以 AND 连接的 FTS5 子句
+    phrase_clause: Callable[[str], Clause]          # 引号短语 -> FTS5 短语子句
+    prefix_index: int = 0                           # 前缀索引覆盖的字符数，更短的前缀查询需要逐个扫描词元
+    overlapping: bool = False                       # 分词片段互相重叠（全模式），被其他片段包含的片段是冗余的
+    vocab_stats: bool = True                        # 查询词元即索引词元，可用 fts5vocab 估计文档频率
+
+def _prefix_clauses(tokens: List[str]) -> List[Clause]:
+    return [Clause((t,), prefix=True) for t in tokens if _WORD_TOKEN.search(t)]
+
+def _verbatim_phrase(text: str) -> Clause:
+    """短语原样交给 FTS5 的分词器处理。"""
+    return Clause((text,))
+
+def _jieba_full_clauses(term: str) -> List[Clause]:
+    return _prefix_clauses(segment_text(term).split())
+
+def _jieba_precise_segment(text: str) -> str:
+    """jieba 精确模式：词元不重叠，索引更小，但搜索词需与分词边界一致（前缀匹配可部分弥补）。"""
+    return " ".join(tokenizer.cut(text.strip()))
+
+def _jieba_precise_clauses(term: str) -> List[Clause]:
+    return _prefix_clauses(_jieba_precise_segment(term).split())
+
+def _bigrams(run: str) -> List[str]:
+    """把一段连续中文切为重叠的二字词，单字保留。"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+def _bigram_segment(text: str) -> str:
+    """中文切为重叠的二字词，其余部分原样保留，由 FTS5 的 unicode61 分词器切分。"""
+    tokens: List[str] = []
+    for i, part in enumerate(_CJK_RUN.split(text)):
+        tokens.extend(_bigrams(part) if i % 2 else part.split())
+    return " ".join(tokens)
+
+def _bigram_clauses(term: str) -> List[Clause]:
+    """中文搜索词转为相邻二字词组成的短语（即子串匹配），单字用前缀匹配。"""
+    clauses: List[Clause] = []
+    for i, part in enumerate(_CJK_RUN.split(term)):
+        if not i % 2:
+            clauses.extend(_prefix_clauses(part.split()))
+        elif len(part) == 1:
+            clauses.append(Clause((part,), prefix=True))
+        else:
+            clauses.append(Clause(tuple(_bigrams(part))))
+    return clauses
+
+def _bigram_phrase(text: str) -> Clause:
+    return Clause(tuple(_bigram_segment(text).split()))
+
+def _trigram_segment(text: str) -> str:
+    """FTS5 内置 trigram 分词器直接索引原文。"""
+    return text.strip()
+
+def _trigram_clauses(term: str) -> List[Clause]:
+    """每个词作为子串匹配；trigram 索引无法匹配少于 3 个字的词。"""
+    return [Clause((word,)) for word in term.split()]
+
+FTS_BACKENDS: Dict[str, FtsBackend] = {
+    # 全模式：召回率最高，但重叠词元使索引膨胀、查询展开为大量前缀子句
+    "jieba_full": FtsBackend("jieba_full", "prefix='2'", segment_text, _jieba_full_clauses, _verbatim_phrase,
+                             prefix_index=2, overlapping=True),
+    "jieba_precise": FtsBackend("jieba_precise", "prefix='2'", _jieba_precise_segment, _jieba_precise_clauses, _verbatim_phrase,
+                                prefix_index=2),
+    # 二字词：不依赖词典，任意子串都能匹配；单字搜索依赖 1 字前缀索引
+    "bigram": FtsBackend("bigram", "prefix='1'", _bigram_segment, _bigram_clauses, _bigram_phrase,
+                         prefix_index=1),
+    # trigram 的索引词元是三字片段，与查询中的词不对应，不做基于统计的规划
+    "trigram": FtsBackend("trigram", "tokenize='trigram'", _trigram_segment, _trigram_clauses, _verbatim_phrase,
+                          vocab_stats=False),
+}
+
+def get_backend(name: str) -> FtsBackend:
+    """按名称获取分词后端，名称无效时抛出 ValueError。"""
+    if name not in FTS_BACKENDS:
+        raise ValueError(f"未知的分词后端 '{name}'，可选: {', '.join(FTS_BACKENDS)}")
+    return FTS_BACKENDS[name]
+
+def index_backend(cursor: sqlite3.Cursor) -> FtsBackend:
+    """返回 Notification_fts 建立时使用的分词后端（记录在 Meta 表中）。"""
+    try:
+        row = cursor.execute("SELECT value FROM Meta WHERE key = 'fts_tokenizer'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    # 引入分词后端之前建立的索引都是 jieba 全模式
+    return get_backend(row[0] if row else "jieba_full")
+
+def create_fts_table(cursor: sqlite3.Cursor, table: str, backend: FtsBackend):
+    """
+    创建 FTS5 索引表。索引的是分词后的标题，原文由 Notification 表保存，
+    因此使用 contentless 表 (content='')，搜索时按 rowid 直接连接回主表。
+    """
+    cursor.execute(f"CREATE VIRTUAL TABLE {table} USING fts5(title, content='', {backend.table_options})")
+
+def segment_batch(backend_name: str, titles: List[str]) -> List[str]:
+    """在工作进程中批量分词（reindex 使用），只传递后端名称以便序列化。"""
+    segment = get_backend(backend_name).segment
+    return [segment(title) for title in titles]
+
+# ----------------------------------------------------------------------
+# 1.2 查询缓存：热门搜索词（如"讲座""奖学金"）的分词与查询构建结果直接复用
+# ----------------------------------------------------------------------
+
+class _LruCache:
+    """线程安全的有界 LRU 缓存，记录命中 / 未命中次数（同时计入 crawler_metrics 的 search_cache_* 指标）。"""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """返回缓存的值；未命中时调用 compute() 计算并写入（计算在锁外进行）。"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit = True
+                value = self._data[key]
+            else:
+                self.misses += 1
+                hit = False
+
+        metrics.inc("search_cache_hits_total" if hit else "search_cache_misses_total", {"cache": self.name})
+        if hit:
+            return value
+
+        value = compute()
+        if self.maxsize > 0:
+            with self._lock:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+# 键均包含分词后端名称，reindex 切换后端后不会取到旧后端的结果
+_QUERY_CACHE = _LruCache("query", SEARCH_QUERY_CACHE_SIZE)   # (后端, 统计版本, 规范化的关键词) -> FTS5 查询
+_TERM_CACHE = _LruCache("term", SEARCH_TERM_CACHE_SIZE)      # (后端, 纯文本搜索词) -> FTS5 子句
+# 键包含数据版本，新通知入库后旧版本的结果不再命中，由 LRU 自然淘汰
+_RESULT_CACHE = _LruCache("result", SEARCH_RESULT_CACHE_SIZE)  # (数据版本, 规范化的关键词, limit) -> 搜索结果
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    返回查询缓存与结果缓存的统计信息，供监控使用。
+
+    :return: {"query": {hits, misses, size, maxsize}, "term": {...}, "result": {...}}。
+    """
+    return {cache.name: cache.stats() for cache in (_QUERY_CACHE, _TERM_CACHE, _RESULT_CACHE)}
+
+def clear_caches():
+    """清空查询缓存与结果缓存（例如修改用户词典后）。"""
+    _QUERY_CACHE.clear()
+    _TERM_CACHE.clear()
+    _RESULT_CACHE.clear()
+
+def data_version(cursor: sqlite3.Cursor) -> str:
+    """返回通知数据的版本号（Meta 表中的 data_version），通知、索引或栏目写入时递增。"""
+    try:
+        row = cursor.execute("SELECT value FROM Meta WHERE key = 'data_version'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    return row[0] if row else "0"
+
+def bump_data_version(cursor: sqlite3.Cursor):
+    """递增数据版本，使搜索结果缓存失效。应与写入通知 / 索引 / 栏目在同一事务中调用，跨进程同样生效。"""
+    cursor.execute("""
+        INSERT INTO Meta (key, value) VALUES ('data_version', '1')
+        ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    """)
 
 # ----------------------------------------------------------------------
-# 2. parse_to_fts5_query 函数 (核心修正)
+# 2. 查询规划：关键词 -> AST（database.search_query）-> FTS5 MATCH 查询
 # ----------------------------------------------------------------------
-def parse_to_fts5_query(keyword: str) -> str:
+
+# 没有统计信息时的估计值；排序是稳定的，子句保持原有顺序
+_UNKNOWN = float("inf")
+
+class VocabStats:
+    """
+    基于 fts5vocab 的词元文档频率统计，用于查询规划。
+    version 为创建时的数据版本，规划结果按它缓存（新通知入库后重新规划）。
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str = "Notification_fts"):
+        self.table = table
+        self._conn = conn
+        self._vocab = f"temp.{table}_vocab"
+        # 临时表只在当前连接中存在，不改动数据库结构
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self._vocab} USING fts5vocab(main, {table}, row)")
+        self.version = data_version(conn.cursor())
+
+    def doc_count(self, term: str) -> int:
+        """包含该词元的文档数。"""
+        row = self._conn.execute(f"SELECT doc FROM {self._vocab} WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else 0
+
+    def prefix_term_count(self, prefix: str, limit: int) -> int:
+        """以 prefix 开头的词元个数，最多数到 limit。"""
+        row = self._conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {self._vocab} WHERE term >= ? AND term < ? LIMIT ?)",
+            (prefix, prefix + "\U0010ffff", limit)
+        ).fetchone()
+        return row[0]
+
+    def prefix_docs(self, prefix: str) -> int:
+        """以 prefix 开头的词元的文档数之和（上界估计）。"""
+        row = self._conn.execute(
+            f"SELECT COALESCE(SUM(doc), 0) FROM {self._vocab} WHERE term >= ? AND term < ?",
+            (prefix, prefix + "\U0010ffff")
+        ).fetchone()
+        return row[0]
+
+    def prefix_terms(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """以 prefix 开头、文档数最多的 limit 个词元及其文档数。"""
+        return self._conn.execute(f"""
+            SELECT term, doc FROM {self._vocab} WHERE term >= ? AND term < ?
+            ORDER BY doc DESC LIMIT ?
+        """, (prefix, prefix + "\U0010ffff", limit)).fetchall()
+
+def _index_stats(conn: sqlite3.Connection) -> Optional[VocabStats]:
+    """Notification_fts 的词元统计，不可用（如索引尚未建立）时返回 None。"""
+    try:
+        return VocabStats(conn)
+    except sqlite3.Error:
+        return None
+
+class _IndexState:
+    """某个连接上的数据版本、分词后端与词元统计，数据库未变化时直接复用。"""
+
+    def __init__(self, conn: sqlite3.Connection, marker: Tuple[int, int]):
+        self.conn = conn
+        self.marker = marker
+        cursor = conn.cursor()
+        self.version = data_version(cursor)
+        self.backend = index_backend(cursor)
+        self.stats = _index_stats(conn)
+
+# 每个线程使用自己的数据库连接，因此按线程缓存
+_INDEX_STATE = threading.local()
+
+def _index_state(conn: sqlite3.Connection) -> _IndexState:
+    """
+    返回连接的索引状态。热路径上只读取 PRAGMA data_version（其他连接提交写入时变化）
+    与 total_changes（本连接写入时变化）；二者都未变化时不执行任何 DDL 或 Meta 查询。
+    """
+    marker = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+    state = getattr(_INDEX_STATE, "state", None)
+    if state is None or state.conn is not conn or state.marker != marker:
+        state = _IndexState(conn, marker)
+        _INDEX_STATE.state = state
+    return state
+
+def _term_clauses(term: str, backend: FtsBackend) -> Tuple[Clause, ...]:
+    """纯文本搜索词按分词后端转换为子句，结果按后端和搜索词缓存。"""
+    return _TERM_CACHE.get_or_compute((backend.name, term), lambda: tuple(backend.query_clauses(term)))
+
+def _drop_redundant(clauses: List[Clause], backend: FtsBackend) -> List[Clause]:
+    """
+    去掉 AND 组内重复和冗余的单词元前缀子句：
+    片段是另一片段的前缀时必然冗余（"研究"* 的结果包含 "研究生"* 的全部结果）；
+    全模式下片段被另一片段包含时同样冗余（全模式索引中含"研究生"的标题也一定含"研究"）。
+    """
+    prefix_words = {c.tokens[0] for c in clauses if c.prefix and len(c.tokens) == 1}
+    kept: List[Clause] = []
+    for clause in clauses:
+        if clause in kept:
+            continue
+        if clause.prefix and len(clause.tokens) == 1:
+            word = clause.tokens[0]
+            if any(
+                other != word and (other.startswith(word) or (backend.overlapping and word in other))
+                for other in prefix_words
+            ):
+                continue
+        kept.append(clause)
+    return kept
+
+def _plan_clause(clause: Clause, backend: FtsBackend, stats: Optional[VocabStats]) -> Optional[Tuple[str, float]]:
+    """规划单个子句，返回 (FTS5 文本, 估计文档数)；子句没有可检索的词元时返回 None。"""
+    if not any(_WORD_TOKEN.search(t) for t in clause.tokens):
+        return None
+    if stats is None or not backend.vocab_stats:
+        return clause.render(), _UNKNOWN
+
+    # unicode61 分词器索引的是转为小写的词元
+    tokens = [t.lower() for t in clause.tokens]
+    last = tokens[-1]
+    short_prefix = clause.prefix and len(tokens) == 1 and len(last) < backend.prefix_index
+    if short_prefix and stats.prefix_term_count(last, PLANNER_PREFIX_MAX_TERMS + 1) > PLANNER_PREFIX_MAX_TERMS:
+        # 前缀短于前缀索引时，FTS5 要合并所有以它开头的词元的倒排列表；词元很多时改为其中最常见的若干个
+        terms = stats.prefix_terms(last, PLANNER_PREFIX_EXPANSION)
+        alternatives = [Clause((term,)).render() for term, _ in terms]
+        text = alternatives[0] if len(alternatives) == 1 else f"({' OR '.join(alternatives)})"
+        return text, sum(doc for _, doc in terms)
+
+    estimates = [stats.doc_count(t) for t in tokens[:-1]]
+    estimates.append(stats.prefix_docs(last) if clause.prefix else stats.doc_count(last))
+    return clause.render(), min(estimates)
+
+def _plan(node: QueryNode, backend: FtsBackend, stats: Optional[VocabStats]) -> Optional[Tuple[str, float]]:
+    """把 AST 节点规划为 (FTS5 文本, 估计文档数)；节点中没有可检索的内容时返回 None。"""
+    if isinstance(node, Phrase):
+        return _plan_clause(backend.phrase_clause(node.text), backend, stats)
+
+    if isinstance(node, Term) or node.op == "AND":
+        # 同一 AND 组内所有搜索词的子句放在一起去冗余，再按估计文档数从少到多排列
+        children = (node,) if isinstance(node, Term) else node.children
+        clauses: List[Clause] = []
+        parts = []
+        for child in children:
+            if isinstance(child, Term):
+                clauses.extend(_term_clauses(child.text, backend))
+            else:
+                parts.append(_plan(child, backend, stats))
+        parts.extend(_plan_clause(clause, backend, stats) for clause in _drop_redundant(clauses, backend))
+        parts = sorted((p for p in parts if p is not None), key=lambda p: p[1])
+        if len(parts) <= 1:
+            return parts[0] if parts else None
+        return f"({' AND '.join(text for text, _ in parts)})", parts[0][1]
+
+    if node.op == "OR":
+        parts = [p for p in (_plan(child, backend, stats) for child in node.children) if p is not None]
+        if len(parts) <= 1:
+            return parts[0] if parts else None
+        return f"({' OR '.join(text for text, _ in parts)})", sum(estimate for _, estimate in parts)
+
+    # NOT：右侧为空时等价于左侧本身
+    left = _plan(node.children[0], backend, stats)
+    right = _plan(node.children[1], backend, stats)
+    if left is None or right is None:
+        return left
+    return f"({left[0]} NOT {right[0]})", left[1]
+
+def parse_to_fts5_query(keyword: str, backend: Optional[FtsBackend] = None, stats: Optional[VocabStats] = None) -> str:
     """
     将用户输入的关键词转换为 FTS5 的 MATCH 查询字符串。
-    处理复杂结构：使用递归/迭代分割，对纯文本进行分词和模糊化。
+    先解析为 AST（校验 AND/OR/NOT 与括号），再结合词元统计规划：去掉冗余的分词片段、
+    把前缀索引覆盖不到的短前缀改为常见词元、AND 组内按文档频率从少到多排列。
+    结果按 (后端, 统计所属的索引与数据版本, 空白规范化后的关键词) 缓存。
+
+    :param backend: 分词后端，默认使用当前索引的后端。
+    :param stats: 词元统计，默认使用 Notification_fts 的统计；不可用时只做语法解析与去冗余。
+    :return: MATCH 查询；关键词为空或语法错误时返回空字符串。
     """
-    keyword = keyword.strip()
+    keyword = " ".join(keyword.split())
     if not keyword:
         return ""
-    
-    # 定义需要保留的 FTS5 特殊语法和分隔符 (AND/OR/NOT, 括号, 引号)
-    # 使用正则表达式将整个查询分割成纯文本、布尔运算符和括号
-    # 使用 () 包裹的 regex groups 会被保留在结果列表中
-    
-    operators_and_structs = re.split(r'(\bAND\b|\bOR\b|\bNOT\b|[()]|"[^"]*")', keyword, flags=re.IGNORECASE)
-    
-    final_query_parts: List[str] = []
-    
-    for part in operators_and_structs:
-        part = part.strip()
-        if not part:
-            continue
-            
-        # 1. 检查是否是 FTS5 结构/操作符 (保留)
-        if re.match(r'^(AND|OR|NOT|[()]|"[^"]*?")$', part, re.IGNORECASE):
-            # 操作符、括号或引号包裹的短语直接保留
-            final_query_parts.append(part)
-        else:
-            # 2. 纯中文搜索词（进行分词和模糊化）
-            processed_term = _process_term(part)
-            if processed_term:
-                final_query_parts.append(processed_term)
-            
-    # 将所有的部分重新连接起来，返回最终的 FTS5 MATCH 字符串
-    return " ".join(final_query_parts)
+
+    if backend is None or stats is None:
+        state = _index_state(get_db_connection())
+        if backend is None:
+            backend = state.backend
+        if stats is None:
+            stats = state.stats
+
+    stats_key = (stats.table, stats.version) if stats else None
+    return _QUERY_CACHE.get_or_compute(
+        (backend.name, stats_key, keyword),
+        lambda: _build_fts5_query(keyword, backend, stats)
+    )
+
+def _build_fts5_query(keyword: str, backend: FtsBackend, stats: Optional[VocabStats]) -> str:
+    """parse_to_fts5_query 的实际实现（不经过缓存）。"""
+    try:
+        tree = parse_query(keyword)
+    except QuerySyntaxError as e:
+        print(f"[Search] 查询 '{keyword}' 语法错误: {e}")
+        return ""
+    if tree is None:
+        return ""
+
+    try:
+        planned = _plan(tree, backend, stats)
+    except sqlite3.Error as e:
+        # 统计不可用时退回到不依赖统计的规划
+        print(f"[Search] 读取词元统计失败，按原顺序查询: {e}")
+        planned = _plan(tree, backend, None)
+    return planned[0] if planned else ""
 
 # ----------------------------------------------------------------------
-# 2. 搜索操作：异步调用中的同步执行函数
+# 3. 搜索操作：异步调用中的同步执行函数
 # ----------------------------------------------------------------------
 
 def search_notifications_sync(keyword: str, limit: int = 10) -> List[Dict[str, Any]]:
     """
     执行基于 FTS5 的同步全文搜索操作。
     此函数设计用于被 asyncio.run_in_executor 调用。
+    结果按 (数据版本, 规范化的关键词, limit) 缓存，两次抓取之间的重复搜索只需读取一次 PRAGMA data_version。
     """
     conn = get_db_connection()
     cursor = conn.cursor()
-    
+
+    keyword = " ".join(keyword.split())
+    key = (_index_state(conn).version, keyword, limit)
+    try:
+        results = _RESULT_CACHE.get_or_compute(key, lambda: _run_search(cursor, keyword, limit))
+    except Exception:
+        # 查询失败时不缓存（错误已在 _run_search 中输出）
+        return []
+
+    # 返回副本，调用方修改结果不会影响缓存
+    return [dict(row) for row in results]
+
+def _run_search(cursor: sqlite3.Cursor, keyword: str, limit: int) -> List[Dict[str, Any]]:
+    """执行 FTS5 查询（不经过结果缓存），查询失败时输出错误并重新抛出。"""
     fts_query = parse_to_fts5_query(keyword)
     
     if not fts_query:
-        conn.close()
         return []
 
-    # 核心 FTS5 查询：从 FTS5 表查询，通过 fingerprint 连接回主表，并使用 BM25 评分排序。
+    # 核心 FTS5 查询：从 FTS5 表查询，通过 rowid 直接连接回主表，并使用 BM25 评分排序。
     sql = """
         SELECT 
             n.title, 
@@ -99,7 +470,7 @@ def search_notifications_sync(keyword: str, limit: int = 10) -> List[Dict[str, A
         FROM 
             Notification_fts fts  
         JOIN 
-            Notification n ON fts.fingerprint = n.fingerprint
+            Notification n ON n.id = fts.rowid
         JOIN 
             Channel c ON n.channel_id = c.id
         WHERE 
@@ -119,25 +490,35 @@ def search_notifications_sync(keyword: str, limit: int = 10) -> List[Dict[str, A
     except Exception as e:
         # 实际项目中应记录日志
         print(f"[FTS5 Search ERROR] Query: '{fts_query}', Error: {e}")
-        return []
-    finally:
-        conn.close()
+        raise
 
 
 # ----------------------------------------------------------------------
-# 3. 索引操作：供 database.py 调用的同步 FTS5 写入函数
+# 4. 索引操作：供 database.py 调用的同步 FTS5 写入函数
 # ----------------------------------------------------------------------
 
-def update_fts5_index_sync(cursor: sqlite3.Cursor, fingerprint: str, title: str):
+def update_fts5_index_sync(cursor: sqlite3.Cursor, notification_id: int, title: str):
     """
     优化后的 FTS5 索引写入函数：只接受 cursor，移除冗余 DELETE。
+    FTS5 表为 contentless 表，rowid 与 Notification.id 一致。
     """
     
-    # 插入新记录，使用分词后的文本
-    segmented_title = segment_text(title)
+    # 插入新记录，使用当前索引的分词后端处理后的文本
+    segmented_title = index_backend(cursor).segment(title)
     
-    # 使用 INSERT OR IGNORE 确保 FTS5 表的写入的健壮性。
     cursor.execute("""
-        INSERT OR IGNORE INTO Notification_fts (fingerprint, title) 
+        INSERT INTO Notification_fts (rowid, title) 
         VALUES (?, ?)
-    """, (fingerprint, segmented_title))
\ No newline at end of file
+    """, (notification_id, segmented_title))
+
+
+def update_fts5_index_batch_sync(cursor: sqlite3.Cursor, rows: List[Tuple[bytes, str]]):
+    """
+    批量写入 FTS5 索引：rows 为 (fingerprint, title) 列表，使用 executemany 一次提交。
+    rowid 通过指纹唯一索引从刚写入的 Notification 行中取得。
+    """
+    segment = index_backend(cursor).segment
+    cursor.executemany("""
+        INSERT INTO Notification_fts (rowid, title) 
+        SELECT id, ? FROM Notification WHERE fingerprint = ?
+    """, [(segment(title), fingerprint) for fingerprint, title in rows])
\ No newline at end of file
@@ -0,0 +1,163 @@
+# database/search_query.py
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+# ====================================================================
+# 搜索关键词的语法解析：关键词 -> 抽象语法树（AST）
+#
+# 支持的语法与 FTS5 一致：AND / OR / NOT（大小写均可）、括号分组、"引号短语"，
+# 相邻的词之间为隐式 AND。优先级从高到低为 NOT、AND、OR；NOT 是二元运算（a NOT b）。
+# 语法错误（括号不匹配、运算符缺少操作数等）在这里以 QuerySyntaxError 报告，
+# 不再把不合法的查询原样交给 SQLite。
+# ====================================================================
+
+
+class QuerySyntaxError(ValueError):
+    """搜索关键词中的布尔运算符或括号不合法。"""
+
+
+@dataclass(frozen=True)
+class Term:
+    """纯文本搜索词（由分词后端转换为子句）。"""
+    text: str
+
+
+@dataclass(frozen=True)
+class Phrase:
+    """引号包裹的短语。"""
+    text: str
+
+
+@dataclass(frozen=True)
+class BoolOp:
+    """布尔运算：op 为 "AND" / "OR"（任意个子节点）或 "NOT"（两个子节点：左 NOT 右）。"""
+    op: str
+    children: Tuple["QueryNode", ...]
+
+
+QueryNode = Union[Term, Phrase, BoolOp]
+
+
+@dataclass(frozen=True)
+class Clause:
+    """FTS5 的一个短语子句：tokens 须相邻出现；prefix 为真时最后一个词元按前缀匹配。"""
+    tokens: Tuple[str, ...]
+    prefix: bool = False
+
+    def render(self) -> str:
+        text = '"' + " ".join(self.tokens).replace('"', '""') + '"'
+        return text + "*" if self.prefix else text
+
+
+# 词法单元：左括号、右括号、引号短语、运算符（须为独立的单词）、其余的纯文本
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"?|\b(AND|OR|NOT)\b|([^\s()"]+))', re.IGNORECASE)
+
+
+def _tokenize(keyword: str) -> List[Tuple[str, str]]:
+    """把关键词切分为 (类型, 值) 列表，类型为 "(" / ")" / "phrase" / "op" / "text"。"""
+    tokens = []
+    position = 0
+    keyword = keyword.rstrip()
+    while position < len(keyword):
+        match = _TOKEN.match(keyword, position)
+        if match is None:
+            # 只剩空白
+            break
+        position = match.end()
+        lparen, rparen, phrase, op, text = match.groups()
+        if lparen:
+            tokens.append(("(", lparen))
+        elif rparen:
+            tokens.append((")", rparen))
+        elif phrase is not None:
+            tokens.append(("phrase", phrase))
+        elif op:
+            tokens.append(("op", op.upper()))
+        else:
+            tokens.append(("text", text))
+    return tokens
+
+
+class _Parser:
+    """递归下降解析器：or_expr := and_expr (OR and_expr)*；and_expr := not_expr ([AND] not_expr)*；
+    not_expr := primary (NOT primary)*；primary := "(" or_expr ")" | 短语 | 纯文本。"""
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self._tokens = tokens
+        self._position = 0
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self._tokens[self._position] if self._position < len(self._tokens) else None
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._tokens[self._position]
+        self._position += 1
+        return token
+
+    def _at_op(self, op: str) -> bool:
+        return self._peek() == ("op", op)
+
+    def parse(self) -> QueryNode:
+        node = self._or_expr()
+        if self._peek() is not None:
+            kind, value = self._peek()
+            raise QuerySyntaxError("多余的右括号" if kind == ")" else f"无法解析 '{value}'")
+        return node
+
+    def _or_expr(self) -> QueryNode:
+        children = [self._and_expr()]
+        while self._at_op("OR"):
+            self._next()
+            children.append(self._and_expr())
+        return children[0] if len(children) == 1 else BoolOp("OR", tuple(children))
+
+    def _and_expr(self) -> QueryNode:
+        children = [self._not_expr()]
+        while True:
+            if self._at_op("AND"):
+                self._next()
+            elif self._peek() is None or self._peek()[0] not in ("(", "phrase", "text"):
+                break
+            children.append(self._not_expr())
+        return children[0] if len(children) == 1 else BoolOp("AND", tuple(children))
+
+    def _not_expr(self) -> QueryNode:
+        node = self._primary()
+        while self._at_op("NOT"):
+            self._next()
+            node = BoolOp("NOT", (node, self._primary()))
+        return node
+
+    def _primary(self) -> QueryNode:
+        token = self._peek()
+        if token is None:
+            raise QuerySyntaxError("查询不完整：运算符缺少右侧的搜索词")
+
+        kind, value = self._next()
+        if kind == "(":
+            node = self._or_expr()
+            if self._peek() is None or self._peek()[0] != ")":
+                raise QuerySyntaxError("缺少右括号")
+            self._next()
+            return node
+        if kind == "phrase":
+            return Phrase(value)
+        if kind == "text":
+            return Term(value)
+        if kind == ")":
+            raise QuerySyntaxError("多余的右括号或空括号")
+        raise QuerySyntaxError(f"运算符 {value} 缺少左侧的搜索词")
+
+
+def parse_query(keyword: str) -> Optional[QueryNode]:
+    """
+    把搜索关键词解析为 AST。
+
+    :return: AST 的根节点；关键词为空时返回 None。
+    :raises QuerySyntaxError: 括号不匹配、运算符缺少操作数等语法错误。
+    """
+    tokens = _tokenize(keyword)
+    if not tokens:
+        return None
+    return _Parser(tokens).parse()
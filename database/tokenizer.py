@@ -0,0 +1,202 @@
+# database/tokenizer.py
+import functools
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from crawler.config import JIEBA_CACHE_FILE, JIEBA_USER_DICT
+
+# ====================================================================
+# 分词服务：延迟初始化的 jieba 分词器 + 可内存映射的预构建词典缓存
+#
+# jieba 首次分词时会把约 35 万词的 dict.txt 展开成内存中的前缀词典（约 1 秒、数十 MB），
+# 每次 cron 启动的 process 与每次重启的 callback 都要付出这笔开销。
+# 这里把前缀词典预构建为按字节序排序的二进制文件，运行时用 mmap 只读映射、二分查找，
+# 加载几乎不耗时，且多个进程共享同一份页缓存；jieba 本身也只在第一次需要分词时才导入。
+# ====================================================================
+
+# 缓存文件格式：文件头 | (词条数 + 1) 个 uint32 偏移 | 词条数个 uint32 词频 | 按 UTF-8 字节序排列的词条
+_MAGIC = b"JBPFX1\0\0"
+_HEADER = struct.Struct("<8sIQ32s")     # magic, 词条数, 总词频, jieba 版本
+
+# 词典查询结果的 LRU 缓存容量：jieba 会查询句子的每个子串（大多不在词典中），缓存必须有界，
+# 否则在常驻的 callback / daemon 进程中无限增长
+_LOOKUP_CACHE_SIZE = 1 << 15
+
+_TOKENIZER = None
+_TOKENIZER_LOCK = threading.Lock()
+_STATS: Dict[str, Any] = {}
+
+
+class MappedFreq:
+    """
+    jieba 前缀词典（词 -> 词频）的只读内存映射实现。
+    支持 jieba 用到的 get / in / [] 操作；用户词典添加的词写入内存中的覆盖层。
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, self.total, version = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} 不是有效的分词词典缓存")
+        self.jieba_version = version.rstrip(b"\0").decode("ascii")
+
+        view = memoryview(self._mm)
+        offsets_start = _HEADER.size
+        freqs_start = offsets_start + (count + 1) * 4
+        self._blob_start = freqs_start + count * 4
+        self._offsets = view[offsets_start:freqs_start].cast("I")
+        self._freqs = view[freqs_start:self._blob_start].cast("I")
+        self._count = count
+
+        # 覆盖层：用户词典添加的词；二分查找结果按 LRU 缓存（None 表示不在词典中）
+        self._overlay: Dict[str, int] = {}
+        self._lookup = functools.lru_cache(maxsize=_LOOKUP_CACHE_SIZE)(self._search)
+
+    def _search(self, word: str) -> Optional[int]:
+        """在映射的词条区中二分查找，返回词频，不存在时返回 None。"""
+        key = word.encode("utf-8")
+        mm, offsets, base = self._mm, self._offsets, self._blob_start
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = mm[base + offsets[mid]:base + offsets[mid + 1]]
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return self._freqs[mid]
+        return None
+
+    def get(self, word: str, default: Any = None) -> Any:
+        if word in self._overlay:
+            return self._overlay[word]
+        freq = self._lookup(word)
+        return default if freq is None else freq
+
+    def __getitem__(self, word: str) -> int:
+        freq = self.get(word)
+        if freq is None:
+            raise KeyError(word)
+        return freq
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self.get(word) is not None
+
+    def __setitem__(self, word: str, freq: int):
+        self._overlay[word] = freq
+
+    def __len__(self) -> int:
+        return self._count + sum(1 for word in self._overlay if self._lookup(word) is None)
+
+
+def build_cache(path: str = JIEBA_CACHE_FILE) -> int:
+    """
+    由 jieba 自带的 dict.txt 预构建前缀词典缓存（原子替换）。
+
+    :return: 写入的词条数。
+    """
+    import jieba
+
+    tokenizer = jieba.Tokenizer()
+    with tokenizer.get_dict_file() as f:
+        freq, total = tokenizer.gen_pfdict(f)
+
+    keys = sorted(word.encode("utf-8") for word in freq)
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(keys), total, jieba.__version__.encode("ascii")))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(struct.pack(f"<{len(keys)}I", *(freq[key.decode("utf-8")] for key in keys)))
+        f.write(b"".join(keys))
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+def _load_mapped_dict(tokenizer, jieba_version: str) -> bool:
+    """把内存映射的缓存装入分词器；缓存缺失或与 jieba 版本不符时先重新构建。返回是否命中已有缓存。"""
+    hit = True
+    try:
+        freq = MappedFreq(JIEBA_CACHE_FILE)
+        if freq.jieba_version != jieba_version:
+            raise ValueError(f"缓存由 jieba {freq.jieba_version} 生成")
+    except (OSError, ValueError, struct.error) as e:
+        if os.path.exists(JIEBA_CACHE_FILE):
+            print(f"[Tokenizer] 词典缓存无效，重新构建: {e}")
+        hit = False
+        build_cache(JIEBA_CACHE_FILE)
+        freq = MappedFreq(JIEBA_CACHE_FILE)
+
+    tokenizer.FREQ = freq
+    tokenizer.total = freq.total
+    tokenizer.initialized = True
+    return hit
+
+
+def get_tokenizer():
+    """获取（必要时初始化）共享的 jieba 分词器。首次调用时导入 jieba、映射词典缓存并加载用户词典。"""
+    global _TOKENIZER
+
+    if _TOKENIZER is not None:
+        return _TOKENIZER
+
+    with _TOKENIZER_LOCK:
+        if _TOKENIZER is not None:
+            return _TOKENIZER
+
+        start = time.perf_counter()
+        import jieba
+        tokenizer = jieba.Tokenizer()
+        _STATS["import_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            _STATS["cache_hit"] = _load_mapped_dict(tokenizer, jieba.__version__)
+        except OSError as e:
+            # 缓存无法写入（如只读目录）时回退到 jieba 自带的加载方式
+            print(f"[Tokenizer] 无法使用词典缓存，回退到 jieba 默认加载: {e}")
+            _STATS["cache_hit"] = False
+            tokenizer.initialize()
+        _STATS["dict_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _STATS["user_words"] = 0
+        if JIEBA_USER_DICT and os.path.exists(JIEBA_USER_DICT):
+            with open(JIEBA_USER_DICT, "rb") as f:
+                lines = [line for line in f if line.strip() and not line.lstrip().startswith(b"#")]
+            tokenizer.load_userdict(lines)
+            _STATS["user_words"] = len(lines)
+        _STATS["userdict_seconds"] = time.perf_counter() - start
+
+        print(
+            f"[Tokenizer] 分词器就绪: 导入 {_STATS['import_seconds']:.3f}s, "
+            f"词典 {_STATS['dict_seconds']:.3f}s ({'缓存命中' if _STATS['cache_hit'] else '已重建缓存'}), "
+            f"用户词典 {_STATS['user_words']} 词 {_STATS['userdict_seconds']:.3f}s"
+        )
+        _TOKENIZER = tokenizer
+        return _TOKENIZER
+
+
+def cut(text: str, cut_all: bool = False) -> Iterator[str]:
+    """使用共享分词器切分文本。"""
+    return get_tokenizer().cut(text, cut_all=cut_all)
+
+
+def startup_stats() -> Dict[str, Any]:
+    """
+    返回分词器初始化耗时（尚未初始化时为空字典）。
+
+    :return: {import_seconds, dict_seconds, userdict_seconds, cache_hit, user_words}。
+    """
+    return dict(_STATS)
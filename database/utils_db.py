@@ -1,16 +1,54 @@
 # database/utils_db.py
 import sqlite3
 import os
+import threading
 
 DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'storage')
 DB_FILE = os.path.join(DB_DIR, 'notifier.db')
 
 os.makedirs(DB_DIR, exist_ok=True) 
 
-def get_db_connection():
-    """获取数据库连接，启用字典访问和外键约束"""
-    conn = sqlite3.connect(DB_FILE)
+# 连接调优参数
+BUSY_TIMEOUT_MS = 5000                  # 遇到写锁时最长等待时间，避免 "database is locked"
+CACHE_SIZE_KIB = 16 * 1024              # 页缓存大小（16 MiB）
+MMAP_SIZE_BYTES = 256 * 1024 * 1024     # 内存映射读取上限（256 MiB）
+
+# 每个线程持有一个长期复用的连接（sqlite3 连接默认不允许跨线程使用）
+_LOCAL = threading.local()
+
+
+def _open_connection() -> sqlite3.Connection:
+    """创建并调优一个新的数据库连接。"""
+    conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
     conn.row_factory = sqlite3.Row
     # 启用外键约束
     conn.execute("PRAGMA foreign_keys = ON")
-    return conn
\ No newline at end of file
+    # WAL 模式：callback 的读请求与 process 的写入可以并发进行
+    conn.execute("PRAGMA journal_mode = WAL")
+    # WAL 模式下 NORMAL 已能保证数据库一致性，且提交时无需每次 fsync
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    获取当前线程的数据库连接（首次调用时创建），启用字典访问和外键约束。
+    连接在线程内长期复用，调用方不应关闭它；事务需显式 commit/rollback。
+    """
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = _open_connection()
+        _LOCAL.conn = conn
+    return conn
+
+
+def close_db_connection():
+    """关闭当前线程的数据库连接（例如线程或进程退出前）。"""
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None:
+        conn.close()
+        _LOCAL.conn = None
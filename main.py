@@ -1,7 +1,10 @@
 import argparse
 import sys
 
-from scraper_runner import process_and_notify
+from scraper_runner import process_and_notify, run_daemon, reextract_and_store, backfill_and_store
+from crawler.config import BACKFILL_MAX_PAGES, FTS_TOKENIZER
+from database.database import rebuild_fts_index
+from database.search_db import FTS_BACKENDS
 from callback_server import start_callback_server
 
 
@@ -10,17 +13,30 @@ def main():
     解析命令行参数，并根据选择的模式启动对应的服务。
     """
     parser = argparse.ArgumentParser(
-        description="钉钉通知机器人：支持主动推送和被动回调两种模式。",
+        description="钉钉通知机器人：支持主动推送、常驻调度和被动回调三种模式。",
         # 🚨 修正点 1: 在没有参数时自动打印帮助信息
-        usage="%(prog)s <mode> [options]\n\n示例: python %(prog)s process\n       python %(prog)s callback"
+        usage="%(prog)s <mode> [options]\n\n示例: python %(prog)s process\n       python %(prog)s daemon\n       python %(prog)s callback\n       python %(prog)s reextract --channel 公示专区 --all-versions\n       python %(prog)s backfill --channel 公示专区 --max-pages 50\n       python %(prog)s reindex --tokenizer bigram"
     )
     
     parser.add_argument(
         'mode', 
-        choices=['process', 'callback'], 
-        help="选择启动模式: 'process' (主动推送) 或 'callback' (被动应答)"
+        choices=['process', 'daemon', 'callback', 'reextract', 'backfill', 'reindex'], 
+        help="选择启动模式: 'process' (主动推送，运行一次)、'daemon' (常驻运行，按栏目自适应调度)、'callback' (被动应答)、'reextract' (用当前配置离线重新抽取归档页面)、'backfill' (按分页配置回填历史通知) 或 'reindex' (重建全文索引)"
     )
 
+    # reextract 模式的选项
+    parser.add_argument('--channel', action='append', help="reextract / backfill: 只处理指定栏目（channel_name 或 site_name，可重复）")
+    parser.add_argument('--all-versions', action='store_true', help="reextract: 解析每个 URL 的全部历史版本（回填）")
+    parser.add_argument('--notify', action='store_true', help="reextract: 推送重新抽取得到的新通知")
+
+    # backfill 模式的选项
+    parser.add_argument('--max-pages', type=int, default=BACKFILL_MAX_PAGES, help=f"backfill: 每个栏目最多抓取的页数（默认 {BACKFILL_MAX_PAGES}）")
+    parser.add_argument('--full', action='store_true', help="backfill: 遇到整页均已入库的页面时不停止，一直翻到列表末尾")
+
+    # reindex 模式的选项
+    parser.add_argument('--tokenizer', choices=list(FTS_BACKENDS), default=FTS_TOKENIZER, help=f"reindex: 分词后端（默认 {FTS_TOKENIZER}）")
+    parser.add_argument('--processes', type=int, help="reindex: 并行分词的进程数（默认使用全部 CPU 核心）")
+
     # 🚨 修正点 2: 如果没有提供任何参数，打印帮助信息并退出
     if len(sys.argv) == 1:
         parser.print_help(sys.stderr)
@@ -32,6 +48,22 @@ def main():
         print("--- 启动主动推送任务 ---")
         process_and_notify()
 
+    elif args.mode == 'daemon':
+        print("--- 启动常驻推送服务 ---")
+        run_daemon()
+
+    elif args.mode == 'reextract':
+        print("--- 启动离线重新抽取 ---")
+        reextract_and_store(args.channel, args.all_versions, args.notify)
+
+    elif args.mode == 'backfill':
+        print("--- 启动历史回填 ---")
+        backfill_and_store(args.channel, args.max_pages, args.full)
+
+    elif args.mode == 'reindex':
+        print("--- 启动全文索引重建 ---")
+        rebuild_fts_index(args.tokenizer, args.processes)
+
     elif args.mode == 'callback':
         print("--- 启动回调服务器 ---")
         start_callback_server()
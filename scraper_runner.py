@@ -1,8 +1,18 @@
 import json
+import os
+import time
+from itertools import islice
+from typing import Any, Dict, List, Optional
 from dingtalk.api_handler import send_channel_notifications
-from crawler.fetcher import get_latest_info
-from crawler.config import SITES_FILE
-from database.database import initialize_db, get_all_channels, add_new_notification, generate_fingerprint, is_notification_new
+from crawler.fetcher import iter_channel_pages, iter_archived_channel_pages
+from crawler.engine import crawl_channels
+from crawler import fetch_cache, host_guard, metrics, page_archive, parse_pool
+from crawler.extraction_plan import validate_channels
+from crawler.scheduler import compute_poll_intervals, with_jitter
+from crawler.pagination import page_urls
+from crawler.config import SITES_FILE, STOP_AFTER_KNOWN, DEDUPE_BATCH_SIZE, DAEMON_IDLE_CHECK, DAEMON_HEARTBEAT_INTERVAL
+from crawler.config import BACKFILL_MAX_PAGES, BACKFILL_WINDOW, BACKFILL_PAGE_ITEMS, METRICS_PORT
+from database.database import initialize_db, get_all_channels, add_new_notifications, generate_fingerprint, filter_new_fingerprints, get_channel_recent_date
 
 def load_json(path, default):
     try:
@@ -10,9 +20,98 @@ def load_json(path, default):
     except:
         return default
 
-def process_and_notify():
-    """执行完整的定时爬取、去重和推送流程。当无新通知时，发送无通知消息。"""
-    
+def collect_new_items(channel: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    流式处理单个栏目：逐页、逐条完成抽取、指纹计算与去重检查。
+
+    列表页按“新→旧”排列，因此当某页连续遇到 stop_after_known 条已知通知时，
+    即停止解析该页；若 url_list 为同一列表的连续分页（paginated），同时停止抓取后续页面。
+    置顶的旧通知排在新通知之前，因此只有发布日期不早于本栏目第 stop_after_known 新通知的已知条目才计数，
+    其余已知条目（置顶或没有日期）既不计数也不打断计数。
+
+    :param channel: get_all_channels() 返回的单个栏目任务。
+    :return: 本栏目尚未入库的新通知列表（保持页面原顺序）。
+    """
+    stop_after_known = channel.get('stop_after_known', STOP_AFTER_KNOWN)
+    # 已知条目计入连续计数的日期下限；栏目带日期的通知不足 stop_after_known 条时不提前停止
+    recent_date = get_channel_recent_date(channel['channel_id'], stop_after_known) if stop_after_known else None
+    paginated = channel.get('paginated', False)
+    url_list = channel.get('url_list', [])
+    labels = metrics.channel_labels(channel)
+
+    new_items: List[Dict[str, str]] = []
+    seen_fingerprints = set()
+    consumed_urls = set()
+    extracted = 0
+    known = 0
+
+    start = time.perf_counter()
+    pages = iter_channel_pages(channel)
+    try:
+        for url, page_items in pages:
+            consumed_urls.add(url)
+            known_run = 0
+            stopped = False
+
+            # 按小批次取出条目，每批只做一次 IN (...) 去重查询
+            while not stopped:
+                raw_chunk = list(islice(page_items, DEDUPE_BATCH_SIZE))
+                if not raw_chunk:
+                    break
+                extracted += len(raw_chunk)
+
+                chunk = []
+                for item in raw_chunk:
+                    fingerprint = generate_fingerprint(item["title"], item["link"])
+
+                    # 同一栏目的多个页面中可能出现重复条目
+                    if fingerprint not in seen_fingerprints:
+                        seen_fingerprints.add(fingerprint)
+                        chunk.append((fingerprint, item))
+
+                new_fingerprints = filter_new_fingerprints([fp for fp, _ in chunk])
+                for fingerprint, item in chunk:
+                    if fingerprint in new_fingerprints:
+                        new_items.append(item)
+                        known_run = 0
+                        continue
+
+                    known += 1
+                    date = item.get("date", "N/A")
+                    if recent_date is None or date == "N/A" or date < recent_date:
+                        continue
+
+                    known_run += 1
+                    if known_run >= stop_after_known:
+                        stopped = True
+                        break
+
+            if not stopped:
+                continue
+
+            # 连续命中已知通知：本页剩余条目均为旧通知
+            if paginated:
+                break
+
+    except Exception as e:
+        print(f"处理 [{channel.get('site_name')}] {channel.get('channel_name')} 时发生错误: {e}")
+        metrics.inc("crawler_errors_total", {**labels, "type": type(e).__name__})
+        pages.close()
+        fetch_cache.discard(url_list)
+        return []
+
+    finally:
+        metrics.observe("crawler_channel_seconds", labels, time.perf_counter() - start)
+        metrics.inc("crawler_items_extracted_total", labels, extracted)
+        metrics.inc("crawler_dedupe_hits_total", labels, known)
+
+    # 关闭生成器（取消预取），未被处理的页面不写入抓取缓存
+    pages.close()
+    fetch_cache.discard([url for url in url_list if url not in consumed_urls])
+    return new_items
+
+def prepare_channels() -> List[Dict[str, Any]]:
+    """加载 sites.json、初始化数据库并导入配置，返回配置有效的栏目任务列表。"""
     # 1. 加载新的结构化配置
     sites_config = load_json(SITES_FILE, [])
     
@@ -22,57 +121,300 @@ def process_and_notify():
 
     # 3. 从数据库加载所有爬取任务（Channels）
     channels = get_all_channels()
-    print(f"--- 2. 爬取任务开始 (共 {len(channels)} 个栏目) ---")
-    
+
+    # 预编译所有栏目的抽取计划，配置无效的栏目在发起任何网络请求前即被剔除
+    return validate_channels(channels)
+
+def crawl_and_notify(channels: List[Dict[str, Any]]) -> int:
+    """
+    抓取给定栏目，将新通知入库并推送。
+
+    :param channels: 待抓取的栏目任务列表。
+    :return: 本次新入库并推送的通知总数。
+    """
     total_new_items = 0
 
-    for channel in channels:
+    # 4. 并发执行各栏目的流式抓取与去重检查，结果按栏目原顺序依次返回
+    for channel, candidate_items in crawl_channels(channels, collect_new_items):
         channel_id = channel['channel_id']
         site_name = channel['site_name']
         channel_name = channel['channel_name']
         
-        print(f"正在爬取: [{site_name}] - {channel_name}...")
+        print(f"正在处理: [{site_name}] - {channel_name}...")
 
-        # 4. 调用爬虫模块获取数据
-        all_items = get_latest_info(channel)
+        # 5. 核心：写入数据库并准备推送数据
+        # 整个栏目的新通知在一个事务中批量写入；写入成功才视为新通知（同一条通知可能同时出现在多个栏目中）
+        labels = metrics.channel_labels(channel)
+        try:
+            with metrics.timer("crawler_db_write_seconds", labels):
+                new_items = add_new_notifications(channel_id, candidate_items)
+        except Exception as e:
+            # 写入失败：不记录本栏目页面的缓存信息，下次运行时重新解析并入库
+            metrics.inc("crawler_errors_total", {**labels, "type": type(e).__name__})
+            fetch_cache.discard(channel.get('url_list', []))
+            print(f"    ❌ 写入数据库失败，本栏目将在下次运行时重试。")
+            continue
+        metrics.inc("crawler_items_new_total", labels, len(new_items))
+        total_new_items += len(new_items)
 
-        # 5. 核心：去重检查和推送数据准备
-        new_items = []
-        for item in all_items:    
-            fingerprint = generate_fingerprint(item["title"], item["link"])
-            
-            if is_notification_new(fingerprint):
-                # 找到新通知，推送到列表，并立即写入数据库，标记为已处理
-                new_items.append(item)
-                add_new_notification(channel_id, item) 
-                total_new_items += 1
+        # 新通知已全部入库，记录本栏目页面的缓存信息，下次页面未变化时可直接跳过
+        fetch_cache.commit(channel.get('url_list', []))
         
         if new_items:
             # 6. 推送消息：针对有新内容的 channel 进行推送
-            send_channel_notifications(
-                channel_name=channel_name,
-                site_name=site_name,
-                new_notifications=new_items
-            )
+            with metrics.timer("crawler_push_seconds", labels):
+                send_channel_notifications(
+                    channel_name=channel_name,
+                    site_name=site_name,
+                    new_notifications=new_items
+                )
             print(f"    ✅ 推送 {len(new_items)} 条。")
         else:
             print(f"    无更新。")
             
+    # 保存各主机的健康状态，熔断信息在下次运行时继续生效
+    host_guard.save_state()
+    # 按保留策略清理页面归档
+    page_archive.prune()
+    # 保存本轮的抓取指标并更新 Prometheus 指标文件
+    metrics.flush_run()
+    return total_new_items
+
+def send_heartbeat():
+    """发送通用的“无通知”心跳消息。"""
+    # 统一使用一个特殊的 "system" 或空参数来发送通用“无通知”消息
+    try:
+        send_channel_notifications(
+            channel_name="系统通知",
+            site_name="任务状态",
+            new_notifications=[]
+        )
+        print("--- ✅ 无通知心跳消息发送成功。 ---")
+    except Exception as e:
+        # 如果发送失败，至少在日志中记录
+        print(f"--- ❌ 警告：发送无通知心跳消息失败: {e} ---")
+
+def process_and_notify():
+    """执行完整的定时爬取、去重和推送流程。当无新通知时，发送无通知消息。"""
+    channels = prepare_channels()
+    print(f"--- 2. 爬取任务开始 (共 {len(channels)} 个栏目) ---")
     
+    total_new_items = crawl_and_notify(channels)
 
     if total_new_items == 0:
         print("--- 任务完成。本次运行无任何新通知 ---")
-        # 统一使用一个特殊的 "system" 或空参数来发送通用“无通知”消息
+        send_heartbeat()
+    else:
+        print(f"--- 任务完成。共发现和推送 {total_new_items} 条新通知 ---")
+
+# ==========================================================
+# daemon 模式：常驻进程 + 按栏目自适应调度
+# ==========================================================
+
+def _sites_file_mtime() -> float:
+    """返回 sites.json 的修改时间，文件不存在时返回 0。"""
+    try:
+        return os.path.getmtime(SITES_FILE)
+    except OSError:
+        return 0.0
+
+def run_daemon():
+    """
+    常驻运行：WebVPN 会话、数据库连接、分词词典和钉钉客户端在多轮之间保持可用。
+    每个栏目按自身的更新频率（由推送历史估计）独立调度；sites.json 变化时自动重新导入。
+    """
+    channels = prepare_channels()
+    config_mtime = _sites_file_mtime()
+    parse_pool.enable_for_long_run()
+
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+
+    # 启动时所有栏目立即轮询一次
+    next_poll: Dict[int, float] = {channel['channel_id']: 0.0 for channel in channels}
+    last_activity = time.time()
+    print(f"--- daemon 已启动 (共 {len(channels)} 个栏目) ---")
+
+    try:
+        while True:
+            # 配置变化：重新导入，新增栏目立即轮询，已删除的栏目不再调度
+            mtime = _sites_file_mtime()
+            if mtime != config_mtime:
+                print("--- 检测到 sites.json 变化，重新导入配置 ---")
+                config_mtime = mtime
+                channels = prepare_channels()
+                next_poll = {channel['channel_id']: next_poll.get(channel['channel_id'], 0.0) for channel in channels}
+
+            now = time.time()
+            due = [channel for channel in channels if next_poll[channel['channel_id']] <= now]
+
+            if due:
+                print(f"--- 本轮轮询 {len(due)} / {len(channels)} 个栏目 ---")
+                try:
+                    if crawl_and_notify(due) > 0:
+                        last_activity = time.time()
+                except Exception as e:
+                    print(f"--- ❌ 本轮轮询失败: {e} ---")
+
+                # 按最新的推送历史重新估计这些栏目的轮询间隔
+                intervals = compute_poll_intervals(due)
+                finished = time.time()
+                for channel in due:
+                    next_poll[channel['channel_id']] = finished + with_jitter(intervals[channel['channel_id']])
+
+            # 长时间没有任何新通知时，发送一次心跳，确认服务仍在运行
+            if time.time() - last_activity >= DAEMON_HEARTBEAT_INTERVAL:
+                send_heartbeat()
+                last_activity = time.time()
+
+            next_due = min(next_poll.values(), default=time.time() + DAEMON_IDLE_CHECK)
+            time.sleep(min(max(next_due - time.time(), 0), DAEMON_IDLE_CHECK))
+
+    except KeyboardInterrupt:
+        print("--- daemon 已停止 ---")
+        host_guard.save_state()
+
+# ==========================================================
+# reextract：用当前配置离线重新抽取归档页面
+# ==========================================================
+
+def reextract_channel(channel: Dict[str, Any], all_versions: bool = False) -> List[Dict[str, str]]:
+    """
+    用当前的抽取计划重新解析单个栏目的归档页面，返回去除栏目内重复后的条目。
+    不做“连续已知即停止”的优化：回填时旧页面中的每一条都需要检查。
+    """
+    items: List[Dict[str, str]] = []
+    seen_fingerprints = set()
+    try:
+        for _, page_items in iter_archived_channel_pages(channel, all_versions):
+            for item in page_items:
+                fingerprint = generate_fingerprint(item["title"], item["link"])
+                if fingerprint not in seen_fingerprints:
+                    seen_fingerprints.add(fingerprint)
+                    items.append(item)
+    except Exception as e:
+        print(f"重新抽取 [{channel.get('site_name')}] {channel.get('channel_name')} 时发生错误: {e}")
+        return []
+    return items
+
+def reextract_and_store(channel_names: Optional[List[str]] = None, all_versions: bool = False, notify: bool = False):
+    """
+    对归档页面重新执行当前的抽取计划，新条目经正常的去重流程入库，全程没有网络请求。
+
+    :param channel_names: 只处理这些栏目（匹配 channel_name 或 site_name），为空时处理全部栏目。
+    :param all_versions: 是否解析每个 URL 的全部历史版本，用于回填选择器曾失效的栏目。
+    :param notify: 是否推送重新抽取得到的新通知（默认只入库）。
+    """
+    channels = prepare_channels()
+    if channel_names:
+        channels = [c for c in channels if c['channel_name'] in channel_names or c['site_name'] in channel_names]
+    print(f"--- 2. 重新抽取开始 (共 {len(channels)} 个栏目) ---")
+
+    total_new_items = 0
+    for channel, items in crawl_channels(channels, lambda c: reextract_channel(c, all_versions)):
         try:
+            new_items = add_new_notifications(channel['channel_id'], items)
+        except Exception:
+            # 错误已在写入时打印；归档仍在，可重新运行 reextract
+            continue
+        total_new_items += len(new_items)
+        if not new_items:
+            continue
+
+        print(f"[{channel['site_name']}] - {channel['channel_name']}: 解析 {len(items)} 条，新增 {len(new_items)} 条。")
+        if notify:
             send_channel_notifications(
-                channel_name="系统通知",
-                site_name="任务状态",
-                new_notifications=[]
+                channel_name=channel['channel_name'],
+                site_name=channel['site_name'],
+                new_notifications=new_items
             )
-            print("--- ✅ 无通知心跳消息发送成功。 ---")
-        except Exception as e:
-            # 如果发送失败，至少在日志中记录
-            print(f"--- ❌ 警告：发送无通知心跳消息失败: {e} ---")
-            
+
+    print(f"--- 重新抽取完成。共新增 {total_new_items} 条通知 ---")
+
+# ==========================================================
+# backfill：按 pagination 配置回填栏目的历史通知
+# ==========================================================
+
+def backfill_channel(channel: Dict[str, Any], max_pages: int, full: bool = False) -> List[Dict[str, str]]:
+    """
+    按栏目的 pagination 配置并发抓取历史分页，返回尚未入库的条目（按页面顺序，新→旧）。
+
+    回填时不受 max_count 限制，每页的全部条目都会被检查。遇到空页面（或条目全部与前面页面重复，
+    即已越过最后一页）时停止；遇到第一个条目全部已入库的页面时也停止（full=True 时不做此判断）。
+    """
+    urls = page_urls(channel, max_pages)
+    task = {**channel, "url_list": urls, "max_count": BACKFILL_PAGE_ITEMS, "page_window": BACKFILL_WINDOW}
+
+    items: List[Dict[str, str]] = []
+    seen_fingerprints = set()
+
+    pages = iter_channel_pages(task)
+    try:
+        for url, page_items in pages:
+            page = []
+            for item in page_items:
+                fingerprint = generate_fingerprint(item["title"], item["link"])
+                if fingerprint not in seen_fingerprints:
+                    seen_fingerprints.add(fingerprint)
+                    page.append((fingerprint, item))
+
+            if not page:
+                print(f"  -> 页面没有新的条目，已到达列表末尾: {url}")
+                break
+
+            new_fingerprints = filter_new_fingerprints([fp for fp, _ in page])
+            items.extend(item for fp, item in page if fp in new_fingerprints)
+
+            if not new_fingerprints and not full:
+                print(f"  -> 本页条目均已入库，停止回填: {url}")
+                break
+
+    except Exception as e:
+        # 已抓取的页面仍然有效，保留已收集的条目
+        print(f"回填 [{channel.get('site_name')}] {channel.get('channel_name')} 时发生错误: {e}")
+
+    finally:
+        # 关闭生成器（取消预取）；分页地址不写入抓取缓存，下次回填时重新检查
+        pages.close()
+        fetch_cache.discard(urls)
+
+    return items
+
+def backfill_and_store(channel_names: Optional[List[str]] = None, max_pages: int = BACKFILL_MAX_PAGES, full: bool = False):
+    """
+    回填配置了 pagination 的栏目：各栏目并发翻页抓取，新条目批量入库，不推送。
+    每个栏目的新通知与其 FTS5 索引在同一个事务中写入，中途失败或中断时不会留下无法搜索的通知。
+
+    :param channel_names: 只处理这些栏目（匹配 channel_name 或 site_name），为空时处理全部配置了 pagination 的栏目。
+    :param max_pages: 每个栏目最多抓取的页数。
+    :param full: 不在“整页均已入库”处停止，一直翻页到列表末尾或 max_pages。
+    """
+    channels = prepare_channels()
+    if channel_names:
+        channels = [c for c in channels if c['channel_name'] in channel_names or c['site_name'] in channel_names]
+        for channel in channels:
+            if not channel.get('pagination'):
+                print(f"[{channel['site_name']}] - {channel['channel_name']}: 未配置 pagination，跳过。")
+
+    channels = [c for c in channels if c.get('pagination')]
+    parse_pool.enable_for_long_run()
+    print(f"--- 2. 历史回填开始 (共 {len(channels)} 个栏目，每个栏目最多 {max_pages} 页) ---")
+
+    total_new_items = 0
+    failed_channels = 0
+    for channel, items in crawl_channels(channels, lambda c: backfill_channel(c, max_pages, full)):
+        try:
+            new_items = add_new_notifications(channel['channel_id'], items)
+        except Exception:
+            # 错误已在写入时打印；回填不写入抓取缓存，重新运行 backfill 即可补上
+            failed_channels += 1
+            continue
+        total_new_items += len(new_items)
+        print(f"[{channel['site_name']}] - {channel['channel_name']}: 抓取 {len(items)} 条，新增 {len(new_items)} 条。")
+
+    host_guard.save_state()
+    metrics.flush_run()
+    if failed_channels:
+        print(f"--- 历史回填结束。共新增 {total_new_items} 条通知，{failed_channels} 个栏目写入失败，请重新运行 backfill ---")
     else:
-        print(f"--- 任务完成。共发现和推送 {total_new_items} 条新通知 ---")
\ No newline at end of file
+        print(f"--- 历史回填完成。共新增 {total_new_items} 条通知 ---")